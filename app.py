@@ -1,14 +1,62 @@
-from flask import Flask, request, render_template  # Import Flask and related modules for web app
+import io  # Import io for in-memory streams
+import json  # Import json to stream JSON responses
+import itertools  # Import itertools to put the first chunk back in front of the stream
+import time  # Import time to measure request latency
+import uuid  # Import uuid to generate request ids
+
+from flask import Flask, request, render_template, make_response, Response, stream_with_context, jsonify, g  # Import Flask and related modules for web app
 import numpy as np  # Import numpy for numerical operations
 import pandas as pd  # Import pandas for data manipulation
 
-from sklearn.preprocessing import StandardScaler  # Import scaler (not used here)
-from src.pipeline.predict_pipeline import CustomData, PredictPipeline  # Import custom data and prediction pipeline
+from src.pipeline.predict_pipeline import (
+    CustomData, FeatureBatch, PredictPipeline, BATCH_CHUNK_SIZE, PREDICT_STAGE_SECONDS,
+    check_batch_columns, category_codes, get_transformer,
+)  # Import custom data and prediction pipeline
+from src.pipeline.micro_batcher import MicroBatcher  # Import the request coalescer for single-row predictions
+from src.pipeline.inference_executor import InferenceExecutor, Overloaded, DeadlineExceeded  # Import the bounded inference pool
+from src import metrics  # Import the lightweight metrics registry
+from src.metrics import span  # Import the timing span
+from src.logger import logging, REQUEST_LOGGER_NAME, set_request_id, reset_request_id  # Import logging and request id helpers
 
 application = Flask(__name__)  # Create a Flask web application
 
 app = application  # Assign the app variable
 
+inference = InferenceExecutor()  # Bounded worker pool that runs every prediction, sheds load when full
+micro_batcher = MicroBatcher(executor=inference)  # Merges concurrent single predictions into batched predict calls
+
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Time to produce the response, per route and status.", ["route", "method", "status"]
+)  # Streaming responses are timed until the response object is ready
+request_logger = logging.getLogger(REQUEST_LOGGER_NAME)  # Access log, rate limited by the logger configuration
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()  # Read back in record_request
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex  # Keep the caller's id when it sends one
+    g.request_id_token = set_request_id(g.request_id)  # Every record logged for this request carries the id
+
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"  # Bounded label values
+    seconds = time.perf_counter() - g.request_start
+    REQUEST_SECONDS.observe(seconds, route, request.method, str(response.status_code))
+    response.headers['X-Request-ID'] = g.request_id  # Lets callers quote the id when reporting a problem
+    request_logger.info(
+        "%s %s %s", request.method, route, response.status_code,
+        extra={"status": response.status_code, "duration_ms": round(seconds * 1000, 3)},
+    )
+    return response
+
+
+@app.teardown_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        reset_request_id(token)  # The worker thread serves other requests next
+
 ## Route for a home page
 
 @app.route('/')  # Define the route for the main page
@@ -20,23 +68,142 @@ def predict_datapoint():
     if request.method == 'GET':  # If the request is GET, show the form
         return render_template('home.html')  # Render the home.html template
     else:  # If the request is POST, process the form data
-        data = CustomData(
-            gender=request.form.get('gender'),  # Get gender from form
-            race_ethnicity=request.form.get('ethnicity'),  # Get ethnicity from form
-            parental_level_of_education=request.form.get('parental_level_of_education'),  # Get education level
-            lunch=request.form.get('lunch'),  # Get lunch info
-            test_preparation_course=request.form.get('test_preparation_course'),  # Get test prep info
-            reading_score=float(request.form.get('writing_score')),  # Get writing score (note: swapped)
-            writing_score=float(request.form.get('reading_score'))  # Get reading score (note: swapped)
-        )
-        
-        pred_df = data.get_data_as_data_frame()  # Convert input data to DataFrame
-        print(pred_df)  # Print the DataFrame for debugging
-
-        predict_pipeline = PredictPipeline()  # Create prediction pipeline object
-        results = predict_pipeline.predict(pred_df)  # Make prediction
-        return render_template('home.html', results=results[0])  # Show result on the page
+        vocabulary = category_codes(get_transformer(micro_batcher.pipeline.cache.get()))  # Codes of the served preprocessor
+        with span(PREDICT_STAGE_SECONDS, "features"):
+            data = CustomData(
+                gender=request.form.get('gender'),  # Get gender from form
+                race_ethnicity=request.form.get('ethnicity'),  # Get ethnicity from form
+                parental_level_of_education=request.form.get('parental_level_of_education'),  # Get education level
+                lunch=request.form.get('lunch'),  # Get lunch info
+                test_preparation_course=request.form.get('test_preparation_course'),  # Get test prep info
+                reading_score=float(request.form.get('writing_score')),  # Get writing score (note: swapped)
+                writing_score=float(request.form.get('reading_score'))  # Get reading score (note: swapped)
+            )
+
+            features = data.to_batch(vocabulary)  # One-row columnar batch, no DataFrame
+        if request_logger.isEnabledFor(logging.DEBUG):
+            request_logger.debug("Form input %s", features.records())  # Log the input for debugging
+
+        results, model_version = micro_batcher.predict_with_version(features, timeout=inference.config.timeout)  # Make prediction, batched with concurrent requests
+        response = make_response(render_template('home.html', results=results[0]))  # Show result on the page
+        response.headers['X-Model-Version'] = model_version  # Tell the caller which model served the request
+        return response
     
+@app.route('/predictbatch', methods=['POST'])  # Route for scoring many students in one call
+def predict_batch():
+    try:
+        chunks, output_format = read_batch_chunks()  # Lazily parse the upload chunk by chunk
+        first = next(chunks, None)  # Parse only the first chunk up front
+        if first is None:
+            raise ValueError("No rows provided")
+        check_batch_columns(first.columns)  # Reject a wrong layout before streaming starts
+    except ValueError as e:
+        return jsonify(error=str(e)), 400  # Bad input, nothing was predicted
+    if not inference.has_capacity():
+        raise Overloaded(inference.config.retry_after)  # Refuse before the response starts streaming
+
+    predict_pipeline = PredictPipeline()  # Create prediction pipeline object
+    results = predict_pipeline.predict_batches(itertools.chain([first], chunks), executor=inference)  # One vectorized predict per chunk
+    writer = write_json_chunks if output_format == 'json' else write_csv_chunks  # Answer in the input format
+    response = Response(stream_with_context(writer(results)), mimetype='application/json' if output_format == 'json' else 'text/csv')
+    response.headers['X-Model-Version'] = predict_pipeline.model_version  # Tell the caller which model served the batch
+    return response
+
+
+def read_batch_chunks():
+    if 'file' in request.files:  # Uploaded CSV file, spooled to disk by the server
+        upload = request.files['file']
+        stream, upload.stream = upload.stream, io.BytesIO()  # Take ownership, request teardown would close it mid-stream
+        return read_csv_chunks(stream), 'csv'
+    if request.mimetype == 'text/csv':  # Raw CSV request body
+        return read_csv_chunks(request.stream), 'csv'
+    if request.is_json:  # JSON array of row objects
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("Expected a JSON array of objects")
+        return (pd.DataFrame.from_records(rows[i:i + BATCH_CHUNK_SIZE]) for i in range(0, len(rows), BATCH_CHUNK_SIZE)), 'json'
+    raise ValueError("Send a JSON array, a text/csv body or a CSV file in the 'file' field")
+
+
+def read_csv_chunks(stream):
+    try:
+        yield from pd.read_csv(stream, chunksize=BATCH_CHUNK_SIZE)  # Never holds more than one chunk
+    finally:
+        stream.close()  # Release the upload once the batch is done
+
+
+def write_csv_chunks(results):
+    yield 'prediction,error\n'  # CSV header
+    for preds, errors in results:
+        yield pd.DataFrame({'prediction': preds, 'error': errors}).to_csv(header=False, index=False)  # One chunk at a time
+
+
+def write_json_chunks(results):
+    yield '['  # Open the JSON array
+    first = True
+    for preds, errors in results:
+        rows = [
+            {'prediction': None, 'error': error} if isinstance(error, str) else {'prediction': float(pred)}
+            for pred, error in zip(preds, errors)
+        ]  # One object per input row
+        if rows:
+            body = json.dumps(rows)[1:-1]  # Drop the brackets of the chunk-level array
+            yield body if first else ',' + body
+            first = False
+    yield ']'  # Close the JSON array
+
+
+@app.route('/api/predict', methods=['POST'])  # JSON API for one student or a small list of students
+def api_predict():
+    payload = request.get_json(silent=True)  # None when the body is not JSON
+    rows = [payload] if isinstance(payload, dict) else payload
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        return jsonify(error="Expected a JSON object or a non-empty array of objects"), 400
+    if len(rows) > BATCH_CHUNK_SIZE:
+        return jsonify(error=f"At most {BATCH_CHUNK_SIZE} rows per call, use /predictbatch for more"), 413
+    try:
+        check_batch_columns(set().union(*rows))  # Some row must carry each input column, like DataFrame columns
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    vocabulary = category_codes(get_transformer(micro_batcher.pipeline.cache.get()))  # Codes of the served preprocessor
+    features = FeatureBatch.from_records(rows, vocabulary)  # Extra fields are ignored, missing ones fail validation
+    valid, errors = features.validate()  # Rows that can be predicted
+    preds = np.full(len(features), np.nan)
+    model_version = None
+    if valid.any():
+        preds[valid], model_version = micro_batcher.predict_with_version(features[valid], timeout=inference.config.timeout)
+    results = [
+        {'prediction': None, 'error': error} if isinstance(error, str) else {'prediction': float(pred)}
+        for pred, error in zip(preds, errors)
+    ]  # Same row objects as /predictbatch
+    if isinstance(payload, dict):
+        status = 400 if 'error' in results[0] else 200  # A single invalid student is a bad request
+        return jsonify(dict(results[0], model_version=model_version)), status
+    return jsonify(predictions=results, model_version=model_version)
+
+
+@app.errorhandler(Overloaded)  # Every route that predicts can shed load
+def overloaded(e):
+    response = jsonify(error=str(e))
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)  # Tell clients when to try again
+    return response
+
+
+@app.errorhandler(DeadlineExceeded)  # Prediction took longer than the request deadline
+def deadline_exceeded(e):
+    return jsonify(error=str(e)), 504
+
+
+@app.route('/batcherstats')  # Route for micro-batching metrics
+def batcher_stats():
+    return jsonify(micro_batcher.metrics())  # Batch sizes and queue waits for tuning
+
+
+@app.route('/metrics')  # Route for Prometheus scraping
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')  # Counters and histograms of this worker
+
 
 if __name__ == "__main__":      
     app.run(host="0.0.0.0", port=80)  # Run the Flask app on port 80
\ No newline at end of file
@@ -0,0 +1,66 @@
+'''
+Training cost per model of the registry on generated datasets.
+
+* fit: one fit with the registry defaults, plus predict time on the same rows,
+* evaluate_models: the trainer's search-and-refit path for that model alone
+  (3-fold CV, refit, train and test scoring) with the search cache disabled, so
+  every run does the full work.
+
+Each model runs in this process one after another; pass --models to pick some.
+Nothing in artifacts/ is read or written.
+
+    python benchmarks/bench_fit.py --sizes 1000,10000 --models "Random Forest,XGBRegressor"
+'''
+import sys  # Import sys for the exit status
+import argparse  # Import argparse for command line options
+
+import common  # Import the shared benchmark helpers (also puts the project on sys.path)
+from src.components.data_transformation import DataTransformation, DataTransformationConfig  # Import the preprocessor factory
+from src.components.model_registry import MODEL_REGISTRY, create_model  # Import the model registry
+from src.components.model_search import ModelSearchConfig  # Import search settings
+from src.utils import evaluate_models  # Import the trainer's model evaluation
+
+
+def training_arrays(n_rows, seed):
+    data = common.make_dataset(n_rows, seed=seed)
+    target = DataTransformationConfig.target_column_name
+    X = DataTransformation().get_data_transformer_object().fit_transform(data.drop(columns=[target]))
+    y = data[target].to_numpy(dtype=float)
+    split = int(n_rows * 0.8)  # Same 80/20 split as data ingestion
+    return X[:split], y[:split], X[split:], y[split:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_common_arguments(parser, "1000,10000")
+    parser.add_argument("--models", default=",".join(MODEL_REGISTRY), help="comma separated registry names")
+    parser.add_argument("--no-search", action="store_true", help="skip the evaluate_models timing")
+    args = parser.parse_args()
+
+    search_config = ModelSearchConfig(n_jobs=1, cache_dir="")  # Single core, no cached results
+    results = []
+    for n_rows in common.parse_sizes(args.sizes):
+        X_train, y_train, X_test, y_test = training_arrays(n_rows, args.seed)
+        for name in args.models.split(","):
+            model = create_model(name)
+            fit_seconds = common.best_of(lambda: model.fit(X_train, y_train), repeat=1)
+            predict_seconds = common.best_of(lambda: model.predict(X_test))
+            metrics = {
+                "fit_seconds": round(fit_seconds, 4),
+                "fit_rows_per_s": round(len(X_train) / fit_seconds, 1),
+                "predict_seconds": round(predict_seconds, 4),
+                "predict_rows_per_s": round(len(X_test) / predict_seconds, 1),
+            }
+            if not args.no_search:
+                metrics["evaluate_models_seconds"] = round(common.best_of(lambda: evaluate_models(
+                    X_train, y_train, X_test, y_test, {name: create_model(name)}, {name: {}}, search_config=search_config,
+                ), repeat=1), 4)
+            results.append(common.result("fit", {"model": name, "rows": n_rows, "features": X_train.shape[1]}, metrics))
+            print(f"fit {name} rows={n_rows}: {metrics}")
+
+    common.save_results("fit", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+'''
+Prediction latency and throughput of PredictPipeline with the served artifacts.
+
+* single: one-row predict calls, as made by the /predictdata form, with latency percentiles,
+* batch: predict_batches over generated datasets of each size, in rows per second.
+
+Needs trained artifacts in artifacts/. The result records which model and transformer
+classes served the calls (prediction table, compiled or fitted library objects).
+
+    python benchmarks/bench_predict.py --sizes 1000,100000,1e6
+'''
+import sys  # Import sys for the exit status
+import time  # Import time for wall-clock timers
+import argparse  # Import argparse for command line options
+
+import common  # Import the shared benchmark helpers (also puts the project on sys.path)
+from src.pipeline.predict_pipeline import (
+    PredictPipeline, CustomData, INPUT_COLUMNS, BATCH_CHUNK_SIZE, get_model, get_transformer, get_prediction_table,
+    category_codes,
+)  # Import the serving pipeline
+
+
+def served_by(pipeline):
+    bundle = pipeline.cache.get()
+    table = get_prediction_table(bundle)
+    return {
+        "model": type(get_model(bundle)).__name__,
+        "transformer": type(get_transformer(bundle)).__name__,
+        "prediction_table": table is not None,
+        "artifact_version": bundle.version,
+    }  # What actually answered the calls
+
+
+def bench_single(pipeline, repeat):
+    record = CustomData("female", "group B", "bachelor's degree", "standard", "none", 72, 74)
+    frame = record.get_data_as_data_frame()
+    seconds = common.time_calls(lambda: pipeline.predict(frame), repeat)
+    fractional = frame.astype({"reading_score": float, "writing_score": float}).assign(reading_score=72.5)
+    miss_seconds = common.time_calls(lambda: pipeline.predict(fractional), repeat)  # Never in a prediction table
+    vocabulary = category_codes(get_transformer(pipeline.cache.get()))
+    frame_seconds = common.time_calls(lambda: pipeline.predict(record.get_data_as_data_frame()), repeat)
+    batch_seconds = common.time_calls(lambda: pipeline.predict(record.to_batch(vocabulary)), repeat)  # As the routes build it
+    return [
+        common.result("single_predict", {"rows": 1}, common.summarize(seconds)),
+        common.result("single_predict_live", {"rows": 1}, common.summarize(miss_seconds)),
+        common.result("single_predict_from_dataframe", {"rows": 1}, common.summarize(frame_seconds)),
+        common.result("single_predict_from_feature_batch", {"rows": 1}, common.summarize(batch_seconds)),
+    ]
+
+
+def bench_batch(pipeline, sizes, seed):
+    results = []
+    for n_rows in sizes:
+        chunks = list(common.iter_dataset(n_rows, chunk_rows=BATCH_CHUNK_SIZE, seed=seed))  # Generated before timing
+        chunks = [chunk[INPUT_COLUMNS] for chunk in chunks]
+
+        def run():
+            for _ in pipeline.predict_batches(iter(chunks)):
+                pass  # Consume the generator, as the streaming response does
+
+        seconds = common.best_of(run, repeat=3 if n_rows <= 1_000_000 else 1)
+        results.append(common.result("batch_predict", {"rows": n_rows, "chunk_rows": BATCH_CHUNK_SIZE}, {
+            "seconds": round(seconds, 4),
+            "rows_per_s": round(n_rows / seconds, 1),
+            "us_per_row": round(seconds / n_rows * 1e6, 3),
+        }))
+        print(f"batch_predict rows={n_rows}: {n_rows / seconds:,.0f} rows/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_common_arguments(parser, "1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=2000, help="single-row predict calls to time")
+    args = parser.parse_args()
+
+    pipeline = PredictPipeline()
+    start = time.perf_counter()
+    pipeline.predict(CustomData("male", "group C", "some college", "standard", "none", 60, 60).get_data_as_data_frame())
+    first_seconds = time.perf_counter() - start  # Includes loading the artifacts
+
+    results = [common.result("first_predict", {"rows": 1}, {"seconds": round(first_seconds, 4)})]
+    results += bench_single(pipeline, args.repeat)
+    results += bench_batch(pipeline, common.parse_sizes(args.sizes), args.seed)
+    results.append(common.result("served_by", {}, served_by(pipeline)))  # Context for reading the numbers
+    common.save_results("predict", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+'''
+End-to-end request throughput and latency of the Flask app with a local load generator.
+
+Starts app.py in a child process on a free local port (or targets --url), then runs a
+closed loop of --concurrency clients for --duration seconds per scenario:
+
+* form: POST /predictdata with one student, as submitted by the HTML form,
+* batch: POST /predictbatch with a JSON array of --batch-rows generated students.
+
+Reports requests and rows per second, latency percentiles and non-200 responses.
+Needs trained artifacts in artifacts/.
+
+    python benchmarks/bench_serving.py --concurrency 1,8,32 --duration 10
+'''
+import sys  # Import sys for the exit status and the child interpreter
+import json  # Import json for the batch request body
+import time  # Import time for wall-clock timers
+import socket  # Import socket to find a free port
+import argparse  # Import argparse for command line options
+import threading  # Import threading for the client threads
+import subprocess  # Import subprocess to run the server in its own process
+import http.client  # Import http.client for a dependency-free HTTP client
+from urllib.parse import urlencode, urlsplit  # Import to build the form body and read --url
+
+import common  # Import the shared benchmark helpers (also puts the project on sys.path)
+
+# Runs in the child interpreter: the app behind the threaded development server
+SERVER = '''
+import os, sys
+from werkzeug.serving import make_server
+from app import app
+server = make_server("127.0.0.1", {port}, app, threaded=True)
+print("ready", flush=True)
+sys.stdout = sys.stderr = open(os.devnull, "w")  # Request logs and debug prints would fill the pipe
+server.serve_forever()
+'''
+
+FORM = {
+    "gender": "female",
+    "ethnicity": "group B",
+    "parental_level_of_education": "bachelor's degree",
+    "lunch": "standard",
+    "test_preparation_course": "none",
+    "reading_score": "72",
+    "writing_score": "74",
+}  # Field names used by templates/home.html
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server():
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(port=port)], cwd=common.PROJECT_ROOT,
+        stdout=subprocess.PIPE, text=True,  # Startup errors still reach our stderr
+    )
+    if process.stdout.readline().strip() != "ready":
+        process.kill()
+        raise RuntimeError("Flask app did not start")
+    return process, f"http://127.0.0.1:{port}"
+
+
+def batch_body(batch_rows, seed):
+    frame = common.make_dataset(batch_rows, seed=seed).drop(columns=["math_score"])
+    return json.dumps(frame.to_dict(orient="records"))
+
+
+def run_load(url, method_path, body, headers, concurrency, duration):
+    '''
+    Closed loop: each client sends its next request as soon as the previous one is
+    answered, until duration has passed. Returns (latencies in seconds, status counts, elapsed).
+    '''
+    parts = urlsplit(url)
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        own_latencies, own_statuses = [], {}
+        while time.perf_counter() < deadline:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            start = time.perf_counter()
+            try:
+                connection.request("POST", method_path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()  # Streamed responses count once fully received
+                status = response.status
+            except OSError:
+                status = "error"
+            finally:
+                connection.close()
+            own_latencies.append(time.perf_counter() - start)
+            own_statuses[status] = own_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(own_latencies)
+            for status, count in own_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="benchmark a running server instead of starting app.py")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated numbers of concurrent clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario and concurrency")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="students per /predictbatch request")
+    parser.add_argument("--scenarios", default="form,batch", help="comma separated scenarios to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated batch")
+    parser.add_argument("--output", default=None, help="result file, default benchmarks/results/<commit>/serving.json")
+    args = parser.parse_args()
+
+    scenarios = {
+        "form": ("/predictdata", urlencode(FORM), {"Content-Type": "application/x-www-form-urlencoded"}, 1),
+        "batch": ("/predictbatch", batch_body(args.batch_rows, args.seed), {"Content-Type": "application/json"}, args.batch_rows),
+    }
+    process, url = (None, args.url) if args.url else start_server()
+    results = []
+    try:
+        for name in args.scenarios.split(","):
+            path, body, headers, rows = scenarios[name]
+            run_load(url, path, body, headers, 1, min(1.0, args.duration))  # Warm up: artifacts, batcher thread
+            for concurrency in [int(value) for value in args.concurrency.split(",")]:
+                latencies, statuses, elapsed = run_load(url, path, body, headers, concurrency, args.duration)
+                metrics = common.summarize(latencies)
+                metrics["requests_per_s"] = round(len(latencies) / elapsed, 1)
+                metrics["rows_per_s"] = round(len(latencies) * rows / elapsed, 1)
+                metrics["failed"] = sum(count for status, count in statuses.items() if status != 200)
+                results.append(common.result(name, {"path": path, "rows": rows, "concurrency": concurrency}, metrics))
+                print(f"{name} concurrency={concurrency}: {metrics['requests_per_s']} req/s, p99 {metrics['p99_ms']} ms")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    common.save_results("serving", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+'''
+Cold-start benchmark for the serving entry point.
+
+Imports the serving module (app by default) in fresh interpreters, reports the median
+import time and the heavy libraries that got imported, and exits with status 1 when
+import cost regresses:
+
+* a training-only library (xgboost, catboost, scikit-learn, ...) is imported at startup,
+* with --predict, serving one prediction imports a library the persisted model does not need,
+* the median import time exceeds --max-ms, or --tolerance above a saved --baseline.
+
+The medians are also saved as a result file like the other benchmarks, so run_suite.py
+runs this check and compare.py tracks import time across commits.
+
+Record a baseline once, then compare against it (e.g. in CI):
+
+    python benchmarks/bench_startup.py --baseline benchmarks/startup_baseline.json --save-baseline
+    python benchmarks/bench_startup.py --baseline benchmarks/startup_baseline.json --predict
+'''
+import os  # Import os for paths
+import sys  # Import sys to run the same interpreter in child processes
+import json  # Import json to exchange results with the child processes
+import argparse  # Import argparse for command line options
+import statistics  # Import statistics for the median
+import subprocess  # Import subprocess to measure truly cold imports
+
+import common  # Import the shared benchmark helpers
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # Serving runs from here
+STARTUP_FORBIDDEN = ["sklearn", "scipy", "xgboost", "catboost", "dill", "joblib"]  # Nothing model-specific at import
+PREDICT_FORBIDDEN = ["sklearn", "xgboost", "catboost", "dill"]  # Unless the persisted artifacts need it
+
+# Runs in the child interpreter: time the import, optionally serve one prediction
+CHILD = '''
+import sys, time, json
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+result = {{"seconds": seconds, "modules": sorted(sys.modules)}}
+if {predict}:
+    from src.pipeline.predict_pipeline import PredictPipeline, CustomData, get_model, get_transformer
+    pipeline = PredictPipeline()
+    start = time.perf_counter()
+    pipeline.predict(CustomData("female", "group B", "bachelor's degree", "standard", "none", 72, 74).get_data_as_data_frame())
+    result["first_predict_seconds"] = time.perf_counter() - start
+    result["predict_modules"] = sorted(sys.modules)
+    bundle = pipeline.cache.get()
+    result["needed"] = sorted({{type(get_model(bundle)).__module__, type(get_transformer(bundle)).__module__}})
+print(json.dumps(result))
+'''
+
+
+def run_once(module, predict):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(module=module, predict=predict)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stdout  # Fresh interpreter, nothing cached in sys.modules
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def modules_needed_by(module_names):
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys, json\nimport {', '.join(module_names)}\nprint(json.dumps(sorted(sys.modules)))"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stdout  # Everything the artifact classes pull in on their own
+    return set(json.loads(output.strip().splitlines()[-1]))
+
+
+def loaded(modules, names):
+    return [name for name in names if name in modules]  # Forbidden names that were imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="serving module to import")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--predict", action="store_true", help="also serve one prediction (needs artifacts)")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail when the median import takes longer")
+    parser.add_argument("--baseline", default=None, help="JSON file with a previous median to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="write the measured median to --baseline")
+    parser.add_argument("--output", default=None, help="result file, default benchmarks/results/<commit>/startup.json")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module, args.predict) for _ in range(args.repeat)]
+    median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+    report = {
+        "module": args.module,
+        "repeat": args.repeat,
+        "median_import_ms": round(median_ms, 1),
+        "min_import_ms": round(min(run["seconds"] for run in runs) * 1000, 1),
+        "startup_forbidden_loaded": loaded(runs[0]["modules"], STARTUP_FORBIDDEN),
+    }
+    failures = [f"imported at startup: {name}" for name in report["startup_forbidden_loaded"]]
+
+    if args.predict:
+        needed = modules_needed_by(runs[0]["needed"])  # Modules of the persisted model and preprocessor classes
+        report["median_first_predict_ms"] = round(statistics.median(run["first_predict_seconds"] for run in runs) * 1000, 1)
+        report["artifact_modules"] = runs[0]["needed"]
+        report["predict_forbidden_loaded"] = [
+            name for name in loaded(runs[0]["predict_modules"], PREDICT_FORBIDDEN) if name not in needed
+        ]
+        failures += [f"imported but not needed by the artifacts: {name}" for name in report["predict_forbidden_loaded"]]
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        failures.append(f"median import {median_ms:.0f} ms is over the {args.max_ms:.0f} ms limit")
+    if args.baseline:
+        if args.save_baseline:
+            with open(args.baseline, "w") as file_obj:
+                json.dump({"module": args.module, "median_import_ms": report["median_import_ms"]}, file_obj, indent=2)
+        elif os.path.exists(args.baseline):
+            with open(args.baseline) as file_obj:
+                baseline_ms = json.load(file_obj)["median_import_ms"]
+            report["baseline_import_ms"] = baseline_ms
+            if median_ms > baseline_ms * (1 + args.tolerance):
+                failures.append(f"median import {median_ms:.0f} ms regressed from the {baseline_ms:.0f} ms baseline")
+
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    metrics = {key: report[key] for key in ("median_import_ms", "min_import_ms", "median_first_predict_ms") if key in report}
+    metrics["failed"] = len(failures)  # Forbidden imports and limits, not compared as a speed
+    common.save_results("startup", [common.result("import", {"module": args.module, "predict": args.predict}, metrics)], args.output)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
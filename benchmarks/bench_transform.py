@@ -0,0 +1,75 @@
+'''
+Transform throughput of the DataTransformation preprocessor, in rows per second.
+
+For each dataset size the fitted ColumnTransformer and its compiled NumPy-only form
+transform the generated rows chunk by chunk (only the transform calls are timed, so
+datasets larger than memory work too). fit_transform is timed on the same data up to
+--max-fit-rows. Nothing in artifacts/ is read or written.
+
+    python benchmarks/bench_transform.py --sizes 1000,1e6,1e7
+'''
+import sys  # Import sys for the exit status
+import time  # Import time for wall-clock timers
+import argparse  # Import argparse for command line options
+
+import common  # Import the shared benchmark helpers (also puts the project on sys.path)
+from src.components.data_transformation import DataTransformation, DataTransformationConfig  # Import the preprocessor factory
+from src.components.compiled_preprocessor import compile_preprocessor  # Import the NumPy-only preprocessor export
+
+
+def fitted_transformers(seed):
+    sample = common.make_dataset(10_000, seed=seed + 1)  # Fitting data, not one of the timed datasets
+    target = DataTransformationConfig.target_column_name
+    preprocessor = DataTransformation().get_data_transformer_object()
+    preprocessor.fit(sample.drop(columns=[target]))
+    return {"column_transformer": preprocessor, "compiled": compile_preprocessor(preprocessor)}
+
+
+def time_transform(transformer, n_rows, chunk_rows, seed):
+    target = DataTransformationConfig.target_column_name
+    seconds = 0.0
+    for chunk in common.iter_dataset(n_rows, chunk_rows=chunk_rows, seed=seed):
+        features = chunk.drop(columns=[target])
+        start = time.perf_counter()
+        transformer.transform(features)
+        seconds += time.perf_counter() - start  # Generation is not part of the measurement
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common.add_common_arguments(parser, "1000,10000,100000,1000000")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="rows per transform call")
+    parser.add_argument("--max-fit-rows", type=int, default=1_000_000, help="largest dataset to time fit_transform on")
+    args = parser.parse_args()
+
+    transformers = fitted_transformers(args.seed)
+    target = DataTransformationConfig.target_column_name
+    results = []
+    for n_rows in common.parse_sizes(args.sizes):
+        chunk_rows = min(args.chunk_rows, n_rows)
+        for name, transformer in transformers.items():
+            seconds = min(
+                time_transform(transformer, n_rows, chunk_rows, args.seed) for _ in range(3 if n_rows <= 100_000 else 1)
+            )  # Best of three for the small sizes
+            results.append(common.result("transform", {"implementation": name, "rows": n_rows, "chunk_rows": chunk_rows}, {
+                "seconds": round(seconds, 4),
+                "rows_per_s": round(n_rows / seconds, 1),
+                "us_per_row": round(seconds / n_rows * 1e6, 4),
+            }))
+            print(f"transform {name} rows={n_rows}: {n_rows / seconds:,.0f} rows/s")
+
+        if n_rows <= args.max_fit_rows:
+            features = common.make_dataset(n_rows, seed=args.seed).drop(columns=[target])
+            seconds = common.best_of(lambda: DataTransformation().get_data_transformer_object().fit_transform(features))
+            results.append(common.result("fit_transform", {"implementation": "column_transformer", "rows": n_rows}, {
+                "seconds": round(seconds, 4),
+                "rows_per_s": round(n_rows / seconds, 1),
+            }))
+
+    common.save_results("transform", results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
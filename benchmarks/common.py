@@ -0,0 +1,145 @@
+'''
+Shared pieces of the benchmark suite: synthetic datasets scaled from the student data,
+timing helpers and the JSON result files that are compared across commits.
+'''
+import os  # Import os for paths
+import sys  # Import sys to make the project importable
+import json  # Import json to store results
+import time  # Import time for wall-clock timers
+import platform  # Import platform to record the machine
+import subprocess  # Import subprocess to read the current commit
+
+import numpy as np  # Import numpy for sampling and percentiles
+import pandas as pd  # Import pandas to build the datasets
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # Artifacts are relative to here
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)  # So that 'from src...' works when run as a script
+os.chdir(PROJECT_ROOT)  # The pipelines use paths relative to the project root
+
+SOURCE_DATA = os.path.join(PROJECT_ROOT, "notebook", "data", "stud.csv")  # Real rows the synthetic data is sampled from
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")  # One JSON file per benchmark run
+SCORE_COLUMNS = ["math_score", "reading_score", "writing_score"]  # Integer scores between 0 and 100
+GENERATION_CHUNK = 1_000_000  # Rows generated at a time, bounds memory for the 10M dataset
+
+
+def iter_dataset(n_rows, chunk_rows=GENERATION_CHUNK, seed=0):
+    '''
+    Yields DataFrames with n_rows in total, shaped like stud.csv. Rows are drawn with
+    replacement from the real data, so category combinations keep their frequencies and
+    correlations; the three scores move together by one shared noise term plus a small
+    independent one, and stay integers in 0..100. The same seed gives the same data.
+    '''
+    source = pd.read_csv(SOURCE_DATA)
+    rng = np.random.default_rng(seed)
+    produced = 0
+    while produced < n_rows:
+        size = min(chunk_rows, n_rows - produced)
+        frame = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)  # Bootstrap sample
+        shared = rng.normal(0, 4, size)  # Ability shift applied to every score of a student
+        for col in SCORE_COLUMNS:
+            noisy = frame[col].to_numpy() + shared + rng.normal(0, 2, size)
+            frame[col] = np.clip(np.rint(noisy), 0, 100).astype(np.int64)
+        produced += size
+        yield frame
+
+
+def make_dataset(n_rows, seed=0):
+    return pd.concat(iter_dataset(n_rows, seed=seed), ignore_index=True)  # Whole dataset in memory
+
+
+def parse_sizes(text, limit=None):
+    sizes = [int(float(size)) for size in text.split(",")]  # Accepts 1e6 as well as 1000000
+    return [size for size in sizes if limit is None or size <= limit]
+
+
+def summarize(seconds):
+    '''
+    Latency summary in milliseconds of a list of per-call durations in seconds.
+    '''
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+def time_calls(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()  # Loads artifacts, fills caches
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def best_of(fn, repeat=3):
+    seconds = time_calls(fn, repeat, warmup=0)
+    return min(seconds)  # Least disturbed run
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT, capture_output=True, text=True
+        ).stdout.strip())  # Uncommitted changes make the commit label approximate
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = "unknown", False
+    versions = {}
+    for name in ["numpy", "pandas", "sklearn", "xgboost", "catboost", "flask"]:
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, "__version__", None)  # Only libraries the benchmark actually used
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def results_dir(env=None):
+    env = env or environment()
+    return os.path.join(RESULTS_DIR, env["commit"] + ("-dirty" if env["dirty"] else ""))  # One directory per commit
+
+
+def save_results(benchmark, results, output=None):
+    '''
+    Writes {benchmark, created, environment, results} to output, by default
+    benchmarks/results/<commit>/<benchmark>.json, and returns the path.
+    '''
+    env = environment()
+    report = {
+        "benchmark": benchmark,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": env,
+        "results": results,
+    }
+    if output is None:
+        output = os.path.join(results_dir(env), f"{benchmark}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file_obj:
+        json.dump(report, file_obj, indent=2)
+    print(f"Saved {len(results)} {benchmark} results to {os.path.relpath(output)}")
+    return output
+
+
+def result(name, params, metrics):
+    return {"name": name, "params": params, "metrics": metrics}  # One measured case
+
+
+def add_common_arguments(parser, sizes):
+    parser.add_argument("--sizes", default=sizes, help="comma separated dataset sizes, e.g. 1000,1e6")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated datasets")
+    parser.add_argument("--output", default=None, help="result file, default benchmarks/results/<commit>/<name>.json")
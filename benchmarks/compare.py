@@ -0,0 +1,80 @@
+'''
+Compares two benchmark result sets, e.g. the runs of two commits:
+
+    python benchmarks/compare.py benchmarks/results/abc1234 benchmarks/results/def5678
+
+Each argument is a result JSON file or a directory of them. Cases are matched by
+benchmark, name and params; for every numeric metric both values and the relative
+change are printed. Metrics measured in time (seconds, *_ms) regress when they grow,
+rates (*_per_s) when they shrink. Exits with status 1 when any metric regressed by
+more than --tolerance. Only compare runs from the same idle machine; on small or
+shared machines run-to-run noise can exceed the default tolerance.
+'''
+import os  # Import os for paths
+import sys  # Import sys for the exit status
+import json  # Import json to read results
+import argparse  # Import argparse for command line options
+
+IGNORED_METRICS = {"count", "failed"}  # Depend on the run length, not on speed
+
+
+def load_results(path):
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json")
+    )
+    cases = {}
+    for file_path in files:
+        with open(file_path) as file_obj:
+            report = json.load(file_obj)
+        for item in report["results"]:
+            key = (report["benchmark"], item["name"], json.dumps(item["params"], sort_keys=True))
+            cases[key] = item["metrics"]
+    return cases
+
+
+def direction(metric):
+    if metric.endswith("_per_s"):
+        return -1  # Higher is better
+    if metric.endswith("_ms") or metric.endswith("seconds") or metric.startswith("us_per"):
+        return 1  # Lower is better
+    return 0  # Not a speed metric
+
+
+def compare(old, new, tolerance):
+    rows, regressions = [], []
+    for key in sorted(old.keys() & new.keys()):
+        for metric, old_value in old[key].items():
+            new_value = new[key].get(metric)
+            if metric in IGNORED_METRICS or not direction(metric) or not isinstance(old_value, (int, float)):
+                continue
+            if not isinstance(new_value, (int, float)) or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = change * direction(metric) > tolerance
+            rows.append((key, metric, old_value, new_value, change, worse))
+            if worse:
+                regressions.append((key, metric))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="baseline result file or directory")
+    parser.add_argument("new", help="result file or directory to check")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    old, new = load_results(args.old), load_results(args.new)
+    rows, regressions = compare(old, new, args.tolerance)
+    for (benchmark, name, params), metric, old_value, new_value, change, worse in rows:
+        flag = "REGRESSED" if worse else ""
+        print(f"{benchmark:9} {name:20} {params:60} {metric:22} {old_value:>14} -> {new_value:<14} {change:+8.1%} {flag}")
+    unmatched = len(old.keys() ^ new.keys())
+    if unmatched:
+        print(f"{unmatched} cases exist in only one of the result sets")
+    print(f"{len(regressions)} of {len(rows)} metrics regressed by more than {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+'''
+Runs the whole benchmark suite, each benchmark in its own interpreter, and stores the
+JSON results under benchmarks/results/<commit>/ (or --output-dir):
+
+    python benchmarks/run_suite.py                    # quick sizes, about a minute
+    python benchmarks/run_suite.py --full             # up to 10M rows, takes a long while
+    python benchmarks/compare.py benchmarks/results/<old> benchmarks/results/<new>
+
+Generated datasets are deterministic (fixed seed), so two commits measured on the same
+machine see the same data.
+'''
+import os  # Import os for paths
+import sys  # Import sys to run the same interpreter
+import argparse  # Import argparse for command line options
+import subprocess  # Import subprocess to isolate the benchmarks from each other
+
+import common  # Import the shared benchmark helpers
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))  # Where the benchmark scripts live
+
+# Benchmark -> (quick arguments, full arguments)
+SUITE = {
+    "predict": (["--sizes", "1000,10000,100000", "--repeat", "1000"], ["--sizes", "1000,100000,1000000,10000000"]),
+    "transform": (["--sizes", "1000,10000,100000"], ["--sizes", "1000,10000,100000,1000000,10000000"]),
+    "fit": (["--sizes", "1000"], ["--sizes", "1000,10000,100000"]),
+    "serving": (["--concurrency", "1,8", "--duration", "3"], ["--concurrency", "1,8,32,64", "--duration", "15"]),
+    "startup": (["--repeat", "3", "--predict"], ["--repeat", "10", "--predict"]),  # Fails when serving imports training libraries
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="use the large dataset sizes")
+    parser.add_argument("--only", default=",".join(SUITE), help="comma separated benchmarks to run")
+    parser.add_argument("--output-dir", default=None, help="default benchmarks/results/<commit>")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or common.results_dir()
+    failed = []
+    for name in args.only.split(","):
+        quick, full = SUITE[name]
+        command = [sys.executable, os.path.join(BENCHMARK_DIR, f"bench_{name}.py"), *(full if args.full else quick)]
+        command += ["--output", os.path.join(output_dir, f"{name}.json")]
+        print(f"== {name}", flush=True)
+        if subprocess.run(command, cwd=common.PROJECT_ROOT).returncode != 0:
+            failed.append(name)
+    if failed:
+        print(f"Failed benchmarks: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import json  # Import json for the array manifest and table metadata
+
+import numpy as np  # Import numpy for numerical operations
+import pandas as pd  # Import pandas for data manipulation
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+
+try:
+    import pyarrow as pa  # Optional: typed binary tables (Parquet and Feather)
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None  # Tables fall back to CSV
+
+SCHEMA_VERSION = 1  # Bumped whenever the layout of the artifacts changes
+METADATA_KEY = b"src.artifact"  # Schema metadata key holding the artifact header in binary tables
+MANIFEST_NAME = "manifest.json"  # Header written next to the .npy arrays
+TABLE_EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}  # Table format -> file extension
+
+
+def resolve_table_format(table_format):
+    '''
+    Returns the table format that can actually be written here, falling back to CSV
+    when pyarrow is not installed.
+    '''
+    if table_format not in TABLE_EXTENSIONS:
+        raise ValueError(f"Unknown table format {table_format!r}, expected one of {sorted(TABLE_EXTENSIONS)}")
+    if table_format != "csv" and pa is None:
+        logging.warning(f"pyarrow is not installed, writing CSV instead of {table_format}")
+        return "csv"
+    return table_format
+
+
+def table_path(file_path, table_format):
+    return os.path.splitext(file_path)[0] + TABLE_EXTENSIONS[table_format]  # Same name, format extension
+
+
+def _table_format(file_path):
+    extension = os.path.splitext(file_path)[1]
+    for table_format, known in TABLE_EXTENSIONS.items():
+        if extension == known:
+            return table_format
+    return "csv"  # Anything else is read as CSV like before
+
+
+def _header(columns):
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "columns": {str(name): str(dtype) for name, dtype in columns.items()},  # Column name -> dtype
+    }
+
+
+def _check_header(file_path, header):
+    if header is None:
+        raise ValueError(f"{file_path} has no artifact header")
+    if header.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"{file_path} has schema version {header.get('schema_version')}, expected {SCHEMA_VERSION}")
+
+
+class TableWriter:
+    '''
+    Writes a table one DataFrame chunk at a time to a temporary file and atomically
+    swaps it in on close(). Parquet and Feather files carry a header with the schema
+    version and column dtypes in their schema metadata; every chunk must fit the schema
+    given to the writer (see table_schema), or the dtypes of the first chunk without one.
+    '''
+
+    def __init__(self, file_path, schema=None):
+        self.file_path = file_path  # Final path, its extension selects the format
+        self.table_format = _table_format(file_path)
+        self.tmp_path = f"{file_path}.tmp.{os.getpid()}"  # Written here until close()
+        self.rows = 0  # Rows written so far
+        self._writer = None  # Parquet or Feather writer, opened on the first chunk
+        self._schema = schema  # Arrow schema of every chunk, inferred from the first chunk when None
+
+    def write(self, df):
+        if self.table_format == "csv":
+            df.to_csv(self.tmp_path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)  # Index is not data
+            if self._writer is None:
+                metadata = dict(table.schema.metadata or {})
+                metadata[METADATA_KEY] = json.dumps(_header(df.dtypes)).encode()  # Schema/version header
+                self._schema = table.schema.with_metadata(metadata)
+                table = table.replace_schema_metadata(metadata)
+                if self.table_format == "parquet":
+                    self._writer = pq.ParquetWriter(self.tmp_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.tmp_path, self._schema)  # Feather v2 is the Arrow IPC file format
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self.tmp_path, self.file_path)  # Atomically publish the table
+        return self.file_path
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)  # Never leave partial outputs behind
+
+
+def table_schema(columns, numeric_columns):
+    '''
+    Arrow schema with numeric_columns as float64 and every other column as text, so that
+    chunks whose slices are empty or all-blank still get the same types.
+    '''
+    if pa is None:
+        return None  # Only CSV can be written
+    return pa.schema([(str(col), pa.float64() if col in numeric_columns else pa.string()) for col in columns])
+
+
+def save_table(df, file_path):
+    '''
+    Saves a DataFrame in the format given by the file extension (.parquet, .feather or .csv).
+    '''
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)  # Create the directory if it doesn't exist
+        writer = TableWriter(file_path)
+        try:
+            writer.write(df)
+            return writer.close()
+        except Exception:
+            writer.abort()
+            raise
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def load_table(file_path):
+    '''
+    Loads a table saved by save_table. Binary tables are memory-mapped and their header
+    is checked; anything else is parsed as CSV.
+    '''
+    try:
+        table_format = _table_format(file_path)
+        if table_format == "csv":
+            return pd.read_csv(file_path)
+        if pa is None:
+            raise ImportError(f"pyarrow is required to read {file_path}")
+        if table_format == "parquet":
+            table = pq.read_table(file_path, memory_map=True)
+        else:
+            table = feather.read_table(file_path, memory_map=True)  # Columns point into the mapped file
+        header = (table.schema.metadata or {}).get(METADATA_KEY)
+        _check_header(file_path, json.loads(header) if header else None)
+        return table.to_pandas()
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def iter_table(file_path, chunk_rows):
+    '''
+    Yields a table saved by save_table or TableWriter as DataFrames of at most
+    chunk_rows rows, so it never has to fit in memory at once. Binary tables are
+    memory-mapped and their header is checked.
+    '''
+    try:
+        table_format = _table_format(file_path)
+        if table_format == "csv":
+            yield from pd.read_csv(file_path, chunksize=chunk_rows)
+            return
+        if pa is None:
+            raise ImportError(f"pyarrow is required to read {file_path}")
+        if table_format == "parquet":
+            parquet_file = pq.ParquetFile(file_path, memory_map=True)
+            batches = parquet_file.iter_batches(batch_size=chunk_rows)
+            schema = parquet_file.schema_arrow
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(file_path))  # Feather v2 is the Arrow IPC file format
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            schema = reader.schema
+        header = (schema.metadata or {}).get(METADATA_KEY)
+        _check_header(file_path, json.loads(header) if header else None)
+        for batch in batches:
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows).to_pandas()  # Slices of a mapped batch copy nothing
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+class ArrayWriter:
+    '''
+    Builds the same array set as save_arrays when the arrays do not fit in memory:
+    create() returns a writable memory-mapped .npy of a known shape that the caller
+    fills in chunks, and close() publishes the set with its manifest.
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory  # Destination of the array set
+        self._arrays = {}  # Name -> (memmap, temporary path)
+
+    def create(self, name, shape, dtype=np.float64):
+        os.makedirs(self.directory, exist_ok=True)  # Create the directory if it doesn't exist
+        tmp_path = os.path.join(self.directory, f"{name}.npy.tmp.{os.getpid()}")
+        array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=tuple(shape))  # Allocated on disk, not in RAM
+        self._arrays[name] = (array, tmp_path)
+        return array
+
+    def close(self, metadata=None):
+        try:
+            arrays = {}
+            for name, (array, tmp_path) in self._arrays.items():
+                array.flush()
+                file_path = os.path.join(self.directory, f"{name}.npy")
+                os.replace(tmp_path, file_path)
+                arrays[name] = {"file": f"{name}.npy", "dtype": array.dtype.str, "shape": list(array.shape)}
+            _publish_manifest(self.directory, arrays, metadata)
+            logging.info(f"Saved arrays {list(arrays)} to {self.directory}")
+            return self.directory
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def abort(self):
+        for _, tmp_path in self._arrays.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)  # Never leave partial outputs behind
+
+
+def save_arrays(directory, arrays, metadata=None):
+    '''
+    Saves each array as its own .npy file plus a manifest.json header with the schema
+    version, the dtype and shape of every array and free-form metadata. The manifest is
+    written last, so load_arrays detects a set that was only partly rewritten.
+    '''
+    try:
+        os.makedirs(directory, exist_ok=True)  # Create the directory if it doesn't exist
+        manifest = {"arrays": {}}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)  # No copy when already C-ordered
+            file_path = os.path.join(directory, f"{name}.npy")
+            tmp_path = f"{file_path}.tmp.{os.getpid()}"
+            with open(tmp_path, "wb") as file_obj:
+                np.save(file_obj, array, allow_pickle=False)  # Plain numeric data only
+            os.replace(tmp_path, file_path)
+            manifest["arrays"][name] = {"file": f"{name}.npy", "dtype": array.dtype.str, "shape": list(array.shape)}
+
+        _publish_manifest(directory, manifest["arrays"], metadata)
+        logging.info(f"Saved arrays {list(arrays)} to {directory}")
+        return directory
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def _publish_manifest(directory, arrays, metadata):
+    manifest = {"schema_version": SCHEMA_VERSION, "arrays": arrays, "metadata": metadata or {}}
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w") as file_obj:
+        json.dump(manifest, file_obj, indent=2)
+    os.replace(tmp_path, manifest_path)  # Publishing the manifest publishes the set
+    for name in os.listdir(directory):
+        if name.endswith(".npy") and name[:-4] not in arrays:
+            os.remove(os.path.join(directory, name))  # Array of a previous set that is no longer listed
+
+
+def load_arrays(directory, mmap_mode="r"):
+    '''
+    Loads the arrays saved by save_arrays, memory-mapped read-only by default so nothing
+    is copied until a page is touched. Returns (arrays, metadata).
+    '''
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as file_obj:
+            manifest = json.load(file_obj)
+        _check_header(directory, manifest)
+        arrays = {}
+        for name, spec in manifest["arrays"].items():
+            array = np.load(os.path.join(directory, spec["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+            if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+                raise ValueError(
+                    f"{spec['file']} is {array.dtype.str}{list(array.shape)}, manifest says {spec['dtype']}{spec['shape']}"
+                )  # File replaced without rewriting the manifest
+            arrays[name] = array
+        return arrays, manifest["metadata"]
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
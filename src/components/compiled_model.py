@@ -0,0 +1,301 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import json  # Import json to read the XGBoost and CatBoost model dumps
+import tempfile  # Import tempfile for the CatBoost JSON export
+
+import numpy as np  # Import numpy for numerical operations
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.components.artifact_store import save_arrays, load_arrays  # Import the memory-mapped array store
+
+FORMAT_VERSION = 1  # Bumped whenever the saved layout changes
+ROWS_PER_BLOCK = 1 << 18  # Rows x trees evaluated at once, bounds the temporary index arrays
+SCALAR_WALK_LIMIT = 8  # Up to this many rows x trees are walked in plain Python
+
+
+class CompiledModel:
+    '''
+    NumPy-only equivalent of a fitted regressor picked by ModelTrainer.
+
+    kind "trees" keeps every node of the ensemble in flat arrays with float32 thresholds
+    and leaf values (leaves point to themselves, so all trees are walked in lock step
+    for at most max_depth levels). kind "oblivious" keeps CatBoost's symmetric trees as one split
+    per level, so a leaf index is built from max_depth comparisons. kind "linear" is
+    a coefficient vector. Tree outputs are combined as base + sum(weight * leaf), or as
+    the weighted median AdaBoost uses.
+    '''
+
+    def __init__(self, kind, arrays, meta):
+        self.kind = kind  # "trees", "oblivious" or "linear"
+        self.arrays = arrays  # Name -> array, memory-mapped when loaded from disk
+        self.meta = meta  # Scalars: base, aggregation, max_depth, n_features, source model
+        self.source_digests = meta.get("source_digests", [])  # Hashes of the model files this was compiled from
+        self._node_lists = None  # Node arrays as Python lists, built on first use by the single-row path
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64 if self.kind == "linear" else np.float32)  # Trees see float32 like the tree libraries
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.meta["n_features"]:
+            raise ValueError(f"X has {X.shape[1]} features, the model expects {self.meta['n_features']}")
+        if self.kind == "linear":
+            return X @ self.arrays["coef"] + self.meta["base"]
+        X = np.ascontiguousarray(X)  # Row-major, so a row's features are adjacent in X.ravel()
+
+        n_trees = len(self.arrays["tree_weight"])
+        if self.kind == "trees" and X.shape[0] * n_trees <= SCALAR_WALK_LIMIT and not np.isnan(X).any():
+            return self._predict_scalar(X)  # A handful of tree walks, cheaper in plain Python
+        block = max(1, ROWS_PER_BLOCK // n_trees)
+        leaves = np.empty((X.shape[0], n_trees), dtype=np.float64)  # Output of every tree for every row
+        for start in range(0, X.shape[0], block):
+            rows = X[start:start + block]
+            if self.kind == "trees":
+                leaves[start:start + block] = self._leaf_values(rows)
+            else:
+                leaves[start:start + block] = self._oblivious_leaf_values(rows)
+
+        if self.meta["aggregation"] == "weighted_median":
+            return self._weighted_median(leaves)
+        return self.meta["base"] + leaves @ self.arrays["tree_weight"]  # Weighted sum of the tree outputs
+
+    def _leaf_values(self, X):
+        a = self.arrays  # feature, threshold, left child and default_left per node; the right child is left + 1
+        flat = X.ravel()
+        row_start = (np.arange(X.shape[0]) * X.shape[1])[:, None]  # Offset of each row in flat
+        node = np.repeat(a["tree_root"][None, :], X.shape[0], axis=0)  # Current node per row and tree
+        has_nan = np.isnan(flat).any()
+        for level in range(self.meta["max_depth"]):
+            x = flat[row_start + a["feature"][node]]  # Split feature value for each row and tree
+            if has_nan:
+                go_right = ~((x <= a["threshold"][node]) | (np.isnan(x) & a["default_left"][node]))  # Missing values follow the learned direction
+            else:
+                go_right = x > a["threshold"][node]  # Leaves have an infinite threshold and never move
+            node = a["left"][node] + go_right
+            if level % 4 == 3 and np.array_equal(a["left"][node], node):
+                break  # Every row reached a leaf in every tree
+        return a["value"][node]
+
+    def _predict_scalar(self, X):
+        if self._node_lists is None:
+            a = self.arrays
+            self._node_lists = (
+                a["feature"].tolist(), a["left"].tolist(), a["threshold"].astype(np.float64).tolist(),
+                a["value"].astype(np.float64).tolist(), a["tree_root"].tolist(), a["tree_weight"].tolist(),
+            )
+        feature, left, threshold, value, roots, weights = self._node_lists
+        preds = []
+        for row in X.tolist():  # float32 values, exactly representable as Python floats
+            leaves = []
+            for root in roots:
+                node = root
+                while left[node] != node:  # Leaves point to themselves
+                    node = left[node] + (row[feature[node]] > threshold[node])
+                leaves.append(value[node])
+            if self.meta["aggregation"] == "weighted_median":
+                preds.append(self._weighted_median(np.array([leaves]))[0])
+            else:
+                preds.append(self.meta["base"] + float(np.dot(leaves, weights)))
+        return np.array(preds)
+
+    def _oblivious_leaf_values(self, X):
+        a = self.arrays
+        index = np.zeros((X.shape[0], a["split_feature"].shape[0]), dtype=np.intp)  # Leaf index per row and tree
+        for level in range(a["split_feature"].shape[1]):
+            x = X[:, a["split_feature"][:, level]]  # (rows, trees) values of this level's split feature
+            index |= (x > a["split_border"][:, level]).astype(np.intp) << level
+        return a["leaf_value"][np.arange(index.shape[1]), index]
+
+    def _weighted_median(self, leaves):
+        weights = self.arrays["tree_weight"]
+        sorted_idx = np.argsort(leaves, axis=1)  # Same steps as AdaBoostRegressor._get_median_predict
+        weight_cdf = np.cumsum(weights[sorted_idx], axis=1, dtype=np.float64)
+        median_or_above = weight_cdf >= 0.5 * weight_cdf[:, -1][:, np.newaxis]
+        median_idx = median_or_above.argmax(axis=1)
+        rows = np.arange(leaves.shape[0])
+        return leaves[rows, sorted_idx[rows, median_idx]]
+
+    def save(self, directory):
+        try:
+            return save_arrays(directory, self.arrays, dict(self.meta, kind=self.kind, format_version=FORMAT_VERSION))
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    @classmethod
+    def load(cls, manifest_path):
+        try:
+            arrays, meta = load_arrays(os.path.dirname(manifest_path))  # Read-only memory maps, shared between workers
+            if meta.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported compiled model version {meta.get('format_version')}")
+            return cls(meta["kind"], arrays, meta)
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def compile_model(model, source_digests=None):
+    '''
+    Compiles the fitted model chosen by ModelTrainer into a CompiledModel.
+
+    Raises ValueError for model types or settings the compiled form cannot reproduce.
+    '''
+    name = type(model).__name__
+    meta = {"model_class": name, "source_digests": list(source_digests or []), "n_features": int(model.n_features_in_)}
+    if name in ("LinearRegression", "SGDRegressor"):
+        coef = np.ravel(model.coef_).astype(np.float64)
+        if coef.shape[0] != meta["n_features"]:
+            raise ValueError(f"Only single-output {name} can be compiled")
+        return CompiledModel("linear", {"coef": coef}, dict(meta, base=float(np.ravel(model.intercept_)[0]), aggregation="linear"))
+    if name == "DecisionTreeRegressor":
+        return _compile_sklearn_trees([model], np.ones(1), 0.0, "sum", meta)
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        trees = list(model.estimators_)
+        return _compile_sklearn_trees(trees, np.full(len(trees), 1.0 / len(trees)), 0.0, "sum", meta)
+    if name == "GradientBoostingRegressor":
+        return _compile_sklearn_trees(
+            [stage[0] for stage in model.estimators_], np.full(len(model.estimators_), model.learning_rate),
+            _gradient_boosting_init(model), "sum", meta,
+        )
+    if name == "AdaBoostRegressor":
+        trees = list(model.estimators_)
+        return _compile_sklearn_trees(trees, model.estimator_weights_[:len(trees)], 0.0, "weighted_median", meta)
+    if name == "XGBRegressor":
+        return _compile_xgboost(model, meta)
+    if name == "CatBoostRegressor":
+        return _compile_catboost(model, meta)
+    raise ValueError(f"Cannot compile {name}")
+
+
+def _float32_at_most(values):
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    too_big = rounded.astype(np.float64) > values
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))  # Largest float32 <= value
+    return rounded  # x32 <= threshold64 exactly when x32 <= rounded
+
+
+def _flat_trees(trees, meta, aggregation, weights, base):
+    '''
+    Concatenates per-tree node lists into the flat arrays CompiledModel walks.
+    Each tree is a dict of feature, threshold (float32, go left when x <= threshold),
+    left/right (-1 for leaves), value and default_left arrays. Nodes are renumbered
+    breadth first so that every right child directly follows its left sibling, and
+    leaves point to themselves with an infinite threshold.
+    '''
+    records, values, roots = [], [], []
+    max_depth = 0
+    for tree in trees:
+        start = len(records)
+        roots.append(start)
+        order, depths = [0], [0]  # Old node ids in new order, and their depth
+        for old, depth in zip(order, depths):  # The lists grow while iterating, breadth first
+            new = len(records)  # Position of this node in the flat arrays
+            if tree["left"][old] < 0:
+                records.append((0, new, np.inf, True))  # Leaf: stays put whatever the input
+            else:
+                left = start + len(order)  # Children are appended next to each other
+                order += [tree["left"][old], tree["right"][old]]
+                depths += [depth + 1, depth + 1]
+                records.append((tree["feature"][old], left, tree["threshold"][old], tree["default_left"][old]))
+            values.append(tree["value"][old])
+            max_depth = max(max_depth, depth)
+    feature, left, threshold, default_left = zip(*records)
+    arrays = {
+        "feature": np.asarray(feature, dtype=np.int64),  # 64-bit indexes need no conversion when gathering
+        "left": np.asarray(left, dtype=np.int64),
+        "threshold": np.asarray(threshold, dtype=np.float32),
+        "default_left": np.asarray(default_left, dtype=bool),
+        "value": np.asarray(values, dtype=np.float32),
+        "tree_root": np.asarray(roots, dtype=np.int64),
+        "tree_weight": np.asarray(weights, dtype=np.float64),
+    }
+    return CompiledModel("trees", arrays, dict(meta, base=float(base), aggregation=aggregation, max_depth=max_depth))
+
+
+def _compile_sklearn_trees(estimators, weights, base, aggregation, meta):
+    trees = []
+    for estimator in estimators:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output trees can be compiled")
+        trees.append({
+            "feature": tree.feature,
+            "threshold": _float32_at_most(tree.threshold),  # scikit-learn compares float32 X to float64 thresholds
+            "left": tree.children_left,
+            "right": tree.children_right,
+            "value": tree.value[:, 0, 0],
+            "default_left": getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8)),
+        })
+    return _flat_trees(trees, meta, aggregation, weights, base)
+
+
+def _gradient_boosting_init(model):
+    init = model.init_
+    if init == "zero":
+        return 0.0
+    if type(init).__name__ == "DummyRegressor":
+        return float(np.ravel(init.constant_)[0])  # Mean (or quantile) of the training target
+    raise ValueError(f"Cannot compile GradientBoostingRegressor with init={type(init).__name__}")
+
+
+def _compile_xgboost(model, meta):
+    learner = json.loads(model.get_booster().save_raw(raw_format="json"))["learner"]
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError("Only the gbtree booster can be compiled")
+    if learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError(f"Cannot compile objective {learner['objective']['name']}")
+    trees = []
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        if tree["categories_nodes"]:
+            raise ValueError("Categorical splits cannot be compiled")
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        trees.append({
+            "feature": np.asarray(tree["split_indices"]),
+            "threshold": np.nextafter(conditions, np.float32(-np.inf)),  # XGBoost goes left when x < condition
+            "left": np.asarray(tree["left_children"]),
+            "right": np.asarray(tree["right_children"]),
+            "value": conditions,  # Leaves store their (learning-rate scaled) value here
+            "default_left": np.asarray(tree["default_left"]),
+        })
+    base = float(learner["learner_model_param"]["base_score"].strip("[]"))  # e.g. "[5.1E1]"
+    return _flat_trees(trees, meta, "sum", np.ones(len(trees)), base)
+
+
+def _compile_catboost(model, meta):
+    tmp_dir = tempfile.mkdtemp(prefix="catboost_json_")
+    try:
+        path = os.path.join(tmp_dir, "model.json")
+        model.save_model(path, format="json")  # Documented, stable dump of the oblivious trees
+        with open(path) as file_obj:
+            dump = json.load(file_obj)
+    finally:
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+    features_info = dump["features_info"]
+    if set(features_info) - {"float_features"}:
+        raise ValueError("Only numeric CatBoost features can be compiled")
+    flat_index = {f["feature_index"]: f["flat_feature_index"] for f in features_info["float_features"]}
+    trees = dump["oblivious_trees"]
+    depth = max(len(tree["splits"]) for tree in trees)
+    split_feature = np.zeros((len(trees), depth), dtype=np.int32)
+    split_border = np.full((len(trees), depth), np.inf, dtype=np.float32)  # Padding levels never go right
+    leaf_value = np.zeros((len(trees), 1 << depth), dtype=np.float32)
+    for i, tree in enumerate(trees):
+        if len(tree["leaf_values"]) != 1 << len(tree["splits"]):
+            raise ValueError("Only single-output CatBoost models can be compiled")
+        for level, split in enumerate(tree["splits"]):
+            if split["split_type"] != "FloatFeature":
+                raise ValueError(f"Cannot compile CatBoost split type {split['split_type']}")
+            split_feature[i, level] = flat_index[split["float_feature_index"]]
+            split_border[i, level] = split["border"]  # Bit set when x > border
+        leaf_value[i, :len(tree["leaf_values"])] = tree["leaf_values"]
+
+    scale, bias = dump.get("scale_and_bias", [1.0, [0.0]])
+    arrays = {
+        "split_feature": split_feature,
+        "split_border": split_border,
+        "leaf_value": leaf_value,
+        "tree_weight": np.full(len(trees), scale, dtype=np.float64),
+    }
+    return CompiledModel("oblivious", arrays, dict(meta, base=float(np.ravel(bias)[0]), aggregation="sum", max_depth=depth))
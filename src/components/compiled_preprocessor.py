@@ -0,0 +1,238 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import json  # Import json to store the compiled layout next to the arrays
+
+import numpy as np  # Import numpy for numerical operations
+
+from src.exception import CustomException  # Import custom exception for error handling
+
+FORMAT_VERSION = 1  # Bumped whenever the saved layout changes
+
+
+class CompiledPreprocessor:
+    '''
+    NumPy-only equivalent of the fitted ColumnTransformer from DataTransformation.
+
+    Numeric columns keep their imputer fill value plus the scaler mean and scale.
+    Each categorical column becomes a lookup table with one precomputed, already
+    scaled output vector per category, so transforming a row is a few array reads.
+    '''
+
+    def __init__(self, input_columns, n_features_out, numeric, categorical, source_digest=None):
+        self.input_columns = list(input_columns)  # Column order for plain 2-D array input
+        self.n_features_out = n_features_out  # Width of the transformed matrix
+        self.numeric = numeric  # Dict with columns, offset, fill, mean, scale
+        self.categorical = categorical  # List of dicts with column, offset, categories, fill, table
+        self.source_digest = source_digest  # Content hash of the preprocessor pickle this was compiled from
+        for block in self.categorical:
+            block["codes"] = {category: code for code, category in enumerate(block["categories"])}  # Category -> row of table
+            block["rows"] = block["table"].tolist()  # Same vectors as Python lists for the single-record path
+        self.category_codes = {block["column"]: block["codes"] for block in self.categorical}  # Vocabulary batches intern with
+        self._numeric_params = [
+            (
+                col,
+                float(numeric["fill"][j]),
+                float(numeric["mean"][j]) if numeric["mean"] is not None else None,
+                float(numeric["scale"][j]) if numeric["scale"] is not None else None,
+            )
+            for j, col in enumerate(numeric["columns"])
+        ]  # Per-column constants as Python floats
+        self._segments = sorted(
+            [(numeric["offset"], None)] + [(block["offset"], block) for block in self.categorical],
+            key=lambda segment: segment[0],
+        )  # Output blocks in column order
+
+    def transform(self, X):
+        if isinstance(X, dict) and not any(isinstance(X[col], (list, tuple, np.ndarray)) for col in self.input_columns):
+            return self._transform_record(X)  # One plain record, skip the array machinery
+        interned = hasattr(X, "encode")  # FeatureBatch: float score arrays, categories already coded
+        if interned:
+            columns = {col: X.column(col) for col in self.numeric["columns"]}  # Views, no copies
+            n_rows = len(X)
+        else:
+            columns = self._columns(X)  # Column name -> 1-D array
+            n_rows = len(next(iter(columns.values())))  # Every column has the same length
+        out = np.empty((n_rows, self.n_features_out), dtype=np.float64)  # Same dtype as ColumnTransformer output
+
+        numeric = self.numeric
+        if numeric["columns"]:
+            values = np.empty((n_rows, len(numeric["columns"])), dtype=np.float64)
+            for j, col in enumerate(numeric["columns"]):
+                values[:, j] = np.asarray(columns[col], dtype=np.float64)  # Scores as floats
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = np.broadcast_to(numeric["fill"], values.shape)[missing]  # Same fill as SimpleImputer
+            if numeric["mean"] is not None:
+                values -= numeric["mean"]  # Same operations, in the same order, as StandardScaler
+            if numeric["scale"] is not None:
+                values /= numeric["scale"]
+            start = numeric["offset"]
+            out[:, start:start + values.shape[1]] = values
+
+        for block in self.categorical:
+            if interned:
+                codes = X.encode(block["column"], block["codes"], block["fill"])  # Usually the batch's own codes
+            else:
+                codes = self._encode(columns[block["column"]], block)  # Category -> table row
+            table = block["table"]
+            start = block["offset"]
+            out[:, start:start + table.shape[1]] = table[codes]  # Precomputed scaled one-hot vectors
+        return out
+
+    def _transform_record(self, record):
+        row = []
+        for _, block in self._segments:
+            if block is None:
+                for col, fill, mean, scale in self._numeric_params:
+                    value = float(record[col])
+                    if value != value:
+                        value = fill  # Missing score, imputed like SimpleImputer
+                    if mean is not None:
+                        value -= mean  # IEEE double arithmetic, identical to the array path
+                    if scale is not None:
+                        value /= scale
+                    row.append(value)
+            else:
+                row.extend(block["rows"][self._code(record[block["column"]], block)])  # Precomputed vector
+        return np.array([row], dtype=np.float64)
+
+    def _encode(self, values, block):
+        return np.fromiter((self._code(value, block) for value in values), dtype=np.intp, count=len(values))
+
+    def _code(self, value, block):
+        if value is None or (isinstance(value, float) and value != value):
+            value = block["fill"]  # Missing value, imputed with the most frequent category
+        try:
+            return block["codes"][value]  # Row of the lookup table
+        except (KeyError, TypeError):
+            raise ValueError(
+                f"Found unknown categories [{value!r}] in column {block['column']!r} during transform"
+            )  # Same failure as OneHotEncoder(handle_unknown="error")
+
+    def _columns(self, X):
+        if hasattr(X, "columns"):  # pandas DataFrame
+            return {col: X[col].to_numpy() for col in self.input_columns}
+        if isinstance(X, dict):  # One record, or a dict of column lists
+            return {col: X[col] if isinstance(X[col], (list, tuple, np.ndarray)) else [X[col]] for col in self.input_columns}
+        if isinstance(X, (list, tuple)) and X and isinstance(X[0], dict):  # List of records
+            return {col: [row[col] for row in X] for col in self.input_columns}
+        array = np.asarray(X, dtype=object)  # Plain rows in input_columns order
+        if array.ndim == 1:
+            array = array.reshape(1, -1)
+        return {col: array[:, j] for j, col in enumerate(self.input_columns)}
+
+    def save(self, file_path):
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)  # Create the directory if it doesn't exist
+            arrays = {
+                "numeric_fill": self.numeric["fill"],
+                "numeric_mean": self.numeric["mean"] if self.numeric["mean"] is not None else np.empty(0),
+                "numeric_scale": self.numeric["scale"] if self.numeric["scale"] is not None else np.empty(0),
+            }  # Float arrays stored as-is so loading is bit exact
+            for j, block in enumerate(self.categorical):
+                arrays[f"table_{j}"] = block["table"]
+            meta = {
+                "format_version": FORMAT_VERSION,
+                "input_columns": self.input_columns,
+                "n_features_out": self.n_features_out,
+                "numeric": {
+                    "columns": self.numeric["columns"],
+                    "offset": self.numeric["offset"],
+                    "has_mean": self.numeric["mean"] is not None,
+                    "has_scale": self.numeric["scale"] is not None,
+                },
+                "categorical": [
+                    {key: block[key] for key in ("column", "offset", "categories", "fill")}
+                    for block in self.categorical
+                ],
+                "source_digest": self.source_digest,
+            }  # Layout and category names
+            tmp_path = f"{file_path}.tmp.{os.getpid()}"
+            with open(tmp_path, "wb") as file_obj:
+                np.savez(file_obj, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, file_path)  # Atomically swap it in like save_object
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    @classmethod
+    def load(cls, file_path):
+        try:
+            with np.load(file_path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta["format_version"] != FORMAT_VERSION:
+                    raise ValueError(f"Unsupported compiled preprocessor version {meta['format_version']}")
+                numeric = dict(
+                    meta["numeric"],
+                    fill=data["numeric_fill"],
+                    mean=data["numeric_mean"] if meta["numeric"]["has_mean"] else None,
+                    scale=data["numeric_scale"] if meta["numeric"]["has_scale"] else None,
+                )
+                categorical = [dict(block, table=data[f"table_{j}"]) for j, block in enumerate(meta["categorical"])]
+            return cls(meta["input_columns"], meta["n_features_out"], numeric, categorical, meta["source_digest"])
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def compile_preprocessor(preprocessor, source_digest=None):
+    '''
+    Compiles the fitted ColumnTransformer built by DataTransformation.get_data_transformer_object.
+
+    Raises ValueError for layouts the compiled form cannot reproduce exactly.
+    '''
+    numeric = {"columns": [], "offset": 0, "fill": np.empty(0), "mean": None, "scale": None}
+    categorical = []
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "remainder":
+            if pipeline != "drop":
+                raise ValueError("Only remainder='drop' can be compiled")
+            continue
+        steps = dict(pipeline.steps)  # Step name -> fitted transformer
+        kinds = {type(step).__name__: step for step in steps.values()}  # Step class -> fitted transformer
+        if set(kinds) - {"SimpleImputer", "OneHotEncoder", "StandardScaler"}:
+            raise ValueError(f"Cannot compile steps {list(kinds)} of {name}")
+        offset = preprocessor.output_indices_[name].start  # Where this block starts in the output
+        imputer = kinds.get("SimpleImputer")
+        scaler = kinds.get("StandardScaler")
+        encoder = kinds.get("OneHotEncoder")
+
+        if encoder is None:
+            if numeric["columns"]:
+                raise ValueError("Only one numeric block can be compiled")
+            numeric = {
+                "columns": list(columns),
+                "offset": offset,
+                "fill": imputer.statistics_.astype(np.float64) if imputer is not None else np.full(len(columns), np.nan),
+                "mean": scaler.mean_ if scaler is not None and scaler.with_mean else None,
+                "scale": scaler.scale_ if scaler is not None and scaler.with_std else None,
+            }
+            continue
+
+        if encoder.drop is not None or encoder.handle_unknown != "error":
+            raise ValueError("Only OneHotEncoder(drop=None, handle_unknown='error') can be compiled")
+        position = 0  # Offset of the current column inside the encoded block
+        for j, (col, categories) in enumerate(zip(columns, encoder.categories_)):
+            width = len(categories)
+            table = np.eye(width, dtype=np.float64)  # One-hot row per category
+            if scaler is not None:
+                if scaler.with_mean:
+                    table -= scaler.mean_[position:position + width]
+                if scaler.with_std:
+                    table /= scaler.scale_[position:position + width]  # Precompute the scaled vectors
+            categorical.append({
+                "column": col,
+                "offset": offset + position,
+                "categories": [category.item() if hasattr(category, "item") else category for category in categories],
+                "fill": imputer.statistics_[j] if imputer is not None else None,
+                "table": table,
+            })
+            position += width
+
+    for block in categorical:
+        if hasattr(block["fill"], "item"):
+            block["fill"] = block["fill"].item()  # Plain Python value so it can be stored as JSON
+    return CompiledPreprocessor(
+        preprocessor.feature_names_in_, sum(s.stop - s.start for s in preprocessor.output_indices_.values()),
+        numeric, categorical, source_digest,
+    )
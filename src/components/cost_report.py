@@ -0,0 +1,254 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import json  # Import json to write the report
+import math  # Import math to find missing (NaN) values
+import threading  # Import threading to guard the open meters
+import time  # Import time for wall and CPU clocks
+from datetime import datetime, timezone  # Import datetime to timestamp the report
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.components.model_registry import MODEL_REGISTRY, model_family  # Import model classes and families
+
+try:
+    import resource  # Unix only, peak memory falls back to it outside Linux
+except ImportError:
+    resource = None
+
+REPORT_VERSION = 2  # Bumped whenever the report layout changes
+COST_ATTRIBUTION = (
+    "Candidate fit_seconds, score_seconds and cpu_seconds estimate the cost of that combination fitted on its own: "
+    "combinations sharing a path_group are scored from one fit of the largest ensemble, and each is charged "
+    "value / largest of it. Model, family and total seconds are the time this run spent: each shared fit once, "
+    "folds replayed from the search cache (cached) not at all."
+)  # Written into the report so readers know which numbers add up
+
+
+def _proc_status_bytes(field):
+    try:
+        with open("/proc/self/status") as file_obj:
+            for line in file_obj:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024  # Reported in kB
+    except OSError:
+        pass
+    return None  # Not Linux
+
+
+def _peak_rss():
+    peak = _proc_status_bytes("VmHWM:")
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, kB elsewhere
+    return peak
+
+
+def _current_rss():
+    current = _proc_status_bytes("VmRSS:")
+    return current if current is not None else _peak_rss()  # Without /proc only growth past the old peak shows
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as file_obj:
+            file_obj.write("5")  # Resets the kernel's resident set high-water mark (Linux 4.0+)
+        return True
+    except OSError:
+        return False
+
+
+class ResourceUsage:
+    '''
+    Measures the wall time, CPU time and peak memory of a block of code:
+
+        with ResourceUsage() as usage:
+            model.fit(X, y)
+        usage.wall_seconds, usage.cpu_seconds, usage.peak_memory_bytes
+
+    CPU time is process_time() of this process, so it covers every thread of the fit
+    (BLAS, OpenMP) but not other processes; search workers measure their own tasks.
+    Peak memory is the highest resident set size reached inside the block minus the size
+    at its start. On Linux the kernel's high-water mark is reset on entry; elsewhere only
+    growth past the process's earlier peak is seen. Memory is per process, so other
+    threads' allocations during the block count too.
+    '''
+    _lock = threading.Lock()
+    _open = []  # Meters inside which a nested meter may reset the high-water mark
+
+    def __enter__(self):
+        with self._lock:
+            peak = _peak_rss()
+            for meter in self._open:
+                meter._peak = max(meter._peak, peak or 0)  # Keep what outer meters saw before the reset
+            _reset_peak_rss()
+            self._start_rss = _current_rss()
+            self._peak = self._start_rss or 0
+            self._open.append(self)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.process_time() - self._cpu
+        with self._lock:
+            self._open.remove(self)
+            peak = _peak_rss()
+        if self._start_rss is None or peak is None:
+            self.peak_memory_bytes = None  # No way to measure on this platform
+        else:
+            self.peak_memory_bytes = max(0, max(self._peak, peak) - self._start_rss)
+        return False  # Never swallow exceptions
+
+
+def _number(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None  # Failed fits and unmeasured values, JSON has no NaN
+    return value
+
+
+def _max_known(values):
+    known = [value for value in values if value is not None]
+    return max(known) if known else None
+
+
+def _candidate(entry):
+    split_cpu = [_number(value) for value in entry.get("split_cpu_times", [])]
+    split_cached = entry.get("split_cached", [])
+    return {
+        "params": entry["params"],
+        "resource": entry.get("resource"),  # Rows or ensemble size the combination was scored at
+        "mean_test_score": _number(entry["mean_test_score"]),
+        "split_test_scores": [_number(score) for score in entry["split_test_scores"]],
+        "fit_seconds": sum(entry.get("split_fit_times", [])),  # All folds, estimated on its own
+        "score_seconds": sum(entry.get("split_score_times", [])),
+        "cpu_seconds": sum(value for value in split_cpu if value is not None),
+        "split_cpu_seconds": split_cpu,  # Per fold
+        "peak_memory_bytes": entry.get("peak_memory_bytes"),  # Largest fold
+        "path_group": entry.get("path_group"),  # Shared fit it was scored from, None for its own fit
+        "cached": bool(split_cached) and all(split_cached),  # Every fold replayed from the search cache
+    }
+
+
+def spent_seconds(cv_results):
+    '''
+    Fit, score and CPU seconds a search really spent on these results: each shared path
+    fit once and folds replayed from the search cache not at all.
+    '''
+    spent = {"fit_seconds": 0.0, "score_seconds": 0.0, "cpu_seconds": 0.0}
+    seen = set()  # Path groups already counted
+    for entry in cv_results:
+        prefix = ""
+        group = entry.get("path_group")
+        if group is not None:
+            if group in seen:
+                continue
+            seen.add(group)
+            prefix = "path_"  # The whole shared fit, not this candidate's share
+        n_folds = len(entry["split_test_scores"])
+        cached = entry.get("split_cached") or [False] * n_folds
+        for key, times in (("fit_seconds", "split_fit_times"), ("score_seconds", "split_score_times"), ("cpu_seconds", "split_cpu_times")):
+            values = entry.get(prefix + times) or [None] * n_folds
+            spent[key] += sum(value for value, hit in zip(values, cached) if value is not None and not hit)
+    return spent
+
+
+def _by_param(candidates):
+    '''
+    Cost and best score per hyperparameter value, to spot expensive grid regions.
+    '''
+    regions = {}
+    for candidate in candidates:
+        for param, value in candidate["params"].items():
+            region = regions.setdefault(param, {}).setdefault(
+                str(value), {"evaluations": 0, "fit_seconds": 0.0, "cpu_seconds": 0.0, "best_score": None}
+            )
+            region["evaluations"] += 1
+            region["fit_seconds"] += candidate["fit_seconds"]
+            region["cpu_seconds"] += candidate["cpu_seconds"]
+            score = candidate["mean_test_score"]
+            if score is not None and (region["best_score"] is None or score > region["best_score"]):
+                region["best_score"] = score
+    return regions
+
+
+def model_costs(name, cv_results, best_params, best_score, train_score=None, test_score=None, refit=None):
+    '''
+    One model's entry of the cost report: every evaluated combination from the search
+    results, the totals over them and the final fit with the best parameters.
+    '''
+    candidates = [_candidate(entry) for entry in cv_results]
+    return dict({
+        "family": model_family(name),
+        "class": MODEL_REGISTRY[name][1] if name in MODEL_REGISTRY else None,
+        "best_params": best_params,
+        "best_cv_score": _number(best_score),  # Mean CV score, or the validation score out of core
+        "train_score": _number(train_score),  # R2 of the final fit on the training data
+        "test_score": _number(test_score),  # R2 of the final fit on the test data
+        "evaluations": len(candidates),
+        "cached_evaluations": sum(candidate["cached"] for candidate in candidates),
+        "peak_memory_bytes": _max_known(
+            [candidate["peak_memory_bytes"] for candidate in candidates] + [(refit or {}).get("peak_memory_bytes")]
+        ),
+        "refit": refit,  # wall_seconds, cpu_seconds, peak_memory_bytes, cached
+        "by_param": _by_param(candidates),
+        "candidates": candidates,
+    }, **spent_seconds(cv_results))  # fit_seconds, score_seconds, cpu_seconds spent by this run
+
+
+def usage_dict(usage, **extra):
+    return dict({
+        "wall_seconds": usage.wall_seconds,
+        "cpu_seconds": usage.cpu_seconds,
+        "peak_memory_bytes": usage.peak_memory_bytes,
+    }, **extra)
+
+
+def build_cost_report(models, best_model=None, search=None):
+    '''
+    Cost report of a training run from model_costs() entries: per model, per family
+    and overall fit, score and CPU time, and peak memory.
+    '''
+    families = {}
+    for name, entry in models.items():
+        refit = entry.get("refit") or {}
+        family = families.setdefault(entry["family"], {
+            "models": [], "evaluations": 0, "cached_evaluations": 0, "fit_seconds": 0.0, "score_seconds": 0.0,
+            "cpu_seconds": 0.0, "refit_seconds": 0.0, "peak_memory_bytes": None,
+        })
+        family["models"].append(name)
+        family["evaluations"] += entry["evaluations"]
+        family["cached_evaluations"] += entry["cached_evaluations"]
+        family["fit_seconds"] += entry["fit_seconds"]
+        family["score_seconds"] += entry["score_seconds"]
+        family["cpu_seconds"] += entry["cpu_seconds"] + (refit.get("cpu_seconds") or 0.0)
+        family["refit_seconds"] += refit.get("wall_seconds") or 0.0
+        family["peak_memory_bytes"] = _max_known([family["peak_memory_bytes"], entry["peak_memory_bytes"]])
+    for family in families.values():
+        family["total_seconds"] = family["fit_seconds"] + family["score_seconds"] + family["refit_seconds"]
+
+    return {
+        "schema_version": REPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "cost_attribution": COST_ATTRIBUTION,
+        "best_model": best_model,
+        "search": search or {},  # How the models were searched and on how much data
+        "totals": {
+            key: sum(family[key] for family in families.values())
+            for key in ("evaluations", "cached_evaluations", "fit_seconds", "score_seconds", "cpu_seconds", "refit_seconds", "total_seconds")
+        },
+        "families": families,
+        "models": models,
+    }
+
+
+def save_cost_report(report, file_path):
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)  # Create the directory if it doesn't exist
+        tmp_path = f"{file_path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2, default=str, allow_nan=False)  # Strict JSON for other tools
+        os.replace(tmp_path, file_path)  # Atomically swap it in like save_object
+        return file_path
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
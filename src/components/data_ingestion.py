@@ -6,59 +6,147 @@ import sys  # it is used to interact with the Python system and control your pro
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from src.exception import CustomException  # Import custom exception class for better error handling
 from src.logger import logging  # Import logging for logging messages
+import numpy as np  # Import numpy for numerical operations
 import pandas as pd  # Import pandas for data manipulation
 
 from sklearn.model_selection import train_test_split  # Import function to split data into train and test sets
 from dataclasses import dataclass  # Import dataclass for easy class creation
 
-from src.components.data_transformation import DataTransformation  # Import data transformation class
-from src.components.data_transformation import DataTransformationConfig  # Import data transformation config
-
-from src.components.model_trainer import ModelTrainerConfig  # Import model trainer config
-from src.components.model_trainer import ModelTrainer  # Import model trainer class
+from src.components.artifact_store import TableWriter, save_table, resolve_table_format, table_path, table_schema  # Import table artifact helpers
+from src.metrics import timed  # Import the timing decorator
+from src.utils import TRAINING_STAGE_SECONDS  # Import the training stage histogram
 
 @dataclass
 class DataIngestionConfig:
     train_data_path: str = os.path.join('artifacts', "train.csv")  # Path to save train data
     test_data_path: str = os.path.join('artifacts', "test.csv")  # Path to save test data
     raw_data_path: str = os.path.join('artifacts', "data.csv")  # Path to save raw data
+    source_data_path: str = os.environ.get("DATA_SOURCE_PATH", os.path.join('notebook', 'data', 'stud.csv'))  # Dataset to ingest
+    streaming: bool = os.environ.get("DATA_INGESTION_STREAMING", "0") == "1"  # Read and split the source chunk by chunk
+    chunk_size: int = 100000  # Rows per chunk in streaming mode
+    test_size: float = 0.2  # Share of rows that go to the test set
+    split_key_columns: list = None  # Columns hashed to assign a row to train or test, all columns when None
+    table_format: str = os.environ.get("ARTIFACT_TABLE_FORMAT", "csv")  # csv, parquet or feather for the raw, train and test tables
 
 class DataIngestion:
     def __init__(self):
         self.ingestion_config = DataIngestionConfig()  # Initialize config with file paths
 
+    def output_paths(self):
+        '''
+        Raw, train and test table paths, with the extension of the configured table format.
+        '''
+        config = self.ingestion_config
+        table_format = resolve_table_format(config.table_format)  # CSV when pyarrow is missing
+        return [table_path(path, table_format) for path in (config.raw_data_path, config.train_data_path, config.test_data_path)]
+
+    @timed(TRAINING_STAGE_SECONDS, "ingestion")
     def initiate_data_ingestion(self):
         logging.info("Entered the data ingestion method or component")  # Log start of ingestion
+        if self.ingestion_config.streaming:
+            return self.initiate_streaming_data_ingestion()  # Bounded-memory path for large exports
         try:
-            df = pd.read_csv(r'D:\Data Science\Complete-Data-Science-With-Machine-Learning-And-NLP-2024-main\24-End To End ML Project With Deployment\Student Performance Project\notebook\data\stud.csv')  # Read the dataset into a DataFrame
+            df = pd.read_csv(self.ingestion_config.source_data_path)  # Read the dataset into a DataFrame
             logging.info('Read the dataset as dataframe')  # Log successful read
 
-            os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)  # Create artifacts directory if it doesn't exist
+            raw_data_path, train_data_path, test_data_path = self.output_paths()  # Paths in the configured format
+            os.makedirs(os.path.dirname(train_data_path), exist_ok=True)  # Create artifacts directory if it doesn't exist
 
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)  # Save raw data to CSV
+            save_table(df, raw_data_path)  # Save raw data
 
             logging.info("Train test split initiated")  # Log start of train-test split
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)  # Split data into train and test sets
+            train_set, test_set = train_test_split(
+                df, test_size=self.ingestion_config.test_size, random_state=42
+            )  # Split data into train and test sets, same share as streaming mode
 
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)  # Save train set to CSV
+            save_table(train_set, train_data_path)  # Save train set
 
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)  # Save test set to CSV
+            save_table(test_set, test_data_path)  # Save test set
 
             logging.info("Ingestion of the data is completed")  # Log completion of ingestion
 
             return (
-                self.ingestion_config.train_data_path,  # Return train data path
-                self.ingestion_config.test_data_path    # Return test data path
+                train_data_path,  # Return train data path
+                test_data_path    # Return test data path
             )
         except Exception as e:
             raise CustomException(e, sys)  # Raise custom exception if error occurs
-        
-if __name__ == "__main__":
-    obj = DataIngestion()  # Create DataIngestion object
-    train_data, test_data = obj.initiate_data_ingestion()  # Start data ingestion and get file paths
 
-    data_transformation = DataTransformation()  # Create DataTransformation object
-    train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data, test_data)  # Transform data
+    def initiate_streaming_data_ingestion(self):
+        '''
+        Copies the source to the raw, train and test files one chunk at a time.
+
+        Each row goes to test when a stable hash of its key columns falls in the lowest
+        test_size share of the hash space, so the split is reproducible and rows appended
+        to the source later never move existing rows between train and test.
+
+        Binary tables get typed columns: a column whose text in the first chunk is all
+        numbers is stored as float64, every other column as text.
+        '''
+        logging.info(f"Streaming ingestion of {self.ingestion_config.source_data_path}")  # Log start of streaming
+        config = self.ingestion_config
+        paths = self.output_paths()
+        typed = os.path.splitext(paths[0])[1] != ".csv"  # CSV keeps the raw text
+        writers = []  # Opened on the first chunk, outputs are swapped in when complete
+        try:
+            os.makedirs(os.path.dirname(paths[1]), exist_ok=True)  # Create the artifacts directory if it doesn't exist
+            rows = {"train": 0, "test": 0}
+            numeric_columns = []  # Decided on the first chunk
+            reader = pd.read_csv(
+                config.source_data_path, chunksize=config.chunk_size,
+                dtype=str, keep_default_na=False, na_filter=False,
+            )  # Keep the raw text so hashes and written values never depend on type inference
+            for chunk in reader:
+                is_test = hash_split(chunk, config.split_key_columns, config.test_size)  # Stable per-row assignment
+                if not writers:
+                    schema = None
+                    if typed:
+                        numeric_columns = [col for col in chunk.columns if _is_numeric_text(chunk[col])]
+                        schema = table_schema(chunk.columns, numeric_columns)  # From the whole chunk, not a slice
+                    writers = [TableWriter(path, schema) for path in paths]  # Same schema for all three tables
+                if typed:
+                    chunk = cast_numeric_columns(chunk, numeric_columns)  # Same dtypes in every chunk
+                writers[0].write(chunk)  # Raw copy
+                writers[1].write(chunk[~is_test])  # Train rows
+                writers[2].write(chunk[is_test])  # Test rows
+                rows["test"] += int(is_test.sum())
+                rows["train"] += len(chunk) - int(is_test.sum())
+            if not writers:
+                raise ValueError(f"{config.source_data_path} has no rows")
+
+            for writer in writers:
+                writer.close()  # Atomically publish the outputs
+            logging.info(f"Streaming ingestion completed: {rows['train']} train rows, {rows['test']} test rows")
+
+            return (
+                writers[1].file_path,  # Return train data path
+                writers[2].file_path   # Return test data path
+            )
+        except Exception as e:
+            for writer in writers:
+                writer.abort()  # Never leave partial outputs behind
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def hash_split(df, key_columns=None, test_size=0.2, buckets=10000):
+    keys = df[key_columns] if key_columns else df  # Columns that identify a row
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()  # Fixed-key hash, stable across runs
+    return pd.Series(hashes % buckets < int(test_size * buckets), index=df.index)  # True for test rows
+
+
+def _is_numeric_text(values):
+    present = values[values.str.strip() != ""]  # Blank cells are missing values
+    return len(present) > 0 and pd.to_numeric(present, errors="coerce").notna().all()
 
-    modeltrainer = ModelTrainer()  # Create ModelTrainer object
-    print(modeltrainer.initiate_model_trainer(train_arr, test_arr))  # Train model and print result
\ No newline at end of file
+
+def cast_numeric_columns(df, numeric_columns):
+    df = df.copy()
+    for col in numeric_columns:
+        values = df[col].str.strip().replace("", np.nan)  # Blank cells are missing values in any chunk
+        df[col] = pd.to_numeric(values).astype(np.float64)  # Raises on text in a numeric column
+    return df
+
+        
+if __name__ == "__main__":
+    from src.pipeline.train_pipeline import main  # Ingestion, transformation and training run as stages of the training pipeline
+    main()
@@ -1,5 +1,5 @@
 import sys  # Import sys module for system-specific parameters and functions
-from dataclasses import dataclass  # Import dataclass for easy class creation
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
 
 import numpy as np  # Import numpy for numerical operations
 import pandas as pd  # Import pandas for data manipulation
@@ -12,15 +12,24 @@ from src.exception import CustomException  # Import custom exception for error h
 from src.logger import logging  # Import logging for logging messages
 import os  # Import os for file and directory operations
 
-from src.utils import save_object  # Import save_object utility to save objects
+from src.utils import save_object, file_digest, TRAINING_STAGE_SECONDS  # Import utilities to save and fingerprint objects
+from src.metrics import timed  # Import the timing decorator
+from src.components.compiled_preprocessor import compile_preprocessor  # Import the NumPy-only preprocessor export
+from src.components.artifact_store import load_table, save_arrays, iter_table, ArrayWriter  # Import typed table and array artifacts
+from src.components.out_of_core import OutOfCoreConfig, fit_preprocessor_out_of_core  # Import the chunked preprocessor fit
 
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path = os.path.join('artifacts', "proprocessor.pkl")  # Path to save the preprocessor object
+    compiled_preprocessor_file_path = os.path.join('artifacts', "compiled_preprocessor.npz")  # Path to save the compiled preprocessor
+    transformed_data_dir = os.path.join('artifacts', "transformed")  # Directory for the transformed .npy arrays
+    target_column_name = "math_score"  # Name of the target column
+    out_of_core: OutOfCoreConfig = field(default_factory=OutOfCoreConfig)  # Chunked fit and transform for data larger than memory
 
 class DataTransformation:
     def __init__(self):
         self.data_transformation_config = DataTransformationConfig()  # Initialize config
+        self.preprocessor = None  # Fitted preprocessor of the last transformation
 
     def get_data_transformer_object(self):
         '''
@@ -68,8 +77,118 @@ class DataTransformation:
         
     def initiate_data_transformation(self, train_path, test_path):
         try:
-            train_df = pd.read_csv(train_path)  # Read training data from CSV
-            test_df = pd.read_csv(test_path)  # Read testing data from CSV
+            input_feature_train_arr, target_train_arr, input_feature_test_arr, target_test_arr = (
+                self.transform_tables(train_path, test_path)
+            )  # Fit the preprocessor and transform both tables
+
+            train_arr = np.c_[
+                input_feature_train_arr, target_train_arr
+            ]  # Combine processed train features and target
+            test_arr = np.c_[input_feature_test_arr, target_test_arr]  # Combine processed test features and target
+
+            return (
+                train_arr,  # Return processed train array
+                test_arr,  # Return processed test array
+                self.data_transformation_config.preprocessor_obj_file_path,  # Return path to preprocessor object
+            )
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def initiate_array_transformation(self, train_path, test_path, export=True):
+        '''
+        Same as initiate_data_transformation, but saves features and target as separate
+        .npy arrays with a manifest instead of returning them concatenated, so training
+        can memory-map them without another copy. In out-of-core mode the tables are
+        read and transformed chunk by chunk instead.
+        '''
+        if self.data_transformation_config.out_of_core.enabled:
+            return self.initiate_out_of_core_transformation(train_path, test_path, export=export)
+        try:
+            X_train, y_train, X_test, y_test = self.transform_tables(train_path, test_path, export=export)  # Fit and transform
+            config = self.data_transformation_config
+            save_arrays(
+                config.transformed_data_dir,
+                {"X_train": X_train, "y_train": y_train, "X_test": X_test, "y_test": y_test},
+                metadata={
+                    "target": config.target_column_name,
+                    "feature_names": self.preprocessor.get_feature_names_out().tolist(),  # Column meaning of X
+                    "preprocessor_digest": file_digest(config.preprocessor_obj_file_path),  # Preprocessor that produced X
+                },
+            )  # Features and target stored separately
+
+            return (
+                config.transformed_data_dir,  # Return directory of the transformed arrays
+                config.preprocessor_obj_file_path,  # Return path to preprocessor object
+            )
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    @timed(TRAINING_STAGE_SECONDS, "transform")
+    def initiate_out_of_core_transformation(self, train_path, test_path, export=True):
+        '''
+        Out-of-core form of initiate_array_transformation for tables larger than memory.
+        The preprocessor is fitted over train chunks (see fit_preprocessor_out_of_core),
+        then each chunk of both tables is transformed straight into memory-mapped .npy
+        arrays of the same layout, so at most chunk_rows rows are in memory at a time.
+        '''
+        config = self.data_transformation_config
+        chunk_rows = config.out_of_core.chunk_rows
+        target_column_name = config.target_column_name
+
+        def features(path):
+            return (chunk.drop(columns=[target_column_name]) for chunk in iter_table(path, chunk_rows))
+
+        writer = ArrayWriter(config.transformed_data_dir)
+        try:
+            preprocessing_obj, n_train = fit_preprocessor_out_of_core(
+                self.get_data_transformer_object(), lambda: features(train_path), config.out_of_core
+            )  # Two passes over the train table
+            save_object(file_path=config.preprocessor_obj_file_path, obj=preprocessing_obj)  # Save the preprocessor
+            self.preprocessor = preprocessing_obj  # Keep the fitted preprocessor for callers
+            n_test = sum(len(chunk) for chunk in iter_table(test_path, chunk_rows))  # Rows to allocate
+            n_features = len(preprocessing_obj.get_feature_names_out())
+
+            for split, path, n_rows in (("train", train_path, n_train), ("test", test_path, n_test)):
+                X = writer.create(f"X_{split}", (n_rows, n_features))  # Filled chunk by chunk on disk
+                y = writer.create(f"y_{split}", (n_rows,))
+                start = 0
+                for chunk in iter_table(path, chunk_rows):
+                    input_feature_df = chunk.drop(columns=[target_column_name])
+                    transformed = preprocessing_obj.transform(input_feature_df)
+                    if hasattr(transformed, "toarray"):
+                        transformed = transformed.toarray()  # Same dense layout as the in-memory path
+                    X[start:start + len(chunk)] = transformed
+                    y[start:start + len(chunk)] = chunk[target_column_name].to_numpy(dtype=np.float64)
+                    if export and split == "test" and start == 0:
+                        self.export_compiled_preprocessor(preprocessing_obj, input_feature_df, transformed)  # First chunk as sample
+                    start += len(chunk)
+                if start != n_rows:
+                    raise ValueError(f"{path} changed while it was being transformed")
+            logging.info(f"Transformed {n_train} train and {n_test} test rows out of core")
+
+            writer.close(metadata={
+                "target": target_column_name,
+                "feature_names": preprocessing_obj.get_feature_names_out().tolist(),  # Column meaning of X
+                "preprocessor_digest": file_digest(config.preprocessor_obj_file_path),  # Preprocessor that produced X
+            })
+            return (
+                config.transformed_data_dir,  # Return directory of the transformed arrays
+                config.preprocessor_obj_file_path,  # Return path to preprocessor object
+            )
+        except Exception as e:
+            writer.abort()
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    @timed(TRAINING_STAGE_SECONDS, "transform")
+    def transform_tables(self, train_path, test_path, export=True):
+        '''
+        Reads the train and test tables, fits the preprocessor on train, saves it and
+        returns (X_train, y_train, X_test, y_test) as float64 arrays. With export, also
+        saves the compiled preprocessor.
+        '''
+        try:
+            train_df = load_table(train_path)  # Read training data (CSV, Parquet or Feather)
+            test_df = load_table(test_path)  # Read testing data (CSV, Parquet or Feather)
 
             logging.info("Read train and test data completed")  # Log data read completion
 
@@ -77,13 +196,12 @@ class DataTransformation:
 
             preprocessing_obj = self.get_data_transformer_object()  # Get the preprocessor object
 
-            target_column_name = "math_score"  # Name of the target column
-            numerical_columns = ["writing_score", "reading_score"]  # List of numerical columns
+            target_column_name = self.data_transformation_config.target_column_name  # Name of the target column
 
-            input_feature_train_df = train_df.drop(columns=[target_column_name], axis=1)  # Drop target column from train data
+            input_feature_train_df = train_df.drop(columns=[target_column_name])  # Drop target column from train data
             target_feature_train_df = train_df[target_column_name]  # Get target column from train data
 
-            input_feature_test_df = test_df.drop(columns=[target_column_name], axis=1)  # Drop target column from test data
+            input_feature_test_df = test_df.drop(columns=[target_column_name])  # Drop target column from test data
             target_feature_test_df = test_df[target_column_name]  # Get target column from test data
 
             logging.info(
@@ -93,22 +211,43 @@ class DataTransformation:
             input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)  # Fit and transform train features
             input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)  # Transform test features
 
-            train_arr = np.c_[
-                input_feature_train_arr, np.array(target_feature_train_df)
-            ]  # Combine processed train features and target
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]  # Combine processed test features and target
-
             logging.info(f"Saved preprocessing object.")  # Log saving of preprocessor
 
             save_object(
                 file_path=self.data_transformation_config.preprocessor_obj_file_path,  # Path to save preprocessor
                 obj=preprocessing_obj  # Preprocessor object to save
             )
+            self.preprocessor = preprocessing_obj  # Keep the fitted preprocessor for callers
+
+            if export:
+                self.export_compiled_preprocessor(preprocessing_obj, input_feature_test_df, input_feature_test_arr)  # Fast serving path
 
             return (
-                train_arr,  # Return processed train array
-                test_arr,  # Return processed test array
-                self.data_transformation_config.preprocessor_obj_file_path,  # Return path to preprocessor object
+                input_feature_train_arr,  # Processed train features
+                target_feature_train_df.to_numpy(dtype=np.float64),  # Train target
+                input_feature_test_arr,  # Processed test features
+                target_feature_test_df.to_numpy(dtype=np.float64),  # Test target
             )
         except Exception as e:
-            raise CustomException(e, sys)  # Raise custom exception if error occurs
\ No newline at end of file
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def export_compiled_preprocessor(self, preprocessing_obj, sample_df, expected_arr):
+        '''
+        Saves the NumPy-only form of the fitted preprocessor, but only if it reproduces
+        preprocessing_obj.transform bit for bit on the sample; otherwise serving keeps using the pickle.
+        '''
+        try:
+            compiled = compile_preprocessor(
+                preprocessing_obj,
+                source_digest=file_digest(self.data_transformation_config.preprocessor_obj_file_path),
+            )  # Tie the export to the pickle it was compiled from
+            if not np.array_equal(compiled.transform(sample_df), expected_arr):
+                logging.warning("Compiled preprocessor does not match the fitted one, not exporting it")
+                return None
+        except ValueError as e:
+            logging.warning(f"Preprocessor cannot be compiled: {e}")
+            return None
+
+        compiled.save(self.data_transformation_config.compiled_preprocessor_file_path)  # Save next to the pickle
+        logging.info("Saved compiled preprocessor")
+        return self.data_transformation_config.compiled_preprocessor_file_path
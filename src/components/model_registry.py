@@ -0,0 +1,51 @@
+import importlib  # Import importlib to load estimator classes only when they are needed
+from functools import lru_cache  # Import lru_cache so each class is resolved once
+
+# Model name -> (module, class name, default parameters)
+MODEL_REGISTRY = {
+    "Random Forest": ("sklearn.ensemble", "RandomForestRegressor", {"random_state": 42}),
+    "Decision Tree": ("sklearn.tree", "DecisionTreeRegressor", {"random_state": 42}),
+    "Gradient Boosting": ("sklearn.ensemble", "GradientBoostingRegressor", {"random_state": 42}),
+    "Linear Regression": ("sklearn.linear_model", "LinearRegression", {}),
+    "XGBRegressor": ("xgboost", "XGBRegressor", {}),
+    "CatBoosting Regressor": ("catboost", "CatBoostRegressor", {"verbose": False}),  # CatBoostRegressor is unique because it can handle categorical features automatically. It uses ordered boosting to reduce overfitting and often works well
+    "AdaBoost Regressor": ("sklearn.ensemble", "AdaBoostRegressor", {"random_state": 42}),
+    "SGD Regressor": ("sklearn.linear_model", "SGDRegressor", {"random_state": 42}),  # Trains with partial_fit in out-of-core mode
+}
+
+# Model name -> family, the level at which the training cost report sums time
+MODEL_FAMILIES = {
+    "Linear Regression": "linear",
+    "SGD Regressor": "linear",
+    "Decision Tree": "tree",
+    "Random Forest": "bagging",
+    "Gradient Boosting": "boosting",
+    "XGBRegressor": "boosting",
+    "CatBoosting Regressor": "boosting",
+    "AdaBoost Regressor": "boosting",
+}
+
+
+@lru_cache(maxsize=None)
+def get_model_class(name):
+    '''
+    Imports and returns the estimator class registered under name. Nothing is
+    imported until a model is asked for, so importing this module is free.
+    '''
+    if name not in MODEL_REGISTRY:
+        raise KeyError(f"Unknown model {name!r}, expected one of {list(MODEL_REGISTRY)}")
+    module_name, class_name, _ = MODEL_REGISTRY[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_model(name, **params):
+    _, _, defaults = MODEL_REGISTRY[name]
+    return get_model_class(name)(**{**defaults, **params})  # Registered defaults, overridden by params
+
+
+def create_models(names=None):
+    return {name: create_model(name) for name in (names or MODEL_REGISTRY)}  # Model name -> unfitted estimator
+
+
+def model_family(name):
+    return MODEL_FAMILIES.get(name, "other")
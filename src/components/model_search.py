@@ -0,0 +1,452 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import shutil  # Import shutil to remove the shared array directory
+import tempfile  # Import tempfile to hold the memory-mapped training arrays
+import time  # Import time to measure fit and score times
+import multiprocessing  # Import multiprocessing to pick a safe process start method
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait  # Import the process pool
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
+
+import numpy as np  # Import numpy for numerical operations
+from sklearn.base import clone  # Import clone to get a fresh estimator per task
+from sklearn.metrics import r2_score  # Import r2_score to score ensemble prefixes
+from sklearn.model_selection import KFold, ParameterGrid  # Import the same splitter and grid GridSearchCV uses
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.components.search_strategies import SEARCH_STRATEGIES  # Import the pluggable search strategies
+from src.components.search_cache import SearchCache  # Import the on-disk search result cache
+from src.components.cost_report import ResourceUsage  # Import the per-task time and memory meter
+
+THREAD_PARAMS = {"CatBoostRegressor": "thread_count"}  # Estimators whose thread count is not called n_jobs
+PATH_PARAMS = {
+    "RandomForestRegressor": "n_estimators",
+    "GradientBoostingRegressor": "n_estimators",
+    "AdaBoostRegressor": "n_estimators",
+    "XGBRegressor": "n_estimators",
+    "CatBoostRegressor": "iterations",
+}  # Ensemble size hyperparameters whose smaller values are prefixes of the largest fit
+
+
+@dataclass
+class ModelSearchConfig:
+    n_jobs: int = int(os.environ.get("MODEL_SEARCH_N_JOBS", 1))  # Total core budget, -1 means all cores
+    cv: int = 3  # Number of KFold splits, same as GridSearchCV(cv=3)
+    strategy: str = os.environ.get("MODEL_SEARCH_STRATEGY", "exhaustive")  # exhaustive, random, halving or an instance
+    n_iter: int = 20  # Combinations evaluated per model by the random strategy
+    halving_factor: int = 3  # Candidates kept (1/factor) and resource growth per halving round
+    halving_resource: str = "n_samples"  # n_samples or an integer hyperparameter such as n_estimators
+    time_budget: float = None  # Seconds per model after which no new combination is started
+    random_state: int = 42  # Seed for the random strategy and the halving row subsample
+    path_scoring: bool = True  # Score n_estimators/iterations grids from one fit of the largest ensemble
+    cache_dir: str = os.environ.get("MODEL_SEARCH_CACHE_DIR", os.path.join("artifacts", "search_cache"))  # Empty disables
+    cache_max_bytes: int = 512 * 1024 ** 2  # Least recently used entries are evicted above this size
+
+
+@dataclass
+class SearchResult:
+    best_params: dict  # Parameters with the best mean CV score
+    best_score: float  # Mean CV score of best_params
+    cv_results: list = field(default_factory=list)  # One dict per evaluated parameter combination
+    budget_exhausted: bool = False  # True when the time budget stopped the search early
+
+
+class ModelSearch:
+    '''
+    Cross-validated hyperparameter search over several models at once.
+
+    A search strategy decides which combinations to evaluate, in one round (exhaustive,
+    random) or several (successive halving). Every (model, combination, fold) is an
+    independent task. With n_jobs=1 the tasks run in this process; otherwise they are
+    spread over a process pool that reads the training arrays from shared memory-mapped
+    files, and each worker's estimator and BLAS/OpenMP threads are capped so the pool
+    never uses more than n_jobs cores. The exhaustive strategy scores exactly like
+    GridSearchCV(model, params, cv=cv): same KFold splits, same estimator.score, and
+    ties resolved in favour of the first combination in grid order.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or ModelSearchConfig()  # Core budget, CV and strategy settings
+        self.cache = SearchCache(self.config.cache_dir, self.config.cache_max_bytes) if self.config.cache_dir else None
+        self.data_key = None  # Fingerprint of the training arrays of the last run
+        self.sample_order = None  # Seeded row permutation of the last run, halving rounds take its first n_samples
+
+    def load_fitted(self, estimator):
+        if self.cache is None or self.data_key is None:
+            return None
+        return self.cache.get(self.cache.model_key(self.data_key, estimator))  # Estimator fitted on the same data
+
+    def store_fitted(self, estimator):
+        if self.cache is not None and self.data_key is not None:
+            self.cache.put(self.cache.model_key(self.data_key, estimator), estimator)
+
+    def run(self, models, params, X, y):
+        try:
+            if self.cache is not None:
+                self.data_key = self.cache.data_fingerprint(X, y)  # Part of every cache key
+            self.sample_order = np.random.default_rng(self.config.random_state).permutation(len(X))  # Once per search
+            n_jobs = self._n_jobs()
+            logging.info(f"Model search: {self._strategy_name()} strategy on {n_jobs} worker(s)")
+            if n_jobs == 1:
+                return self._schedule(
+                    models, params, X, _InlineExecutor(X, y, self.sample_order), threads=None, max_in_flight=1
+                )
+
+            threads = 1  # One worker per core keeps the pool inside the budget
+            shared_dir = tempfile.mkdtemp(prefix="model_search_")  # Shared arrays live here for the whole search
+            try:
+                X_path = _shared_array_path(X, os.path.join(shared_dir, "X.npy"))  # Written once, mapped by every worker
+                y_path = _shared_array_path(y, os.path.join(shared_dir, "y.npy"))
+                order_path = _shared_array_path(self.sample_order, os.path.join(shared_dir, "order.npy"))
+                with ProcessPoolExecutor(
+                    max_workers=n_jobs,
+                    mp_context=multiprocessing.get_context("spawn"),  # No forked OpenMP state in workers
+                    initializer=_init_worker,
+                    initargs=(X_path, y_path, order_path, threads),
+                ) as executor:
+                    return self._schedule(models, params, X, executor, threads, max_in_flight=2 * n_jobs)
+            finally:
+                shutil.rmtree(shared_dir, ignore_errors=True)  # Remove the shared arrays
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def _n_jobs(self):
+        n_jobs = self.config.n_jobs
+        if n_jobs is None or n_jobs == 0:
+            n_jobs = 1
+        if n_jobs < 0:
+            n_jobs = os.cpu_count() or 1  # -1 means every core
+        return n_jobs
+
+    def _strategy_name(self):
+        strategy = self.config.strategy
+        return strategy if isinstance(strategy, str) else type(strategy).__name__
+
+    def _make_strategy(self):
+        strategy = self.config.strategy
+        if not isinstance(strategy, str):
+            return strategy  # Custom strategy object with a rounds() method
+        if strategy == "random":
+            return SEARCH_STRATEGIES[strategy](n_iter=self.config.n_iter, random_state=self.config.random_state)
+        if strategy == "halving":
+            return SEARCH_STRATEGIES[strategy](
+                factor=self.config.halving_factor, resource=self.config.halving_resource,
+                min_resources=2 * self.config.cv if self.config.halving_resource == "n_samples" else None,
+            )
+        return SEARCH_STRATEGIES[strategy]()
+
+    def _schedule(self, models, params, X, executor, threads, max_in_flight):
+        states = [
+            _ModelState(
+                name,
+                _limit_threads(model, threads) if threads else model,
+                self._make_strategy(),
+                params[name],
+                len(X),
+                self.config,
+            )
+            for name, model in models.items()
+        ]  # One state machine per model
+        pending = {}  # Future -> (state, candidate indices, fold, cache key)
+        while True:
+            for state in states:
+                while len(pending) < max_in_flight:
+                    group = state.next_group()  # None when the round is fully dispatched or budget spent
+                    if group is None:
+                        break
+                    indices, group_params, n_samples, path = group
+                    for fold in range(self.config.cv):
+                        key = None
+                        if self.cache is not None:
+                            key = self.cache.task_key(
+                                self.data_key, state.estimator, group_params, fold, self.config.cv, n_samples, path,
+                                sample_seed=self.config.random_state,
+                            )
+                            cached = self.cache.get(key)  # Finished in an earlier or interrupted run
+                            if cached is not None:
+                                state.record(indices, fold, cached, from_cache=True)
+                                continue
+                        future = executor.submit(
+                            _fit_and_score_shared, state.estimator, group_params, fold, self.config.cv, n_samples, path
+                        )
+                        pending[future] = (state, indices, fold, key)
+            if not pending:
+                break  # Every model finished
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                state, indices, fold, key = pending.pop(future)
+                result = future.result()
+                if key is not None:
+                    self.cache.put(key, result)  # Saved right away so an interrupted search can resume
+                state.record(indices, fold, result)  # May open the model's next round
+        if self.cache is not None:
+            logging.info(f"Model search cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        return {state.name: state.result() for state in states}
+
+
+class _ModelState:
+    '''
+    Tracks one model through the rounds of its search strategy.
+
+    Combinations that only differ in a path hyperparameter (see PATH_PARAMS) form one
+    group: it is fitted once with the largest value and every smaller value is scored
+    on the prefix of that ensemble.
+    '''
+
+    def __init__(self, name, estimator, strategy, param_grid, n_samples, config):
+        self.name = name
+        self.estimator = estimator
+        self.config = config
+        grid = dict(param_grid)
+        resource = getattr(strategy, "resource", "n_samples")
+        if resource not in grid and resource not in estimator.get_params():
+            resource = "n_samples"  # Models without that hyperparameter, e.g. LinearRegression, halve over rows
+        if resource == "n_samples":
+            self.resource_param = None
+            max_resource = n_samples  # Rows of training data
+        else:
+            self.resource_param = resource
+            values = grid.pop(resource, None)  # The schedule sets this parameter instead of the grid
+            max_resource = max(values) if values else estimator.get_params()[resource]
+        self.path_param = _path_param(estimator, grid) if config.path_scoring else None  # Scored from one fit
+        self.rounds = strategy.rounds(list(ParameterGrid(grid)), max_resource)  # Strategy generator
+        self.cv_results = []  # Every completed evaluation, round after round
+        self.deadline = None  # Set when the first task is dispatched
+        self.budget_exhausted = False
+        self.finished = False
+        self.n_path_groups = 0  # Path group ids handed out so far
+        self._open_round(next(self.rounds))
+
+    def _open_round(self, round_):
+        self.round = [
+            (dict(params, **{self.resource_param: resource}), None) if self.resource_param else (params, resource)
+            for params, resource in round_
+        ]  # (params, n_samples) per candidate
+        groups = {}
+        for index, (params, n_samples) in enumerate(self.round):
+            key = (n_samples, tuple(sorted(
+                (key, repr(value)) for key, value in params.items() if key != self.path_param
+            )))  # Everything except the path hyperparameter
+            groups.setdefault(key, []).append(index)
+        self.groups = list(groups.values())  # Candidate indices per fit, in grid order
+        self.path_groups = {
+            index: self.n_path_groups + position
+            for position, indices in enumerate(self.groups) if len(indices) > 1 for index in indices
+        }  # Candidate index -> id of the shared fit it is scored from
+        self.n_path_groups += len(self.groups)  # Ids stay unique across rounds
+        self.next_group_index = 0  # Next group of the round to dispatch
+        self.folds = {}  # Candidate index -> {fold: task result}
+
+    def next_group(self):
+        if self.finished or self.next_group_index >= len(self.groups):
+            return None
+        now = time.monotonic()
+        if self.deadline is None:
+            self.deadline = now + self.config.time_budget if self.config.time_budget else float("inf")
+        elif now >= self.deadline:
+            self.budget_exhausted = True  # Let started combinations finish, start no new ones
+            self._maybe_close_round()
+            return None
+        indices = self.groups[self.next_group_index]
+        self.next_group_index += 1
+        params, n_samples = self.round[indices[0]]
+        if len(indices) == 1:
+            return indices, params, n_samples, None
+        values = [self.round[index][0][self.path_param] for index in indices]
+        params = dict(params, **{self.path_param: max(values)})  # Fit the largest ensemble once
+        return indices, params, n_samples, (self.path_param, values)
+
+    def record(self, indices, fold, results, from_cache=False):
+        for index, result in zip(indices, results):
+            self.folds.setdefault(index, {})[fold] = dict(result, cached=from_cache)  # Copy, the cache keeps its own
+        self._maybe_close_round()
+
+    def _maybe_close_round(self):
+        started = sorted(index for group in self.groups[:self.next_group_index] for index in group)  # Dispatched candidates
+        if any(len(self.folds.get(index, {})) < self.config.cv for index in started):
+            return  # Folds still running
+        if self.next_group_index < len(self.groups) and not self.budget_exhausted:
+            return  # More candidates to dispatch
+        scores = []
+        for index in started:
+            params, n_samples = self.round[index]
+            folds = [self.folds[index][fold] for fold in range(self.config.cv)]
+            split_scores = [fold["score"] for fold in folds]
+            self.cv_results.append({
+                "params": params,
+                "resource": params[self.resource_param] if self.resource_param else n_samples,
+                "split_test_scores": split_scores,
+                "mean_test_score": float(np.mean(split_scores)),
+                "mean_fit_time": float(np.mean([fold["fit_time"] for fold in folds])),
+                "mean_score_time": float(np.mean([fold["score_time"] for fold in folds])),
+                "split_fit_times": [fold["fit_time"] for fold in folds],
+                "split_score_times": [fold["score_time"] for fold in folds],
+                "split_cpu_times": [fold.get("cpu_time") for fold in folds],  # Missing in results cached by older versions
+                "peak_memory_bytes": max(
+                    (fold["peak_memory"] for fold in folds if fold.get("peak_memory") is not None), default=None
+                ),  # Largest fold
+                "split_cached": [fold["cached"] for fold in folds],  # Replayed from the search cache, not run now
+            })
+            if index in self.path_groups:
+                self.cv_results[-1].update({
+                    "path_group": self.path_groups[index],  # Candidates scored from one shared fit
+                    "path_split_fit_times": [fold.get("path_fit_time", fold["fit_time"]) for fold in folds],
+                    "path_split_score_times": [fold.get("path_score_time", fold["score_time"]) for fold in folds],
+                    "path_split_cpu_times": [fold.get("path_cpu_time", fold.get("cpu_time")) for fold in folds],
+                })  # What the shared fit really took, once for the whole group
+            scores.append(self.cv_results[-1]["mean_test_score"])
+        if self.budget_exhausted:
+            self.finished = True
+            return
+        try:
+            self._open_round(self.rounds.send(np.array(scores)))  # Next round of the strategy
+        except StopIteration:
+            self.finished = True
+
+    def result(self):
+        final = max(
+            (entry["resource"] for entry in self.cv_results),
+            key=lambda resource: float("inf") if resource is None else resource,
+        )  # Only scores from the largest resource are comparable
+        entries = [entry for entry in self.cv_results if entry["resource"] == final]
+        means = np.array([entry["mean_test_score"] for entry in entries])
+        best = entries[int(np.argmax(np.where(np.isnan(means), -np.inf, means)))]  # First best, failed fits rank last
+        if self.budget_exhausted:
+            logging.info(f"{self.name}: time budget spent after {len(self.cv_results)} evaluations")
+        return SearchResult(best["params"], best["mean_test_score"], self.cv_results, self.budget_exhausted)
+
+
+class _InlineExecutor:
+    '''
+    Runs tasks immediately in this process, with the same submit() as the process pool.
+    '''
+
+    def __init__(self, X, y, order):
+        self.X = X  # Training arrays used in place, no copy
+        self.y = y
+        self.order = order  # Row permutation subsamples are drawn from
+
+    def submit(self, fn, estimator, params, fold, n_splits, n_samples, path):
+        future = Future()
+        future.set_result(_fit_and_score(estimator, params, self.X, self.y, fold, n_splits, n_samples, path, self.order))
+        return future
+
+
+def _limit_threads(estimator, threads):
+    estimator = clone(estimator)  # Never touch the caller's estimator
+    class_name = type(estimator).__name__
+    if class_name == "CatBoostRegressor":
+        estimator.set_params(allow_writing_files=False)  # Workers would race on the shared catboost_info directory
+    if class_name in THREAD_PARAMS:
+        estimator.set_params(**{THREAD_PARAMS[class_name]: threads})  # Estimator-level thread cap
+    elif "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=threads)
+    return estimator
+
+
+def _path_param(estimator, grid):
+    param = PATH_PARAMS.get(type(estimator).__name__)
+    if param is None or len(grid.get(param, [])) < 2:
+        return None  # Nothing to share between fits
+    if type(estimator).__name__ == "CatBoostRegressor" and "learning_rate" not in grid \
+            and estimator.get_params().get("learning_rate") is None:
+        return None  # CatBoost derives its learning rate from iterations, prefixes would differ
+    return param
+
+
+def _path_predictions(model, X, values):
+    '''
+    Predictions of the first v members of a fitted ensemble, for every v in values.
+    '''
+    class_name = type(model).__name__
+    if class_name == "AdaBoostRegressor" and hasattr(model, "_get_median_predict"):
+        fitted = len(model.estimators_)  # AdaBoost may stop early, like a smaller fit would
+        return [model._get_median_predict(X, limit=min(value, fitted)) for value in values]  # What predict() runs
+    if class_name in ("GradientBoostingRegressor", "AdaBoostRegressor"):
+        wanted, staged, last = set(values), {}, None
+        for stage, pred in enumerate(model.staged_predict(X), start=1):
+            if stage in wanted:
+                staged[stage] = pred
+            last = pred
+        return [staged.get(value, last) for value in values]  # AdaBoost may stop early, like a smaller fit would
+    if class_name == "RandomForestRegressor":
+        totals = np.cumsum([tree.predict(X) for tree in model.estimators_], axis=0)  # Same summation order as predict
+        return [totals[value - 1] / value for value in values]
+    if class_name == "XGBRegressor":
+        return [model.predict(X, iteration_range=(0, value)) for value in values]
+    if class_name == "CatBoostRegressor":
+        return [model.predict(X, ntree_end=value) for value in values]
+    raise ValueError(f"No path predictions for {class_name}")
+
+
+def _fit_and_score(estimator, params, X, y, fold, n_splits, n_samples=None, path=None, order=None):
+    '''
+    Fits one fold and returns one result per path value (a single result without a path).
+    With n_samples below the number of rows, only the rows order[:n_samples] are used.
+    '''
+    if n_samples is not None and n_samples < len(X):
+        rows = order[:n_samples]  # Random rows, training data may be in source order (hash split)
+        X, y = X[rows], y[rows]
+    train_idx, test_idx = list(KFold(n_splits=n_splits).split(X))[fold]  # Same splits as GridSearchCV(cv=n_splits)
+    model = clone(estimator).set_params(**params)
+    values = path[1] if path else [None]
+    scores, fit_time, score_time = [np.nan] * len(values), None, 0.0
+    usage = ResourceUsage()  # CPU time and peak memory of fit and score together
+    start = time.perf_counter()
+    try:
+        with usage:
+            model.fit(X[train_idx], y[train_idx])
+            fit_time = time.perf_counter() - start
+            start = time.perf_counter()
+            if path is None:
+                scores = [float(model.score(X[test_idx], y[test_idx]))]  # R2 for regressors, like GridSearchCV
+            else:
+                scores = [float(r2_score(y[test_idx], pred)) for pred in _path_predictions(model, X[test_idx], values)]
+            score_time = time.perf_counter() - start
+    except Exception as e:
+        if fit_time is None:
+            fit_time = time.perf_counter() - start  # A failed fit still cost its time
+        else:
+            score_time = time.perf_counter() - start
+        logging.warning(f"Fit failed for {type(estimator).__name__} {params}: {e}")  # Scored as NaN, like error_score
+
+    results = []
+    for value, score in zip(values, scores):
+        share = value / max(values) if path else 1.0  # A prefix of v members costs about v/largest of the shared fit
+        result = {
+            "score": score, "fit_time": fit_time * share, "score_time": score_time * share,
+            "cpu_time": usage.cpu_seconds * share, "peak_memory": usage.peak_memory_bytes,
+        }  # Estimated cost of this combination fitted on its own
+        if path:
+            result.update(path_fit_time=fit_time, path_score_time=score_time, path_cpu_time=usage.cpu_seconds)  # Actually spent once
+        results.append(result)
+    return results
+
+
+_shared = {}  # Per-worker memory-mapped training arrays
+
+
+def _shared_array_path(array, path):
+    if isinstance(array, np.memmap) and str(array.filename).endswith(".npy") and array.flags.c_contiguous:
+        header = np.load(array.filename, mmap_mode="r")  # Only reads the .npy header
+        if header.shape == array.shape and header.dtype == array.dtype:
+            return array.filename  # Already a whole .npy file on disk, workers map it directly
+    np.save(path, np.ascontiguousarray(array))
+    return path
+
+
+def _init_worker(X_path, y_path, order_path, threads):
+    from threadpoolctl import threadpool_limits  # Installed with scikit-learn
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)  # For native libraries loaded later, e.g. when unpickling XGBoost
+    _shared["limits"] = threadpool_limits(threads)  # Cap BLAS and OpenMP pools already loaded in this worker
+    _shared["X"] = np.load(X_path, mmap_mode="r")  # Pages shared through the OS cache
+    _shared["y"] = np.load(y_path, mmap_mode="r")
+    _shared["order"] = np.load(order_path, mmap_mode="r")  # Same row permutation as the parent
+
+
+def _fit_and_score_shared(estimator, params, fold, n_splits, n_samples=None, path=None):
+    return _fit_and_score(
+        estimator, params, _shared["X"], _shared["y"], fold, n_splits, n_samples, path, _shared["order"]
+    )
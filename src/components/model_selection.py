@@ -0,0 +1,148 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import json  # Import json to write the tradeoff table
+import math  # Import math to find missing (NaN) scores
+import time  # Import time to measure prediction latency
+import pickle  # Import pickle to measure the saved model size
+from dataclasses import dataclass, asdict  # Import dataclass for easy class creation
+from datetime import datetime, timezone  # Import datetime to timestamp the table
+
+import numpy as np  # Import numpy for numerical operations
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.components.cost_report import _number  # Import the NaN -> None conversion the cost report uses
+
+TABLE_VERSION = 1  # Bumped whenever the table layout changes
+COSTS = {
+    "single_row": "single_row_ms",  # Median latency of a one-row predict call
+    "batch": "batch_ms",  # Median latency of a batch_rows predict call
+    "size": "size_bytes",  # Pickled model size
+}  # What "cheapest" means, MODEL_SELECTION_COST
+
+
+@dataclass
+class ModelSelectionConfig:
+    r2_tolerance: float = float(os.environ.get("MODEL_SELECTION_R2_TOLERANCE", 0.005))  # Test R2 a cheaper model may give up
+    cost: str = os.environ.get("MODEL_SELECTION_COST", "single_row")  # single_row, batch or size
+    max_latency_ms: float = float(os.environ.get("MODEL_SELECTION_MAX_LATENCY_MS", 0)) or None  # Single-row budget, 0 means none
+    max_batch_ms: float = float(os.environ.get("MODEL_SELECTION_MAX_BATCH_MS", 0)) or None  # Batch budget, 0 means none
+    max_size_bytes: int = int(float(os.environ.get("MODEL_SELECTION_MAX_SIZE_MB", 0)) * 1024 ** 2) or None  # Size budget, 0 means none
+    single_row_calls: int = 50  # One-row predict calls timed per model
+    batch_rows: int = 1000  # Rows per timed batch predict call
+    batch_repeats: int = 5  # Batch predict calls timed per model
+
+    def __post_init__(self):
+        if self.cost not in COSTS:
+            raise ValueError(f"Unknown selection cost {self.cost!r}, expected one of {sorted(COSTS)}")
+
+
+def _median_ms(fn, calls):
+    times = []
+    for i in range(calls):
+        started = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - started)
+    return float(np.median(times)) * 1000, float(np.percentile(times, 95)) * 1000
+
+
+def benchmark_model(model, X_sample, config=None):
+    '''
+    Serving cost of a fitted model: median and p95 latency of one-row predict calls,
+    median latency of a batch_rows predict call and the size of its pickle.
+    '''
+    config = config or ModelSelectionConfig()
+    X_sample = np.ascontiguousarray(X_sample[:max(config.batch_rows, config.single_row_calls)])  # In memory, not mapped
+    rows = [X_sample[i:i + 1] for i in range(len(X_sample))]
+    batch = X_sample[:config.batch_rows]
+
+    model.predict(rows[0])  # Warm up lazily built state (XGBoost predictor, caches)
+    single_ms, single_p95_ms = _median_ms(lambda i: model.predict(rows[i % len(rows)]), config.single_row_calls)
+    batch_ms, _ = _median_ms(lambda i: model.predict(batch), config.batch_repeats)
+    return {
+        "single_row_ms": single_ms,
+        "single_row_p95_ms": single_p95_ms,
+        "batch_ms": batch_ms,
+        "batch_rows": len(batch),
+        "batch_row_us": batch_ms * 1000 / max(1, len(batch)),  # Amortized cost of one row in a batch
+        "size_bytes": len(pickle.dumps(model)),  # Same pickle save_object writes to model.pkl
+    }
+
+
+def _over_budget(row, config):
+    reasons = []
+    if config.max_latency_ms is not None and row["single_row_ms"] > config.max_latency_ms:
+        reasons.append("latency")
+    if config.max_batch_ms is not None and row["batch_ms"] > config.max_batch_ms:
+        reasons.append("batch_latency")
+    if config.max_size_bytes is not None and row["size_bytes"] > config.max_size_bytes:
+        reasons.append("size")
+    return reasons
+
+
+def select_model(models, scores, X_sample, config=None):
+    '''
+    Picks the model to serve from fitted models and their test R2 scores: the cheapest
+    model, by config.cost, whose score is within r2_tolerance of the best score and that
+    stays within the latency and size budgets. When no model meets both, the best
+    scoring model is kept. Returns (name, tradeoff table).
+    '''
+    config = config or ModelSelectionConfig()
+    try:
+        best_score_model = max(scores, key=lambda name: -math.inf if math.isnan(scores[name]) else scores[name])
+        best_score = scores[best_score_model]
+
+        rows = []
+        for name, score in scores.items():
+            row = {"model": name, "test_score": score, "r2_gap": best_score - score}
+            row.update(benchmark_model(models[name], X_sample, config))
+            row["within_tolerance"] = bool(row["r2_gap"] <= config.r2_tolerance)  # NaN scores never qualify
+            row["over_budget"] = _over_budget(row, config)
+            rows.append(row)
+        cost_key = COSTS[config.cost]
+        rows.sort(key=lambda row: (row[cost_key], -row["test_score"]))  # Cheapest first, ties to the better score
+
+        eligible = [row for row in rows if row["within_tolerance"] and not row["over_budget"]]
+        if eligible:
+            selected = eligible[0]["model"]
+        else:
+            selected = best_score_model
+            logging.warning(
+                f"No model within {config.r2_tolerance} R2 of {best_score_model} meets the latency and size budgets, "
+                f"keeping {best_score_model}"
+            )
+        for row in rows:
+            row["selected"] = row["model"] == selected
+
+        chosen = next(row for row in rows if row["selected"])
+        logging.info(
+            f"Selected {selected} (R2 {chosen['test_score']:.4f}, {chosen['single_row_ms']:.3f} ms per row, "
+            f"{chosen['size_bytes']} bytes); best R2 {best_score:.4f} by {best_score_model}"
+        )
+        table = {
+            "schema_version": TABLE_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "selected": selected,
+            "best_score_model": best_score_model,
+            "config": asdict(config),  # Tolerance, cost and budgets the choice was made with
+            "models": [
+                dict(row, test_score=_number(row["test_score"]), r2_gap=_number(row["r2_gap"])) for row in rows
+            ],  # Cheapest first, failed or NaN scores as null
+        }
+        return selected, table
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def save_tradeoff_table(table, file_path):
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)  # Create the directory if it doesn't exist
+        tmp_path = f"{file_path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(table, file_obj, indent=2, default=str, allow_nan=False)  # Strict JSON like the cost report
+        os.replace(tmp_path, file_path)  # Atomically swap it in like save_object
+        return file_path
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
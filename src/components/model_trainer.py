@@ -1,101 +1,159 @@
 import os  # Import os for file and directory operations
 import sys  # Import sys for system-specific parameters
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))) # Adds the project root directory to the Python path so that imports like 'from src...'
-from dataclasses import dataclass  # Import dataclass for easy class creation
-
-from catboost import CatBoostRegressor  # Import CatBoostRegressor model
-from sklearn.ensemble import (
-    AdaBoostRegressor,
-    GradientBoostingRegressor,
-    RandomForestRegressor,
-)  # Import ensemble models
-from sklearn.linear_model import LinearRegression  # Import linear regression model
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
+
 from sklearn.metrics import r2_score  # Import r2_score for model evaluation
-from sklearn.neighbors import KNeighborsRegressor  # Import KNN regressor (not used here)
-from sklearn.tree import DecisionTreeRegressor  # Import decision tree regressor
-from xgboost import XGBRegressor  # Import XGBoost regressor
 
 from src.exception import CustomException  # Import custom exception for error handling
 from src.logger import logging  # Import logging for logging messages
 
-from src.utils import save_object, evaluate_models  # Import utility functions
+import numpy as np  # Import numpy for numerical operations
+
+from src.utils import save_object, load_object, evaluate_models, file_digest, TRAINING_STAGE_SECONDS  # Import utility functions
+from src import metrics  # Import the lightweight metrics registry
+from src.metrics import span  # Import the timing span
+from src.components.model_registry import create_models  # Import the lazily resolved model registry
+from src.components.model_search import ModelSearchConfig  # Import search settings (core budget, CV folds)
+from src.components.out_of_core import OutOfCoreConfig, OutOfCoreTrainer  # Import chunked training for data larger than memory
+from src.components.cost_report import build_cost_report, save_cost_report, model_costs  # Import the training cost report
+from src.components.model_selection import ModelSelectionConfig, select_model, save_tradeoff_table  # Import serving-cost-aware selection
+from src.components.artifact_store import load_arrays  # Import the memory-mapped array loader
+from src.serialization import save_model  # Import the per-model-type serializer
+from src.components.compiled_model import compile_model  # Import the NumPy-only model export
+from src.components.prediction_table import build_prediction_table  # Import the offline prediction table builder
+from src.components.data_transformation import DataTransformationConfig  # Import to locate the fitted preprocessor
+from src.pipeline.artifact_cache import publish_artifact_set  # Import the record that pairs the model with its preprocessor
 
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = os.path.join("artifacts", "model.pkl")  # Path to save the trained model
+    trained_model_dir = os.path.join("artifacts", "model")  # Directory for the model in its native or mmap-able format
+    compiled_model_dir = os.path.join("artifacts", "compiled_model")  # Directory for the NumPy-only model
+    compiled_model_tolerance: float = 1e-3  # Largest allowed difference from the fitted model's predictions
+    compiled_model_sample_rows: int = 10000  # Test rows the compiled model is compared on
+    prediction_table_dir = os.path.join("artifacts", "prediction_table")  # Directory for the precomputed predictions
+    materialize_predictions: bool = os.environ.get("MATERIALIZE_PREDICTIONS", "0") == "1"  # Precompute every input after training
+    training_metrics_file_path = os.path.join("artifacts", "training_metrics.prom")  # Stage timings of the last run, Prometheus text format
+    cost_report_file_path = os.path.join("artifacts", "model_cost_report.json")  # Time and memory of every evaluated model and combination
+    tradeoff_table_file_path = os.path.join("artifacts", "model_tradeoffs.json")  # Score, latency and size of every model
+    serving_set_file_path = os.path.join("artifacts", "serving_set.json")  # Model and preprocessor digests served together, written last
+    search_config: ModelSearchConfig = field(default_factory=ModelSearchConfig)  # Model search settings
+    out_of_core: OutOfCoreConfig = field(default_factory=OutOfCoreConfig)  # Chunked training settings
+    selection: ModelSelectionConfig = field(default_factory=ModelSelectionConfig)  # R2 tolerance and serving budgets
 
 class ModelTrainer:
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()  # Initialize config
 
     def initiate_model_trainer(self, train_array, test_array):
+        logging.info("Split training and test input data")  # Log data splitting
+        return self.train_and_select(
+            train_array[:, :-1],  # Features from train data
+            train_array[:, -1],   # Target from train data
+            test_array[:, :-1],   # Features from test data
+            test_array[:, -1]     # Target from test data
+        )
+
+    def initiate_model_trainer_from_arrays(self, arrays_dir, export=True):
+        '''
+        Trains on the arrays saved by DataTransformation.initiate_array_transformation,
+        memory-mapped read-only instead of loaded and split.
+        '''
         try:
-            logging.info("Split training and test input data")  # Log data splitting
-            X_train, y_train, X_test, y_test = (
-                train_array[:, :-1],  # Features from train data
-                train_array[:, -1],   # Target from train data
-                test_array[:, :-1],   # Features from test data
-                test_array[:, -1]     # Target from test data
-            )
-            models = {
-                "Random Forest": RandomForestRegressor(),
-                "Decision Tree": DecisionTreeRegressor(),
-                "Gradient Boosting": GradientBoostingRegressor(),
-                "Linear Regression": LinearRegression(),
-                "XGBRegressor": XGBRegressor(),
-                "CatBoosting Regressor": CatBoostRegressor(verbose=False), # CatBoostRegressor is unique because it can handle categorical features automatically. It uses ordered boosting to reduce overfitting and often works well
-                "AdaBoost Regressor": AdaBoostRegressor(),
-            }  # Dictionary of models to train
-            params = {
-                "Decision Tree": {
-                    'criterion': ['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
-                },
-                "Random Forest": {
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                },
-                "Gradient Boosting": {
-                    'learning_rate': [.1, .01, .05, .001],
-                    'subsample': [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                },
-                "Linear Regression": {},
-                "XGBRegressor": {
-                    'learning_rate': [.1, .01, .05, .001],
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                },
-                "CatBoosting Regressor": {
-                    'depth': [6, 8, 10],
-                    'learning_rate': [0.01, 0.05, 0.1],
-                    'iterations': [30, 50, 100]
-                },
-                "AdaBoost Regressor": {
-                    'learning_rate': [.1, .01, 0.5, .001],
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                }
-            }  # Hyperparameters for each model
-
-            model_report: dict = evaluate_models(
-                X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test,
-                models=models, param=params
-            )  # Evaluate all models and get their scores
+            arrays, metadata = load_arrays(arrays_dir)  # Features and target are separate files
+            logging.info(f"Memory-mapped {metadata.get('target')} training arrays from {arrays_dir}")
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+        if self.model_trainer_config.out_of_core.enabled:
+            return self.train_and_select_out_of_core(
+                arrays["X_train"], arrays["y_train"], arrays["X_test"], arrays["y_test"], export=export
+            )  # Never loads the arrays as a whole
+        return self.train_and_select(arrays["X_train"], arrays["y_train"], arrays["X_test"], arrays["y_test"], export=export)
 
-            # Get the best model score from the report
-            best_model_score = max(sorted(model_report.values()))
+    def get_param_grids(self):
+        '''
+        Hyperparameter grid searched for each model. The training pipeline fingerprints it,
+        so changing it only reruns training.
+        '''
+        if self.model_trainer_config.out_of_core.enabled:
+            return self.get_out_of_core_param_grids()
+        return {
+            "Decision Tree": {
+                'criterion': ['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
+            },
+            "Random Forest": {
+                'n_estimators': [8, 16, 32, 64, 128, 256]
+            },
+            "Gradient Boosting": {
+                'learning_rate': [.1, .01, .05, .001],
+                'subsample': [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
+                'n_estimators': [8, 16, 32, 64, 128, 256]
+            },
+            "Linear Regression": {},
+            "XGBRegressor": {
+                'learning_rate': [.1, .01, .05, .001],
+                'n_estimators': [8, 16, 32, 64, 128, 256]
+            },
+            "CatBoosting Regressor": {
+                'depth': [6, 8, 10],
+                'learning_rate': [0.01, 0.05, 0.1],
+                'iterations': [30, 50, 100]
+            },
+            "AdaBoost Regressor": {
+                'learning_rate': [.1, .01, 0.5, .001],
+                'n_estimators': [8, 16, 32, 64, 128, 256]
+            }
+        }  # Hyperparameters for each model
 
-            # Get the name of the best model
-            best_model_name = list(model_report.keys())[
-                list(model_report.values()).index(best_model_score)
-            ]
+    def get_out_of_core_param_grids(self):
+        '''
+        Models that can train chunk by chunk: partial_fit estimators and XGBoost with
+        external memory.
+        '''
+        return {
+            "SGD Regressor": {
+                'alpha': [1e-5, 1e-4, 1e-3],
+                'eta0': [.01, .001]
+            },
+            "XGBRegressor": {
+                'learning_rate': [.1, .05],
+                'max_depth': [4, 6],
+                'n_estimators': [32, 64, 128, 256]
+            }
+        }  # Hyperparameters for each model
+
+    def train_and_select(self, X_train, y_train, X_test, y_test, export=True):
+        '''
+        Searches every model, saves the best one and, with export, its compiled form and
+        prediction table. The training pipeline passes export=False and runs those as
+        separate stages.
+        '''
+        try:
+            params = self.get_param_grids()  # Hyperparameters for each model
+            models = create_models(list(params))  # Dictionary of models to train, imported on demand
+
+            search_config = self.model_trainer_config.search_config
+            model_report, costs = evaluate_models(
+                X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test,
+                models=models, param=params, search_config=search_config, return_costs=True
+            )  # Evaluate all models and get their scores and costs
+
+            best_model_name = self.select_best_model(models, model_report, X_test)  # Cheapest model close to the best score
+            best_model_score = model_report[best_model_name]
             best_model = models[best_model_name]  # Get the best model object
+            self.save_cost_report(costs, best_model_name, X_train, X_test, {
+                "mode": "cross_validation",
+                "strategy": search_config.strategy if isinstance(search_config.strategy, str) else type(search_config.strategy).__name__,
+                "cv": search_config.cv,
+                "n_jobs": search_config.n_jobs,
+            })  # Saved before the score check, so a failed run can still be analysed
 
             if best_model_score < 0.6:
-                raise CustomException("No best model found")  # Raise error if no good model found
+                raise CustomException("No best model found", sys)  # Raise error if no good model found
             logging.info(f"Best found model on both training and testing dataset")  # Log best model found
 
-            save_object(
-                file_path=self.model_trainer_config.trained_model_file_path,
-                obj=best_model
-            )  # Save the best model to file
+            self.save_best_model(best_model, X_test, export)  # Model files and serving exports
 
             predicted = best_model.predict(X_test)  # Predict on test data
 
@@ -103,4 +161,130 @@ class ModelTrainer:
             return r2_square  # Return the R2 score
 
         except Exception as e:
-            raise CustomException(e, sys)  # Raise custom exception if error occurs
\ No newline at end of file
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def train_and_select_out_of_core(self, X_train, y_train, X_test, y_test, export=True):
+        '''
+        train_and_select for arrays larger than memory: every combination is trained
+        chunk by chunk and chosen by its R2 on validation rows held out of the training
+        arrays; only the chosen fit of each model is scored on the test arrays, and
+        models are compared by that score like in train_and_select (see OutOfCoreTrainer).
+        '''
+        try:
+            config = self.model_trainer_config
+            with span(TRAINING_STAGE_SECONDS, "search"):
+                results = OutOfCoreTrainer(config.out_of_core).run(self.get_param_grids(), X_train, y_train, X_test, y_test)
+            model_report = {name: result.score for name, result in results.items()}  # Test R2 of each model's chosen fit
+
+            fitted = {name: result.model for name, result in results.items()}
+            best_model_name = self.select_best_model(fitted, model_report, X_test)  # Cheapest model close to the best score
+            best_model_score = model_report[best_model_name]
+            best_model = fitted[best_model_name]
+            costs = {
+                name: model_costs(
+                    name, result.candidates, result.params, result.validation_score, test_score=result.score
+                )
+                for name, result in results.items()
+            }  # No separate refit, the chosen combination's fit is kept
+            self.save_cost_report(costs, best_model_name, X_train, X_test, {
+                "mode": "out_of_core_holdout",
+                "chunk_rows": config.out_of_core.chunk_rows,
+                "epochs": config.out_of_core.epochs,
+                "validation_fraction": config.out_of_core.validation_fraction,
+            })
+
+            if best_model_score < 0.6:
+                raise CustomException("No best model found", sys)  # Raise error if no good model found
+            logging.info(f"Best out-of-core model: {best_model_name} with test R2 {best_model_score}")
+
+            self.save_best_model(best_model, X_test, export)  # The export check reads only a sample
+            return best_model_score  # Already the R2 score on the test arrays
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def select_best_model(self, models, model_report, X_test):
+        '''
+        Chooses among the fitted models by test R2 and serving cost (see select_model) and
+        saves the tradeoff table next to the model. Returns the chosen model's name.
+        '''
+        config = self.model_trainer_config
+        with span(TRAINING_STAGE_SECONDS, "selection"):
+            best_model_name, table = select_model(models, model_report, X_test, config.selection)
+        save_tradeoff_table(table, config.tradeoff_table_file_path)
+        return best_model_name
+
+    def save_cost_report(self, costs, best_model_name, X_train, X_test, search):
+        '''
+        Writes the cost report of this run next to the model, see build_cost_report.
+        '''
+        report = build_cost_report(costs, best_model=best_model_name, search=dict(
+            search, n_train_rows=len(X_train), n_test_rows=len(X_test), n_features=int(X_train.shape[1]),
+        ))
+        save_cost_report(report, self.model_trainer_config.cost_report_file_path)
+        totals = report["totals"]
+        logging.info(
+            f"Training cost: {totals['evaluations']} evaluations, {totals['total_seconds']:.1f} s, "
+            f"{totals['cpu_seconds']:.1f} CPU s; report in {self.model_trainer_config.cost_report_file_path}"
+        )
+        return report
+
+    def save_best_model(self, best_model, sample_X, export=True):
+        '''
+        Saves the selected model as a pickle and in its fast-loading format and, with
+        export, its compiled form and prediction table.
+        '''
+        with span(TRAINING_STAGE_SECONDS, "save"):
+            save_object(
+                file_path=self.model_trainer_config.trained_model_file_path,
+                obj=best_model
+            )  # Save the best model to file
+            manifest_path = save_model(best_model, self.model_trainer_config.trained_model_dir)  # Fast-loading copy used for serving
+            publish_artifact_set(self.model_trainer_config.serving_set_file_path, [
+                self.model_trainer_config.trained_model_file_path,
+                manifest_path,
+                DataTransformationConfig().preprocessor_obj_file_path,
+            ])  # Serving swaps the new model and the preprocessor it was trained with together
+        if export:
+            with span(TRAINING_STAGE_SECONDS, "export"):
+                self.export_compiled_model(best_model, sample_X, manifest_path)  # Library-free serving path
+                if self.model_trainer_config.materialize_predictions:
+                    self.materialize_predictions(best_model, manifest_path)  # Serving becomes a table read
+        metrics.REGISTRY.write_textfile(self.model_trainer_config.training_metrics_file_path)  # Timings of this run
+        return manifest_path
+
+    def export_compiled_model(self, model, sample_X, manifest_path):
+        '''
+        Saves the NumPy-only form of the fitted model, but only if its predictions on the
+        sample stay within compiled_model_tolerance; otherwise serving keeps using the model.
+        '''
+        config = self.model_trainer_config
+        try:
+            compiled = compile_model(
+                model,
+                source_digests=[file_digest(config.trained_model_file_path), file_digest(manifest_path)],
+            )  # Tie the export to the model files it was compiled from
+            sample_X = sample_X[:config.compiled_model_sample_rows]  # Enough rows to catch a difference, bounded memory
+            difference = float(np.max(np.abs(compiled.predict(sample_X) - model.predict(sample_X))))
+            if not difference <= config.compiled_model_tolerance:
+                logging.warning(f"Compiled model differs by {difference}, not exporting it")
+                return None
+        except ValueError as e:
+            logging.warning(f"Model cannot be compiled: {e}")
+            return None
+
+        compiled.save(config.compiled_model_dir)  # Saved next to the model
+        logging.info(f"Saved compiled {type(model).__name__}, largest difference {difference}")
+        return config.compiled_model_dir
+
+    def materialize_predictions(self, model, manifest_path):
+        '''
+        Precomputes the model's prediction for every valid input into a memory-mapped table.
+        '''
+        config = self.model_trainer_config
+        preprocessor_path = DataTransformationConfig().preprocessor_obj_file_path  # Preprocessor the model was trained with
+        return build_prediction_table(
+            model, load_object(preprocessor_path), config.prediction_table_dir,
+            model_digests=[file_digest(config.trained_model_file_path), file_digest(manifest_path)],
+            preprocessor_digest=file_digest(preprocessor_path),
+        )
@@ -0,0 +1,419 @@
+import os  # Import os to read configuration from the environment
+import sys  # Import sys for system-specific parameters and functions
+import tempfile  # Import tempfile for XGBoost's external-memory cache
+import time  # Import time to measure fit and score times
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
+
+import numpy as np  # Import numpy for numerical operations
+import pandas as pd  # Import pandas for per-chunk value counts
+from sklearn.base import clone  # Import clone to get unfitted copies of the scalers
+from sklearn.model_selection import ParameterGrid  # Import the same grid expansion the model search uses
+from sklearn.pipeline import Pipeline  # Import Pipeline to read the preprocessor steps
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.utils import MODEL_SEARCH_SECONDS, MODEL_SEARCH_EVALUATIONS  # Import the model search metrics
+from src.components.model_registry import MODEL_REGISTRY, create_model, get_model_class  # Import the model registry
+from src.components.cost_report import ResourceUsage  # Import the time and memory meter
+
+
+@dataclass
+class OutOfCoreConfig:
+    enabled: bool = os.environ.get("OUT_OF_CORE", "0") == "1"  # Fit and train chunk by chunk instead of in memory
+    chunk_rows: int = int(os.environ.get("OUT_OF_CORE_CHUNK_ROWS", 100000))  # Rows held in memory at a time
+    max_distinct_values: int = 100000  # Exact medians while a numeric column has at most this many distinct values
+    median_sample_size: int = 100000  # Uniform sample a median is estimated from beyond that
+    epochs: int = 5  # Passes over the training data for partial_fit models
+    validation_fraction: float = 0.1  # Last rows of the training arrays held out to choose hyperparameters
+    random_state: int = 42  # Seed for the chunk order and the median sample
+    cache_dir: str = os.environ.get("OUT_OF_CORE_CACHE_DIR", "")  # XGBoost external-memory pages, empty for the system temp dir
+
+
+class _ColumnStats:
+    '''
+    Counts of every distinct value of one column, merged chunk by chunk, and for a
+    numeric column a uniform random sample of its values. Once a column has more than
+    max_distinct_values distinct values the counts are dropped and its median is
+    estimated from the sample.
+    '''
+
+    def __init__(self, config, rng):
+        self.config = config
+        self.rng = rng
+        self.counts = pd.Series(dtype=np.float64)  # Value -> number of rows, None once sampling
+        self.sample = None  # Sampled values of a numeric column, kept with their random priorities
+        self.priorities = None
+        self.n = 0  # Rows with a value
+        self.total = 0.0  # Sum of the values of a numeric column
+
+    def update(self, values):
+        present = values.dropna()
+        self.n += len(present)
+        if pd.api.types.is_numeric_dtype(present):
+            self.total += float(present.sum())
+            self._sample(present.to_numpy(dtype=np.float64))  # Kept from the start, so it stays uniform
+        if self.counts is not None:
+            self.counts = self.counts.add(present.value_counts(), fill_value=0)
+            if len(self.counts) > self.config.max_distinct_values:
+                logging.warning(f"Column {values.name} has over {self.config.max_distinct_values} distinct values")
+                self.counts = None  # Medians come from the sample from now on
+
+    def _sample(self, values):
+        priorities = self.rng.random(len(values))  # Keeping the smallest priorities keeps a uniform sample
+        if self.sample is not None:
+            values = np.concatenate([self.sample, values])
+            priorities = np.concatenate([self.priorities, priorities])
+        if len(values) > self.config.median_sample_size:
+            keep = np.argpartition(priorities, self.config.median_sample_size)[:self.config.median_sample_size]
+            values, priorities = values[keep], priorities[keep]
+        self.sample, self.priorities = values, priorities
+
+    def median(self):
+        if self.counts is None:
+            return float(np.median(self.sample))
+        counts = self.counts.sort_index()
+        cumulative = counts.cumsum().to_numpy()
+        values = counts.index.to_numpy(dtype=np.float64)
+        lower = values[np.searchsorted(cumulative, (self.n - 1) // 2, side="right")]  # Same middle values as np.median
+        upper = values[np.searchsorted(cumulative, self.n // 2, side="right")]
+        return (lower + upper) / 2
+
+    def mean(self):
+        return self.total / self.n
+
+    def categories(self):
+        if self.counts is None:
+            raise ValueError("Too many categories to one-hot encode out of core")
+        return sorted(self.counts.index)  # Same order as OneHotEncoder's categories_
+
+    def most_frequent(self):
+        if self.counts is None:
+            raise ValueError("Too many distinct values for the most_frequent strategy out of core")
+        top = self.counts.max()
+        return min(self.counts.index[self.counts == top])  # Ties go to the smallest value, like SimpleImputer
+
+
+def _steps(transformer):
+    if isinstance(transformer, Pipeline):
+        return [step for _, step in transformer.steps]
+    return [transformer]
+
+
+def _seed_column(steps, stats):
+    '''
+    Values whose fit gives the imputer and encoder in steps the state a fit on the
+    whole column would give them.
+    '''
+    kinds = {type(step).__name__: step for step in steps}
+    if set(kinds) - {"SimpleImputer", "OneHotEncoder", "StandardScaler"}:
+        raise ValueError(f"Cannot fit {list(kinds)} out of core")
+    imputer, encoder = kinds.get("SimpleImputer"), kinds.get("OneHotEncoder")
+    if encoder is not None and (encoder.min_frequency is not None or encoder.max_categories is not None):
+        raise ValueError("Cannot fit OneHotEncoder with infrequent categories out of core")
+    if imputer is None:
+        fill = None
+    elif imputer.strategy == "median":
+        fill = stats.median()
+    elif imputer.strategy == "mean":
+        fill = stats.mean()
+    elif imputer.strategy == "most_frequent":
+        fill = stats.most_frequent()
+    else:
+        fill = imputer.fill_value  # constant
+    if encoder is None:
+        return [fill if fill is not None else 0.0]  # Every row imputes to the fill value
+    return stats.categories() + ([fill] if fill is not None else [])  # One row per category, the fill value twice
+
+
+def fit_preprocessor_out_of_core(preprocessor, make_chunks, config):
+    '''
+    Fits an unfitted ColumnTransformer of SimpleImputer, OneHotEncoder and StandardScaler
+    pipelines on a table that does not fit in memory. make_chunks() must return a new
+    iterator over the feature DataFrame in chunks each time it is called.
+
+    Pass 1 counts the values of every column. The imputers and encoders are then fitted
+    on a small seed frame built from those counts, which gives them exactly the
+    statistics and vocabularies of a full fit. Pass 2 streams the imputed and encoded
+    chunks through StandardScaler.partial_fit. Returns (preprocessor, n_rows).
+    '''
+    try:
+        rng = np.random.default_rng(config.random_state)
+        used = {col for _, _, columns in preprocessor.transformers for col in columns}
+        stats, columns, first_row, n_rows = {}, None, None, 0
+        for chunk in make_chunks():
+            if columns is None:
+                columns = list(chunk.columns)
+                first_row = chunk.iloc[0]
+                stats = {col: _ColumnStats(config, rng) for col in columns if col in used}
+            for col, column_stats in stats.items():
+                column_stats.update(chunk[col])
+            n_rows += len(chunk)
+        if n_rows == 0:
+            raise ValueError("No rows to fit the preprocessor on")
+
+        seed = {}
+        for _, transformer, transformer_columns in preprocessor.transformers:
+            for col in transformer_columns:
+                seed[col] = _seed_column(_steps(transformer), stats[col])
+        length = max(len(values) for values in seed.values())
+        seed_df = pd.DataFrame({
+            col: seed[col] + [seed[col][-1]] * (length - len(seed[col])) if col in seed else [first_row[col]] * length
+            for col in columns
+        })  # Padding repeats the fill value, so it stays the most frequent
+        preprocessor.fit(seed_df)
+
+        scalers = {}
+        for name, transformer, transformer_columns in preprocessor.transformers_:
+            steps = _steps(transformer)
+            if type(steps[-1]).__name__ == "StandardScaler":
+                prefix = transformer[:-1] if len(steps) > 1 else None  # Fitted steps before the scaler
+                scalers[name] = (transformer, prefix, clone(steps[-1]), transformer_columns)
+        for chunk in make_chunks():
+            for _, prefix, scaler, transformer_columns in scalers.values():
+                values = chunk[transformer_columns]
+                scaler.partial_fit(prefix.transform(values) if prefix is not None else values.to_numpy(dtype=np.float64))
+        for name, (transformer, _, scaler, _) in scalers.items():
+            if isinstance(transformer, Pipeline):
+                transformer.steps[-1] = (transformer.steps[-1][0], scaler)  # Streamed statistics replace the seed fit
+            else:
+                preprocessor.transformers_ = [
+                    (step_name, scaler if step_name == name else step, step_columns)
+                    for step_name, step, step_columns in preprocessor.transformers_
+                ]
+        logging.info(f"Fitted the preprocessor out of core on {n_rows} rows")
+        return preprocessor, n_rows
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+class StreamingR2:
+    '''
+    R2 score accumulated chunk by chunk. Equal to r2_score on the concatenated arrays
+    up to rounding.
+    '''
+
+    def __init__(self):
+        self.n = 0  # Rows seen
+        self.mean = 0.0  # Running mean of the target
+        self.m2 = 0.0  # Running sum of squared deviations from the mean
+        self.sse = 0.0  # Sum of squared residuals
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        if len(y_true) == 0:
+            return
+        chunk_mean = float(y_true.mean())
+        delta = chunk_mean - self.mean
+        total = self.n + len(y_true)
+        self.m2 += float(((y_true - chunk_mean) ** 2).sum()) + delta ** 2 * self.n * len(y_true) / total  # Chan et al. merge
+        self.mean += delta * len(y_true) / total
+        self.n = total
+        self.sse += float(((y_true - np.asarray(y_pred, dtype=np.float64)) ** 2).sum())
+
+    def score(self):
+        if self.m2 == 0:
+            return 1.0 if self.sse == 0 else 0.0  # Constant target, same as r2_score
+        return 1.0 - self.sse / self.m2
+
+
+def chunk_slices(n_rows, chunk_rows, start=0):
+    return [slice(begin, min(begin + chunk_rows, n_rows)) for begin in range(start, n_rows, chunk_rows)]
+
+
+def _streamed_score(predict, X, y, slices):
+    score = StreamingR2()
+    for chunk in slices:
+        score.update(np.asarray(y[chunk]), predict(np.asarray(X[chunk])))  # One chunk in memory
+    return score.score()
+
+
+@dataclass
+class OutOfCoreResult:
+    model: object  # Best fitted estimator of the model family
+    params: dict  # Its hyperparameters
+    score: float  # Its R2 score on the test arrays, which played no part in choosing it
+    validation_score: float  # Its R2 score on the validation rows it was chosen by
+    candidates: list = field(default_factory=list)  # One ModelSearch-style cv_results entry per combination, one holdout split
+
+
+class OutOfCoreTrainer:
+    '''
+    Model selection on memory-mapped training arrays that do not fit in memory. The
+    last validation_fraction of the training rows is held out; every combination of
+    the grid is trained chunk by chunk on the rest and scored on those rows with a
+    streamed R2, there is no cross-validation. Only the chosen fit is scored on the
+    test arrays.
+
+    Estimators with partial_fit (SGDRegressor) see each chunk in turn for a number of
+    epochs, all combinations from the same chunk read. XGBoost trains from an iterator
+    over the chunks into an external-memory quantile matrix, once per combination
+    with the largest n_estimators; smaller values are scored as prefixes of it.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or OutOfCoreConfig()  # Chunk size, epochs and cache location
+
+    def run(self, param_grids, X_train, y_train, X_test, y_test):
+        results = {}
+        for name, grid in param_grids.items():
+            if MODEL_REGISTRY[name][1] == "XGBRegressor":
+                results[name] = self._fit_xgboost(name, grid, X_train, y_train, X_test, y_test)
+            elif hasattr(get_model_class(name), "partial_fit"):
+                results[name] = self._fit_partial(name, grid, X_train, y_train, X_test, y_test)
+            else:
+                raise ValueError(f"{name} has no partial_fit and cannot be trained out of core")
+            MODEL_SEARCH_EVALUATIONS.inc(name, amount=len(results[name].candidates))
+            logging.info(
+                f"{name}: validation R2 {results[name].validation_score:.4f}, "
+                f"test R2 {results[name].score:.4f} with {results[name].params}"
+            )
+        return results
+
+    def _holdout(self, n_rows):
+        n_validation = max(1, int(round(n_rows * self.config.validation_fraction)))
+        if n_validation >= n_rows:
+            raise ValueError(f"{n_rows} training rows are too few to hold out a validation slice")
+        n_fit = n_rows - n_validation
+        return (
+            chunk_slices(n_fit, self.config.chunk_rows),  # Rows the combinations are trained on
+            chunk_slices(n_rows, self.config.chunk_rows, start=n_fit),  # Rows they are chosen by
+        )
+
+    def _test_score(self, predict, X_test, y_test):
+        return _streamed_score(predict, X_test, y_test, chunk_slices(len(y_test), self.config.chunk_rows))
+
+    def _fit_partial(self, name, grid, X_train, y_train, X_test, y_test):
+        combinations = list(ParameterGrid(grid))
+        models = [create_model(name, **params) for params in combinations]
+        fit_times, cpu_times = np.zeros(len(models)), np.zeros(len(models))
+        rng = np.random.default_rng(self.config.random_state)
+        slices, validation_slices = self._holdout(len(y_train))
+        with ResourceUsage() as usage:  # Combinations share chunk reads, so only their joint peak is known
+            for _ in range(self.config.epochs):
+                for index in rng.permutation(len(slices)):  # New chunk order every epoch
+                    X, y = np.asarray(X_train[slices[index]]), np.asarray(y_train[slices[index]])  # One chunk in memory
+                    for i, model in enumerate(models):
+                        started, cpu_started = time.perf_counter(), time.process_time()
+                        model.partial_fit(X, y)
+                        fit_times[i] += time.perf_counter() - started
+                        cpu_times[i] += time.process_time() - cpu_started
+
+            scores = [StreamingR2() for _ in models]
+            score_times = np.zeros(len(models))
+            for chunk in validation_slices:
+                X, y = np.asarray(X_train[chunk]), np.asarray(y_train[chunk])
+                for i, model in enumerate(models):
+                    started, cpu_started = time.perf_counter(), time.process_time()
+                    scores[i].update(y, model.predict(X))
+                    score_times[i] += time.perf_counter() - started
+                    cpu_times[i] += time.process_time() - cpu_started
+
+        candidates = [
+            _holdout_entry(params, score.score(), fit_time, score_time, cpu_time, usage.peak_memory_bytes)
+            for params, score, fit_time, score_time, cpu_time in zip(combinations, scores, fit_times, score_times, cpu_times)
+        ]
+        MODEL_SEARCH_SECONDS.inc(name, "fit", amount=float(fit_times.sum()))
+        MODEL_SEARCH_SECONDS.inc(name, "score", amount=float(score_times.sum()))
+        best = int(np.argmax([candidate["mean_test_score"] for candidate in candidates]))
+        test_score = self._test_score(models[best].predict, X_test, y_test)
+        return OutOfCoreResult(
+            models[best], combinations[best], test_score, candidates[best]["mean_test_score"], candidates
+        )
+
+    def _fit_xgboost(self, name, grid, X_train, y_train, X_test, y_test):
+        import xgboost  # Only needed when XGBoost is in the grid
+
+        grid = dict(grid)
+        default_rounds = create_model(name).get_params()["n_estimators"] or 100  # XGBoost's own default when None
+        rounds = sorted(grid.pop("n_estimators", [default_rounds]))
+        candidates, best = [], None
+        slices, validation_slices = self._holdout(len(y_train))
+        with tempfile.TemporaryDirectory(prefix="xgboost-cache-", dir=self.config.cache_dir or None) as cache_dir:
+            batches = _array_batches(X_train, y_train, slices, os.path.join(cache_dir, "train"))
+            if hasattr(xgboost, "ExtMemQuantileDMatrix"):
+                dtrain = xgboost.ExtMemQuantileDMatrix(batches)  # Quantized pages cached on disk
+            else:
+                dtrain = xgboost.DMatrix(batches)  # External memory before XGBoost 2.1
+            for group, params in enumerate(ParameterGrid(grid)):
+                estimator = create_model(name, **params, n_estimators=rounds[-1])
+                with ResourceUsage() as usage:
+                    started = time.perf_counter()
+                    booster = xgboost.train(estimator.get_xgb_params(), dtrain, num_boost_round=rounds[-1])
+                    fit_time = time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    scores = {n: StreamingR2() for n in rounds}
+                    for chunk in validation_slices:
+                        X, y = np.asarray(X_train[chunk]), np.asarray(y_train[chunk])
+                        for n, score in scores.items():
+                            score.update(y, booster.inplace_predict(X, iteration_range=(0, n)))  # First n trees of the largest fit
+                    score_time = time.perf_counter() - started
+                MODEL_SEARCH_SECONDS.inc(name, "fit", amount=fit_time)
+                MODEL_SEARCH_SECONDS.inc(name, "score", amount=score_time)
+
+                for n, score in scores.items():
+                    share = n / rounds[-1]  # First n trees cost about n/largest of the shared fit, like the model search
+                    entry = _holdout_entry(
+                        dict(params, n_estimators=n), score.score(), fit_time * share, score_time * share,
+                        usage.cpu_seconds * share, usage.peak_memory_bytes,
+                    )
+                    if len(rounds) > 1:
+                        entry.update({
+                            "path_group": group,
+                            "path_split_fit_times": [fit_time],
+                            "path_split_score_times": [score_time],
+                            "path_split_cpu_times": [usage.cpu_seconds],
+                        })  # The one fit is shared by every n_estimators value, counted once as spent time
+                    candidates.append(entry)
+                    if best is None or score.score() > best[0]:
+                        best = (score.score(), dict(params, n_estimators=n), booster[:n])
+            del dtrain  # Releases the cache files before their directory is removed
+
+        validation_score, params, booster = best
+        model = create_model(name, **params)
+        model.load_model(bytearray(booster.save_raw("ubj")))  # Same trees, usable like a fitted XGBRegressor
+        test_score = self._test_score(booster.inplace_predict, X_test, y_test)
+        return OutOfCoreResult(model, params, test_score, validation_score, candidates)
+
+
+def _holdout_entry(params, score, fit_time, score_time, cpu_time, peak_memory):
+    return {
+        "params": params,
+        "resource": None,
+        "split_test_scores": [score],  # One validation split instead of CV folds
+        "mean_test_score": score,
+        "mean_fit_time": float(fit_time),
+        "mean_score_time": float(score_time),
+        "split_fit_times": [float(fit_time)],
+        "split_score_times": [float(score_time)],
+        "split_cpu_times": [float(cpu_time)],
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def _array_batches(X, y, slices, cache_prefix):
+    '''
+    xgboost.DataIter over the given row slices of memory-mapped arrays, one chunk at a time. The class is built
+    here so that importing this module does not import XGBoost.
+    '''
+    import xgboost  # Only needed when XGBoost trains out of core
+
+    class ArrayBatches(xgboost.DataIter):
+        def __init__(self):
+            self.slices = slices
+            self.position = 0  # Next chunk
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data):
+            if self.position == len(self.slices):
+                return False  # End of one pass
+            chunk = self.slices[self.position]
+            input_data(data=np.asarray(X[chunk]), label=np.asarray(y[chunk]))
+            self.position += 1
+            return True
+
+        def reset(self):
+            self.position = 0
+
+    return ArrayBatches()
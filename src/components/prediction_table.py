@@ -0,0 +1,110 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import itertools  # Import itertools to enumerate every category combination
+
+import numpy as np  # Import numpy for numerical operations
+import pandas as pd  # Import pandas to build the input grid
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.components.artifact_store import save_arrays, load_arrays  # Import the memory-mapped array store
+from src.components.compiled_preprocessor import compile_preprocessor  # Import to read the fitted input layout
+
+FORMAT_VERSION = 1  # Bumped whenever the saved layout changes
+
+
+class PredictionTable:
+    '''
+    Precomputed float32 prediction for every point of the discrete input space: each
+    category combination times every integer score in score_range. lookup computes the
+    index of every row with array operations and reads them from the memory-mapped
+    table with one gather.
+    '''
+
+    def __init__(self, table, meta):
+        self.table = table  # Flat float32 predictions, memory-mapped when loaded from disk
+        self.meta = meta  # Axes, source digests
+        self.axes = meta["axes"]  # One dict per input column, in table order
+        self.codes = {
+            axis["column"]: {value: code for code, value in enumerate(axis["values"])}
+            for axis in self.axes if "values" in axis
+        }  # Category -> position on its axis
+        sizes = [len(axis["values"]) if "values" in axis else axis["range"][1] - axis["range"][0] + 1 for axis in self.axes]
+        self.strides = [int(np.prod(sizes[i + 1:])) for i in range(len(sizes))]  # Row-major strides
+        self.model_digests = meta.get("model_digests", [])  # Model files the table was computed from
+        self.preprocessor_digest = meta.get("preprocessor_digest")  # Preprocessor file it was computed with
+
+    def lookup(self, features):
+        '''
+        Returns (predictions, hit) for a DataFrame or FeatureBatch. Rows with an unknown
+        category or a score that is not an integer in range get NaN and hit False, and
+        need live inference.
+        '''
+        positions = np.stack([self._axis_codes(features, axis) for axis in self.axes])  # One row of codes per axis
+        hit = (positions >= 0).all(axis=0)
+        index = np.asarray(self.strides, dtype=np.int64) @ positions  # Row-major offset of every row at once
+        preds = np.full(len(index), np.nan)
+        preds[hit] = self.table[index[hit]]  # One gather for all rows
+        return preds, hit
+
+    def _axis_codes(self, features, axis):
+        column = axis["column"]
+        if "values" in axis:
+            if hasattr(features, "recode"):  # FeatureBatch, categories already interned
+                return features.recode(column, self.codes[column]).astype(np.int64)  # -1 when unseen or missing
+            return pd.Categorical(features[column], categories=axis["values"]).codes.astype(np.int64)  # -1 when unseen or missing
+        low, high = axis["range"]
+        scores = features[column]
+        if not isinstance(scores, np.ndarray):
+            scores = pd.to_numeric(pd.Series(scores), errors="coerce").to_numpy(dtype=np.float64)  # Not a number becomes NaN
+        valid = np.isfinite(scores) & (scores >= low) & (scores <= high) & (scores == np.floor(scores))  # Integer in range
+        return np.where(valid, np.nan_to_num(scores) - low, -1).astype(np.int64)
+
+    @classmethod
+    def load(cls, manifest_path):
+        try:
+            arrays, meta = load_arrays(os.path.dirname(manifest_path))  # Read-only memory map, shared between workers
+            if meta.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported prediction table version {meta.get('format_version')}")
+            return cls(arrays["table"], meta)
+
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def build_prediction_table(model, preprocessor, directory, score_range=(0, 100), model_digests=None, preprocessor_digest=None):
+    '''
+    Predicts every point of the input space of the fitted preprocessor (all categories
+    it was fitted on times every integer score in score_range for each numeric column)
+    and saves the result as a PredictionTable.
+    '''
+    try:
+        layout = compile_preprocessor(preprocessor)  # Column names and fitted categories
+        axes = [{"column": block["column"], "values": block["categories"]} for block in layout.categorical]
+        axes += [{"column": col, "range": list(score_range)} for col in layout.numeric["columns"]]
+
+        scores = np.arange(score_range[0], score_range[1] + 1)
+        score_grid = np.meshgrid(*[scores] * len(layout.numeric["columns"]), indexing="ij")  # Row-major like the table
+        score_columns = {col: grid.ravel() for col, grid in zip(layout.numeric["columns"], score_grid)}
+        block_size = len(next(iter(score_columns.values()))) if score_columns else 1  # Rows per category combination
+
+        combinations = list(itertools.product(*[axis["values"] for axis in axes if "values" in axis]))
+        table = np.empty(len(combinations) * block_size, dtype=np.float32)
+        for i, combination in enumerate(combinations):
+            frame = pd.DataFrame(score_columns)
+            for axis, value in zip(axes, combination):
+                frame[axis["column"]] = value  # Same category on every row of this block
+            table[i * block_size:(i + 1) * block_size] = model.predict(preprocessor.transform(frame[list(layout.input_columns)]))
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "axes": axes,
+            "model_digests": list(model_digests or []),
+            "preprocessor_digest": preprocessor_digest,
+        }
+        save_arrays(directory, {"table": table}, meta)
+        logging.info(f"Saved prediction table with {len(table)} entries to {directory}")
+        return directory
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
@@ -0,0 +1,142 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys to look up library versions
+import json  # Import json to build stable cache keys
+import pickle  # Import pickle to store results and fitted estimators
+import hashlib  # Import hashlib for content-addressed keys
+
+import numpy as np  # Import numpy for numerical operations
+
+from src.logger import logging  # Import logging for logging messages
+
+IGNORED_PARAMS = {"n_jobs", "thread_count", "allow_writing_files", "verbose"}  # Do not change results
+
+
+class SearchCache:
+    '''
+    On-disk, content-addressed store for model search results and fitted estimators.
+
+    Keys hash the training arrays, the estimator class and library version, every
+    hyperparameter and the CV split, so any change to the data or a grid misses the
+    cache while everything else is reused. Entries are written as soon as a fit
+    finishes, which lets an interrupted search resume. The least recently used
+    entries are evicted once the cache grows beyond max_bytes.
+    '''
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 ** 2):
+        self.cache_dir = cache_dir  # Root directory of the cache
+        self.max_bytes = max_bytes  # Size limit before eviction
+        os.makedirs(cache_dir, exist_ok=True)  # Create the cache directory if it doesn't exist
+        self._size = sum(size for _, size, _ in self._entries())  # Current size, kept up to date on put
+        self.hits = 0  # Lookups served from the cache
+        self.misses = 0  # Lookups that had to be computed
+
+    def data_fingerprint(self, X, y):
+        digest = hashlib.sha256()
+        for array in (X, y):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())  # Layout is part of the identity
+            digest.update(memoryview(array).cast("B"))  # Raw bytes of the array, no copy when contiguous
+        return digest.hexdigest()
+
+    def task_key(self, data_key, estimator, params, fold, n_splits, n_samples=None, path=None, sample_seed=None):
+        return self._key({
+            "kind": "cv",
+            "data": data_key,
+            "estimator": _estimator_identity(estimator),
+            "params": _jsonable(params),
+            "cv": ["KFold", n_splits, fold],
+            "n_samples": None if n_samples is None else [n_samples, sample_seed],  # Which rows, not only how many
+            "path": _jsonable(path),
+        })
+
+    def model_key(self, data_key, estimator):
+        return self._key({"kind": "fitted", "data": data_key, "estimator": _estimator_identity(estimator)})
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file_obj:
+                value = pickle.load(file_obj)  # Cached result or estimator
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)  # Corrupt entry, recompute it
+            self.misses += 1
+            return None
+        os.utime(path)  # Mark as recently used for LRU eviction
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as file_obj:
+            pickle.dump(value, file_obj)
+        try:
+            old_size = os.path.getsize(path)  # Overwritten entry, no longer counted
+        except FileNotFoundError:
+            old_size = 0
+        os.replace(tmp_path, path)  # Atomic, an interrupted write never leaves a partial entry
+        self._size += os.path.getsize(path) - old_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])  # Least recently used first
+        self._size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(path)
+            self._size -= size
+        logging.info(f"Search cache evicted down to {self._size} bytes")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _key(self, payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")  # Two-level layout keeps directories small
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _estimator_identity(estimator):
+    cls = type(estimator)
+    package = sys.modules.get(cls.__module__.split(".")[0])
+    return {
+        "class": f"{cls.__module__}.{cls.__qualname__}",
+        "version": getattr(package, "__version__", None),  # A library upgrade may change results
+        "params": _jsonable({
+            key: value for key, value in estimator.get_params(deep=False).items() if key not in IGNORED_PARAMS
+        }),
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)  # Nested estimators and other objects
@@ -0,0 +1,62 @@
+import math  # Import math for the halving schedule
+
+import numpy as np  # Import numpy for random sampling
+
+
+class ExhaustiveSearch:
+    '''
+    Evaluates every combination of the grid on the full training data, like GridSearchCV.
+    '''
+
+    def rounds(self, candidates, max_resource):
+        yield [(params, None) for params in candidates]  # One round, full resources
+
+
+class RandomSearch:
+    '''
+    Evaluates at most n_iter combinations drawn without replacement from the grid.
+    '''
+
+    def __init__(self, n_iter=20, random_state=42):
+        self.n_iter = n_iter  # Evaluation budget per model
+        self.random_state = random_state  # Seed so the drawn combinations are reproducible
+
+    def rounds(self, candidates, max_resource):
+        rng = np.random.RandomState(self.random_state)
+        picked = rng.permutation(len(candidates))[:self.n_iter]  # Evaluated in drawn order
+        yield [(candidates[i], None) for i in picked]
+
+
+class SuccessiveHalvingSearch:
+    '''
+    Evaluates every combination with a small resource, keeps the best 1/factor and
+    multiplies the resource by factor until the last round uses the maximum resource.
+
+    The resource is either "n_samples" (rows of training data) or the name of an
+    integer hyperparameter such as "n_estimators" or "iterations", which is then taken
+    out of the grid and set by the schedule instead.
+    '''
+
+    def __init__(self, factor=3, resource="n_samples", min_resources=None):
+        self.factor = factor  # Share of candidates kept and resource growth per round
+        self.resource = resource  # What grows between rounds
+        self.min_resources = min_resources  # Resource of the first round, derived when None
+
+    def rounds(self, candidates, max_resource):
+        n_rounds = 1 + int(math.floor(math.log(len(candidates), self.factor) + 1e-9))  # Until one candidate is left
+        smallest = max(self.min_resources or 1, max_resource // self.factor ** (n_rounds - 1))  # Last round ends at max
+        for i in range(n_rounds):
+            resource = max_resource if i == n_rounds - 1 else min(max_resource, smallest * self.factor ** i)
+            scores = yield [(params, resource) for params in candidates]  # Mean CV score per candidate
+            if i == n_rounds - 1 or resource >= max_resource:
+                return
+            keep = max(1, math.ceil(len(candidates) / self.factor))
+            order = np.argsort(-np.where(np.isnan(scores), -np.inf, scores), kind="stable")[:keep]  # Best first
+            candidates = [candidates[j] for j in sorted(order)]  # Survivors, in grid order
+
+
+SEARCH_STRATEGIES = {
+    "exhaustive": ExhaustiveSearch,
+    "random": RandomSearch,
+    "halving": SuccessiveHalvingSearch,
+}  # Strategy name -> class
@@ -4,9 +4,14 @@ from src.logger import logging  # Import the logging object from the custom logg
 # Define a function to get detailed error message information
 def error_message_detail(error, error_detail: sys):
     _, _, exc_tb = error_detail.exc_info()  # Get exception type, value, and traceback object
-    file_name = exc_tb.tb_frame.f_code.co_filename  # Get the filename where the error occurred
+    if exc_tb is not None:
+        frame, line_number = exc_tb.tb_frame, exc_tb.tb_lineno  # Where the handled error occurred
+    else:
+        frame = error_detail._getframe(2)  # Raised directly, not while handling an error: the caller of CustomException
+        line_number = frame.f_lineno
+    file_name = frame.f_code.co_filename  # Get the filename where the error occurred
     error_message = "Error occured in python script name [{0}] line number [{1}] error message[{2}]".format(
-        file_name, exc_tb.tb_lineno, str(error))  # Format the error message with file name, line number, and error
+        file_name, line_number, str(error))  # Format the error message with file name, line number, and error
 
     return error_message  # Return the formatted error message
 
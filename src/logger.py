@@ -1,31 +1,228 @@
+'''
+Logging for the whole project. Every module keeps using "from src.logger import logging"
+and the standard logging calls; importing this module configures the root logger once.
+
+Records are stamped with the current request id (see set_request_id) and put on a
+bounded queue; one background thread writes them to logs/app.log as one JSON object per
+line (LOG_FORMAT=text for the classic format). The file is rotated by size or time and
+only LOG_BACKUP_COUNT old files are kept. Records on the "src.request" logger are rate
+limited per message. With several worker processes, give each its own LOG_FILE, as
+rotation is not coordinated between processes.
+'''
 import logging  # Import the logging module to enable logging in the application
+import logging.handlers  # Import the queue and rotating file handlers
 import os  # Import the os module to interact with the operating system
-from datetime import datetime  # Import datetime to get the current date and time
+import sys  # Import sys for the optional console handler
+import json  # Import json to write structured records
+import time  # Import time for the sampling window
+import queue  # Import queue to hand records to the writer thread
+import atexit  # Import atexit to flush the queue when the process exits
+import threading  # Import threading to guard the sampling state
+import contextvars  # Import contextvars to carry the request id through a request
+from datetime import datetime, timezone  # Import datetime to timestamp records
 
-# Create a log file name with the current date and time
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+from src import metrics  # Import the lightweight metrics registry
 
-# Create the path for the logs directory and the log file
-logs_path = os.path.join(os.getcwd(), "logs", LOG_FILE)
+LOG_DIR = os.environ.get("LOG_DIR", os.path.join(os.getcwd(), "logs"))  # Directory for the log files
+LOG_FILE = os.environ.get("LOG_FILE", "app.log")  # One file, rotated instead of one new file per process start
+LOG_FILE_PATH = os.path.join(LOG_DIR, LOG_FILE)  # Set the full path for the log file
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()  # Lowest level that is written
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # json (one object per line) or text
+LOG_ROTATION = os.environ.get("LOG_ROTATION", "size")  # size or time
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 ** 2))  # Size rotation threshold
+LOG_ROTATE_WHEN = os.environ.get("LOG_ROTATE_WHEN", "midnight")  # Time rotation interval, see TimedRotatingFileHandler
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))  # Rotated files kept, older ones are deleted
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))  # Records waiting for the writer, newer ones are dropped beyond this
+LOG_REQUEST_RATE = float(os.environ.get("LOG_REQUEST_RATE", 50))  # Request log records per second and message, 0 disables sampling
+LOG_CONSOLE = os.environ.get("LOG_CONSOLE", "0") == "1"  # Also write to stderr
+REQUEST_LOGGER_NAME = "src.request"  # High-volume per-request records, rate limited
 
-# Create the logs directory if it doesn't exist
-os.makedirs(logs_path, exist_ok=True)
+TEXT_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - [%(request_id)s] %(message)s"  # Set the log message format
 
-# Set the full path for the log file
-LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
+request_id_var = contextvars.ContextVar("request_id", default=None)  # Id of the request being handled, if any
 
-# Configure the logging settings
-logging.basicConfig(
-    filename=LOG_FILE_PATH,  # Set the log file path
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",  # Set the log message format
-    level=logging.INFO,  # Set the logging level to INFO
+DROPPED_RECORDS = metrics.counter(
+    "log_records_dropped_total", "Log records not written, because the queue was full or they were sampled out.", ["reason"]
 )
-'''
-This code is created to set up a logging system for your project. Logging helps you:
-
-Track events and errors that happen when your code runs.
-Save detailed information (like time, file, line number, and error message) to a log file.
-Make debugging and monitoring easier by keeping a record of what happened and when.
-The code automatically creates a new log file with a timestamp in its name, stores it in a logs folder, 
-and formats each log entry for clarity. This is useful for troubleshooting and maintaining your project.
-'''
\ No newline at end of file
+
+# Attributes every LogRecord has; anything else was passed with extra= and is written as a field
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def set_request_id(request_id):
+    return request_id_var.set(request_id)  # Returns the token for reset_request_id
+
+
+def reset_request_id(token):
+    request_id_var.reset(token)
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    '''
+    Stamps every record with the request id of the context it was logged in.
+    '''
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()  # Read on the calling thread, before the record is queued
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    '''
+    Token bucket per (logger, message template): at most rate records per second with
+    bursts of up to burst records. Records over the limit are dropped and counted; the
+    next record that gets through carries the count in its "suppressed" field.
+    '''
+
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = rate  # Records per second per message template
+        self.burst = burst or max(1.0, rate)  # Bucket size
+        self._lock = threading.Lock()
+        self._buckets = {}  # Key -> [tokens, last refill time, suppressed count]
+
+    def filter(self, record):
+        if self.rate <= 0:
+            return True  # Sampling disabled
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))  # Same template, same bucket
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)  # Refill since the last record
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1  # Reported with the next record that is written
+                DROPPED_RECORDS.inc("sampled")
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    '''
+    One JSON object per line with the timestamp, level, logger, source location,
+    message, request id, exception and any fields passed with extra=.
+    '''
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key not in entry:
+                entry[key] = value  # Fields passed with extra=
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    '''
+    Queue handler that never blocks the logging thread: a full queue drops the record.
+    '''
+
+    def prepare(self, record):
+        copied = object.__new__(logging.LogRecord)
+        copied.__dict__.update(record.__dict__)  # Cheap shallow copy, other handlers may still see the original
+        record = copied
+        record.msg = record.getMessage()  # Merge args now, they may change after the call returns
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)  # Tracebacks do not pickle or outlive frames
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc("queue_full")  # The writer cannot keep up, shed load instead of adding latency
+
+
+def _file_handler():
+    os.makedirs(LOG_DIR, exist_ok=True)  # Create the logs directory (not a directory per log file)
+    if LOG_ROTATION == "time":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE_PATH, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, delay=True, utc=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+        )
+    return handler
+
+
+def _formatter():
+    if LOG_FORMAT == "text":
+        return logging.Formatter(TEXT_FORMAT)
+    return JsonFormatter()
+
+
+class _AsyncLogging:
+    '''
+    Root logger -> bounded queue -> one writer thread -> rotating file (and stderr).
+    The calling thread only formats the message and enqueues the record.
+    '''
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)  # Bounded, so a slow disk cannot grow memory
+        handlers = [_file_handler()] + ([logging.StreamHandler(sys.stderr)] if LOG_CONSOLE else [])
+        for handler in handlers:
+            handler.setFormatter(_formatter())
+        self.handlers = handlers  # Only ever used by the writer thread
+        self.listener = None
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()  # Background writer thread
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()  # Writes everything still queued, then joins the writer
+            self.listener = None
+
+    def after_fork(self):
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)  # The parent's writer thread does not exist in the child
+        queue_handler.queue = self.queue
+        self.listener = None
+        self.start()
+
+
+_async_logging = _AsyncLogging()
+queue_handler = _DroppingQueueHandler(_async_logging.queue)  # The only handler of the root logger
+queue_handler.addFilter(RequestIdFilter())  # Read the request id on the logging thread
+
+root_logger = logging.getLogger()
+for existing in list(root_logger.handlers):
+    root_logger.removeHandler(existing)  # Replace whatever was configured before, like basicConfig(force=True)
+root_logger.addHandler(queue_handler)
+root_logger.setLevel(LOG_LEVEL)
+
+logging.getLogger(REQUEST_LOGGER_NAME).addFilter(SamplingFilter(LOG_REQUEST_RATE))  # Sample before anything is queued
+
+_async_logging.start()
+atexit.register(_async_logging.stop)  # Flush queued records on normal exit
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_async_logging.after_fork)  # Preforking servers get a writer per worker
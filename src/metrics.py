@@ -0,0 +1,204 @@
+import os  # Import os to read configuration from the environment
+import bisect  # Import bisect to find the histogram bucket of a value
+import functools  # Import functools to keep the name of timed functions
+import threading  # Import threading to guard metric updates
+import time  # Import time for span timers
+
+ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"  # METRICS_ENABLED=0 turns every update into a no-op
+
+# Upper bounds in seconds, from 100 us (a table lookup) to 5 min (a full model search)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class Counter:
+    '''
+    Monotonically increasing value per combination of label values.
+    '''
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name  # Metric name, ends in _total by convention
+        self.documentation = documentation  # HELP text
+        self.labelnames = tuple(labelnames)  # Label names, values are passed positionally
+        self._lock = threading.Lock()
+        self._values = {} if self.labelnames else {(): 0}  # Label values -> count, unlabeled counters start at 0
+
+    def inc(self, *labels, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, labels, (), value) for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    '''
+    Distribution of observed values in cumulative buckets, with their sum and count.
+    '''
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name  # Metric name, ends in the unit, e.g. _seconds
+        self.documentation = documentation  # HELP text
+        self.labelnames = tuple(labelnames)  # Label names, values are passed positionally
+        self.buckets = tuple(sorted(buckets))  # Upper bounds, +Inf is implicit
+        self._lock = threading.Lock()
+        self._values = {}  # Label values -> [per-bucket counts..., +Inf count, sum]
+        if not self.labelnames:
+            self._values[()] = [0] * (len(self.buckets) + 1) + [0.0]  # Unlabeled histograms are exported from the start
+
+    def observe(self, value, *labels):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)  # First bucket whose bound is >= value
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: list(state) for labels, state in self._values.items()}
+        samples = []
+        for labels, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels, (("le", _format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", labels, (), state[-1]))
+            samples.append((f"{self.name}_count", labels, (), cumulative))
+        return samples
+
+
+class _Span:
+    '''
+    Context manager that observes the time spent inside it in a histogram.
+    '''
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False  # Never swallow exceptions
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()  # Shared, so a disabled span allocates nothing
+
+
+def span(histogram, *labels):
+    '''
+    Times a block of code into histogram:
+
+        with span(PREDICT_STAGE_SECONDS, "transform"):
+            X = transformer.transform(features)
+    '''
+    if not ENABLED:
+        return _NOOP_SPAN
+    return _Span(histogram, labels)
+
+
+def timed(histogram, *labels):
+    '''
+    Decorator form of span for timing whole functions.
+    '''
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(histogram, *labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsRegistry:
+    '''
+    Metrics of one process. With several server worker processes every worker exposes
+    its own values, like the Prometheus client library without multiprocess mode.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # Name -> metric, in registration order
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric  # Modules imported twice share the same metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        '''
+        All metrics in the Prometheus text exposition format (version 0.0.4).
+        '''
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, help_text=True)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, extra, value in metric.samples():
+                pairs = list(zip(metric.labelnames, labels)) + list(extra)
+                label_text = "{" + ",".join(f'{key}="{_escape(str(val))}"' for key, val in pairs) + "}" if pairs else ""
+                lines.append(f"{sample_name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        '''
+        Writes render() to path atomically, e.g. for the node_exporter textfile collector
+        after a training run, where there is no server to scrape.
+        '''
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            file_obj.write(self.render())
+        os.replace(tmp_path, path)  # Scrapers never see a partial file
+        return path
+
+
+def _escape(text, help_text=False):
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text if help_text else text.replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return f"{value:.1f}"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = MetricsRegistry()  # Process-wide registry rendered by /metrics
+counter = REGISTRY.counter  # Module-level shortcuts: metrics.counter(...), metrics.histogram(...)
+histogram = REGISTRY.histogram
@@ -0,0 +1,225 @@
+import os  # Import os for file paths and file status checks
+import sys  # Import sys for system-specific parameters and functions
+import hashlib  # Import hashlib to combine artifact fingerprints into a version
+import json  # Import json to read and write the artifact set record
+import threading  # Import threading to guard reloads with a lock
+import time  # Import time to throttle file status checks
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.utils import load_object, file_digest  # Import functions to load and fingerprint saved objects
+from src import metrics  # Import the lightweight metrics registry
+from src.metrics import span  # Import the timing span
+
+ARTIFACT_LOAD_SECONDS = metrics.histogram(
+    "artifact_load_seconds", "Time to load one serving artifact from disk.", ["artifact"]
+)  # Eager loads at reload time and lazy loads on first use
+ARTIFACT_RELOADS = metrics.counter("artifact_reloads_total", "Artifact bundles built, including the first load.")
+ARTIFACT_RELOAD_FAILURES = metrics.counter("artifact_reload_failures_total", "Reloads that failed and kept the old bundle.")
+ARTIFACT_SET_VERSION = 1  # Bumped whenever the layout of the artifact set record changes
+
+
+def publish_artifact_set(record_path, paths):
+    '''
+    Records the content hash of each file in paths as one artifact set. Written after
+    the files, so a reader that sees the record can check that every file it lists is
+    the one the record was written for (see ArtifactCache).
+    '''
+    try:
+        record = {
+            "schema_version": ARTIFACT_SET_VERSION,
+            "files": {os.path.normpath(path): file_digest(path) for path in paths if os.path.exists(path)},
+        }
+        os.makedirs(os.path.dirname(record_path) or ".", exist_ok=True)  # Create the directory if it doesn't exist
+        tmp_path = f"{record_path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(record, file_obj, indent=2)
+        os.replace(tmp_path, record_path)  # Atomically publish the set
+        return record_path
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+@dataclass
+class ArtifactSpec:
+    path: str  # Path of the artifact file on disk
+    loader: object = load_object  # Function used to turn the file into a Python object
+    required: bool = True  # Whether serving can work without this artifact
+    lazy: bool = False  # Load on first use at startup; reloads always load before swapping the bundle
+    fallback: object = None  # ArtifactSpec served while path does not exist, checked again on every refresh
+
+
+class DeferredArtifact:
+    '''
+    Artifact that is only loaded, and its libraries only imported, the first time it is used.
+    The file content must still match the digest recorded when the bundle was built. Only
+    the first bundle defers loads; there is no previous version to fall back to then anyway.
+    '''
+
+    def __init__(self, name, spec, digest):
+        self.name = name  # Artifact name, used as metric label
+        self.spec = spec  # How to load the artifact
+        self.digest = digest  # Content hash the bundle was versioned with
+        self._lock = threading.Lock()  # Only one thread loads
+        self._loaded = False  # Whether value holds the object
+        self._value = None  # Loaded object
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    with span(ARTIFACT_LOAD_SECONDS, self.name):
+                        value = self.spec.loader(self.spec.path)  # Load, then check it is the versioned file
+                    if file_digest(self.spec.path) != self.digest:
+                        raise RuntimeError(f"{self.spec.path} changed after version was built, retry after reload")
+                    self._value, self._loaded = value, True
+        return self._value
+
+
+@dataclass(frozen=True)
+class ArtifactBundle:
+    objects: dict  # Loaded objects keyed by artifact name
+    version: str  # Content hash of all loaded artifact files
+    digests: dict = field(default_factory=dict)  # Content hash of each loaded artifact file
+    loaded_at: float = field(default_factory=time.time)  # When this bundle was loaded
+
+    def __getitem__(self, name):
+        value = self.objects.get(name)  # Allow bundle["model"] style access
+        if isinstance(value, DeferredArtifact):
+            return value.get()  # Lazy artifact, loaded on first access
+        return value
+
+
+class ArtifactCache:
+    '''
+    Loads serving artifacts once per process and swaps in new ones when the files change.
+
+    Readers call get() and keep the returned bundle for the whole request, so a reload
+    that happens meanwhile never changes the model under an in-flight prediction.
+
+    With a set_record (see publish_artifact_set), artifacts written at different times
+    are swapped as one unit: a new bundle is only built once every artifact the record
+    lists has the content hash the record gives it, so a new preprocessor is never
+    served with the model trained before it.
+    '''
+
+    def __init__(self, specs, check_interval=1.0, set_record=None):
+        self.specs = dict(specs)  # Artifact name -> ArtifactSpec
+        self.check_interval = check_interval  # Seconds between file status checks
+        self.set_record = set_record  # Path of the artifact set record, None to load each artifact as it changes
+        self._lock = threading.Lock()  # Only one thread reloads at a time
+        self._bundle = None  # Currently served bundle
+        self._stats = {}  # Artifact name -> (mtime_ns, size) seen at last load
+        self._hashes = {}  # Artifact name -> content hash seen at last load
+        self._next_check = 0.0  # Monotonic time of the next file status check
+
+    def get(self):
+        bundle = self._bundle  # Read the current bundle reference once
+        if bundle is not None and time.monotonic() < self._next_check:
+            return bundle  # Fast path: nothing to check yet
+        with self._lock:
+            if self._bundle is not None and time.monotonic() < self._next_check:
+                return self._bundle  # Another thread refreshed while we waited
+            try:
+                self._refresh()  # Reload changed artifacts if any
+            except Exception as e:
+                if self._bundle is None:
+                    raise CustomException(e, sys)  # Nothing to fall back to on first load
+                logging.exception("Artifact reload failed, keeping version %s", self._bundle.version)
+                ARTIFACT_RELOAD_FAILURES.inc()  # Still serving the previous version
+            self._next_check = time.monotonic() + self.check_interval  # Schedule the next check
+            return self._bundle
+
+    @property
+    def version(self):
+        return self.get().version  # Version of the currently served artifacts
+
+    def invalidate(self):
+        self._next_check = 0.0  # Force a file status check on the next get()
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)  # Read file metadata without opening it
+        except FileNotFoundError:
+            return None  # Missing files are reported as None
+        return (path, st.st_mtime_ns, st.st_size)  # A switch to the fallback file counts as a change
+
+    def _active(self, spec):
+        while spec.fallback is not None and not os.path.exists(spec.path):
+            spec = spec.fallback  # Preferred file not written yet
+        return spec
+
+    def _read_set_record(self):
+        try:
+            with open(self.set_record) as file_obj:
+                record = json.load(file_obj)
+        except FileNotFoundError:
+            return None  # Artifacts saved before records were written
+        if record.get("schema_version") != ARTIFACT_SET_VERSION:
+            raise ValueError(f"{self.set_record} has schema version {record.get('schema_version')}")
+        return record["files"]
+
+    def _incomplete_set(self, specs, hashes):
+        record = self._read_set_record() if self.set_record else None
+        if record is None:
+            return []
+        return [
+            name for name, spec in specs.items()
+            if os.path.normpath(spec.path) in record and record[os.path.normpath(spec.path)] != hashes[name]
+        ]  # Artifacts already replaced, or not yet replaced, by the run that wrote the record
+
+    def _refresh(self):
+        specs = {name: self._active(spec) for name, spec in self.specs.items()}  # Files to serve right now
+        stats = {name: self._stat(spec.path) for name, spec in specs.items()}  # Current file status
+        if self.set_record:
+            stats[self.set_record] = self._stat(self.set_record)  # A new record completes a set
+        if self._bundle is not None and stats == self._stats:
+            return  # No file changed since the last load
+
+        hashes = {}
+        for name, spec in specs.items():
+            if stats[name] is None:
+                if spec.required:
+                    raise FileNotFoundError(spec.path)  # Required artifact is missing
+                hashes[name] = None  # Optional artifact not present
+            elif self._bundle is not None and stats[name] == self._stats.get(name):
+                hashes[name] = self._hashes[name]  # Unchanged file, reuse its hash
+            else:
+                hashes[name] = file_digest(spec.path)  # Changed or new file, hash its content
+
+        if self._bundle is not None and hashes == self._hashes:
+            self._stats = stats  # Files were touched but content is identical
+            return
+
+        incomplete = self._incomplete_set(specs, hashes)
+        if incomplete and self._bundle is not None:
+            logging.info("Artifacts %s do not match %s yet, keeping version %s", incomplete, self.set_record, self._bundle.version)
+            return  # Stats are not recorded, so the next check looks again
+        if incomplete:
+            logging.warning("Artifacts %s do not match %s, serving them anyway", incomplete, self.set_record)  # Nothing older to serve
+
+        objects = {}
+        for name, spec in specs.items():
+            if hashes[name] is None:
+                objects[name] = None  # Optional artifact not present
+            elif self._bundle is not None and hashes[name] == self._hashes.get(name):
+                objects[name] = self._bundle.objects[name]  # Keep the already loaded object
+            elif spec.lazy and self._bundle is None:
+                objects[name] = DeferredArtifact(name, spec, hashes[name])  # Startup only, loaded on first access
+            else:
+                with span(ARTIFACT_LOAD_SECONDS, name):
+                    objects[name] = spec.loader(spec.path)  # Load before publishing, a bad file keeps the old bundle
+                if file_digest(spec.path) != hashes[name]:
+                    raise RuntimeError(f"{spec.path} changed while it was loaded, retrying on the next check")
+
+        version = hashlib.sha256(
+            "|".join(f"{name}={hashes[name]}" for name in sorted(hashes)).encode()
+        ).hexdigest()[:12]  # Short version id covering every artifact
+        self._bundle = ArtifactBundle(objects=objects, version=version, digests=dict(hashes))  # Atomic reference swap
+        self._stats = stats
+        self._hashes = hashes
+        ARTIFACT_RELOADS.inc()  # A new version is being served
+        logging.info("Loaded serving artifacts version %s", version)
+
@@ -0,0 +1,131 @@
+import os  # Import os to read configuration from the environment
+import time  # Import time for deadlines
+import threading  # Import threading for the admission semaphore
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError  # Import the worker pool
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
+
+from src.logger import logging  # Import logging for logging messages
+from src import metrics  # Import the lightweight metrics registry
+
+REJECTED = metrics.counter(
+    "inference_rejected_total", "Inference calls refused or abandoned, by reason.", ["reason"]
+)  # overloaded (503) or deadline (504)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "inference_queue_wait_seconds", "Time an admitted inference call waited for a worker."
+)
+
+
+class Overloaded(Exception):
+    '''
+    Raised when the executor already holds as many calls as it admits. Served as
+    503 with a Retry-After header.
+    '''
+
+    def __init__(self, retry_after):
+        super().__init__("Server is overloaded, retry later")
+        self.retry_after = retry_after  # Seconds the caller should wait
+
+
+class DeadlineExceeded(Exception):
+    '''
+    Raised when a call did not finish before its deadline. Served as 504.
+    '''
+
+    def __init__(self, timeout):
+        super().__init__(f"Prediction did not finish within {timeout:.3g} s")
+        self.timeout = timeout
+
+
+@dataclass
+class InferenceExecutorConfig:
+    workers: int = int(os.environ.get("INFERENCE_WORKERS", os.cpu_count() or 1))  # Inference calls running at once
+    queue_size: int = int(os.environ.get("INFERENCE_QUEUE_SIZE", 0)) or None  # Calls waiting for a worker, default 16 per worker
+    timeout: float = float(os.environ.get("INFERENCE_TIMEOUT_MS", 2000)) / 1000  # Default per-request deadline in seconds
+    retry_after: int = int(os.environ.get("INFERENCE_RETRY_AFTER_S", 1))  # Retry-After sent with 503 responses
+
+    def __post_init__(self):
+        if self.queue_size is None:
+            self.queue_size = 16 * self.workers
+
+
+@dataclass
+class _Task:
+    deadline: float  # time.monotonic() after which nobody waits for the result
+    timeout: float  # Deadline relative to submission, for the error message
+    submitted: float = field(default_factory=time.monotonic)  # When the call was admitted
+
+
+class InferenceExecutor:
+    '''
+    Runs inference calls on a fixed pool of worker threads, sized to the cores, so that
+    request threads only parse and render. At most workers + queue_size calls are
+    admitted at a time; beyond that submit() raises Overloaded at once instead of
+    queueing without bound. Each call has a deadline: a call still queued when its
+    deadline passes is skipped, and run() raises DeadlineExceeded when the result is
+    not ready in time. NumPy, scikit-learn and XGBoost release the GIL in their kernels,
+    so the threads use several cores; run several server processes for the rest.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or InferenceExecutorConfig()  # Pool size, queue bound and deadlines
+        self._slots = threading.BoundedSemaphore(self.config.workers + self.config.queue_size)  # Admission control
+        self._pool = None  # Created lazily so forked server workers each get their own threads
+        self._pool_lock = threading.Lock()
+        self._pool_pid = None  # Process that created the pool
+
+    def submit(self, fn, *args, timeout=None):
+        '''
+        Admits fn(*args) or raises Overloaded. Returns (future, task); use wait() for the result.
+        '''
+        timeout = self.config.timeout if timeout is None else timeout
+        if not self._slots.acquire(blocking=False):
+            REJECTED.inc("overloaded")
+            raise Overloaded(self.config.retry_after)  # Shed load, the caller answers 503
+        task = _Task(deadline=time.monotonic() + timeout, timeout=timeout)
+        try:
+            future = self._executor().submit(self._run_task, task, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())  # Frees the slot however the call ends
+        return future, task
+
+    def has_capacity(self):
+        '''
+        Whether a call would be admitted right now. Callers refuse the work when it is
+        not, so False is counted as a rejection.
+        '''
+        if self._slots.acquire(blocking=False):
+            self._slots.release()
+            return True
+        REJECTED.inc("overloaded")
+        return False  # Every slot is taken right now
+
+    def wait(self, future, task):
+        try:
+            return future.result(timeout=max(0.0, task.deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()  # Still queued: never runs; already running: result is dropped
+            REJECTED.inc("deadline")
+            raise DeadlineExceeded(task.timeout)
+
+    def run(self, fn, *args, timeout=None):
+        return self.wait(*self.submit(fn, *args, timeout=timeout))  # Blocks the calling thread until done or deadline
+
+    def _run_task(self, task, fn, args):
+        started = time.monotonic()
+        QUEUE_WAIT_SECONDS.observe(started - task.submitted)
+        if started >= task.deadline:
+            raise DeadlineExceeded(task.timeout)  # The caller already gave up, skip the work
+        return fn(*args)
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix="inference")
+                    self._pool_pid = os.getpid()
+                    logging.info(
+                        f"Inference executor: {self.config.workers} workers, {self.config.queue_size} queued calls"
+                    )
+        return self._pool
@@ -0,0 +1,177 @@
+import os  # Import os to read configuration from the environment
+import queue  # Import queue to hand requests to the batching thread
+import threading  # Import threading for the background batching thread
+import time  # Import time to measure queue waits and batch deadlines
+from collections import Counter  # Import Counter to build the batch size histogram
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError  # Import Future to hand results back to waiting requests
+from dataclasses import dataclass, field  # Import dataclass for easy class creation
+
+from src.logger import logging, get_request_id  # Import logging and the current request id
+from src import metrics  # Import the lightweight metrics registry
+from src.pipeline.predict_pipeline import PredictPipeline, concat_features  # Import the prediction pipeline
+from src.pipeline.inference_executor import Overloaded, DeadlineExceeded  # Import the load shedding errors
+
+
+BATCH_SIZE = metrics.histogram(
+    "micro_batch_size", "Requests merged into one batched predict call.", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "micro_batch_queue_wait_seconds", "Time a request waited in the micro-batcher queue until its batch was dispatched."
+)  # Executor queueing after dispatch is inference_queue_wait_seconds
+BATCH_FAILURES = metrics.counter(
+    "micro_batch_failures_total", "Batched predict calls that failed and were retried one request at a time."
+)
+
+
+@dataclass
+class MicroBatcherConfig:
+    max_batch_size: int = int(os.environ.get("MICRO_BATCH_MAX_SIZE", 32))  # Most requests merged into one predict
+    max_wait_us: int = int(os.environ.get("MICRO_BATCH_MAX_WAIT_US", 500))  # Longest a request waits for company
+
+
+@dataclass
+class _Request:
+    features: object  # DataFrame or FeatureBatch with the rows to predict for one caller
+    future: Future = field(default_factory=Future)  # Resolved with (predictions, version)
+    enqueued: float = field(default_factory=time.perf_counter)  # When the request entered the queue
+    request_id: str = field(default_factory=get_request_id)  # Caller's request id, the batching thread has none
+
+
+class MicroBatcher:
+    '''
+    Coalesces concurrent predict calls into one batched PredictPipeline call.
+
+    The first queued request opens a batch; the batch is closed when it holds
+    max_batch_size requests or when max_wait_us has passed since that first request.
+    Without an executor batches run one after another on the batching thread; with an
+    InferenceExecutor they run on its workers, and a batch it refuses fails with Overloaded.
+    '''
+
+    def __init__(self, pipeline=None, config=None, executor=None):
+        self.pipeline = pipeline or PredictPipeline()  # Pipeline that runs the batched prediction
+        self.config = config or MicroBatcherConfig()  # Batch size and wait limits
+        self.executor = executor  # Optional bounded pool that runs the batches
+        self._queue = queue.SimpleQueue()  # Pending requests
+        self._thread = None  # Started lazily so forked workers each get their own
+        self._start_lock = threading.Lock()  # Guards lazy thread start
+        self._stats_lock = threading.Lock()  # Guards the metrics below
+        self._batch_sizes = Counter()  # Batch size -> number of batches
+        self._rows = 0  # Rows predicted through the batcher
+        self._requests = 0  # Requests predicted through the batcher
+        self._wait_count = 0  # Requests that waited in the queue
+        self._wait_total_us = 0.0  # Sum of queue waits until dispatch
+        self._wait_max_us = 0.0  # Longest queue wait until dispatch
+
+    def predict(self, features, timeout=None):
+        preds, _ = self.predict_with_version(features, timeout=timeout)  # Predict and drop the version
+        return preds
+
+    def predict_with_version(self, features, timeout=None):
+        future = self.submit(features)
+        try:
+            return future.result(timeout=timeout)  # Block until the batch containing us is done
+        except FutureTimeoutError:
+            future.cancel()  # Skipped if its batch has not started yet
+            raise DeadlineExceeded(timeout)
+
+    def submit(self, features):
+        self._ensure_started()  # Start the batching thread on first use
+        request = _Request(features)  # Wrap the rows with a future
+        self._queue.put(request)  # Hand it to the batching thread
+        return request.future
+
+    def metrics(self):
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())  # Number of batched predict calls
+            return {
+                "batches": batches,
+                "requests": self._requests,
+                "rows": self._rows,
+                "mean_batch_size": self._requests / batches if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_wait_us": self._wait_total_us / self._wait_count if self._wait_count else 0.0,
+                "max_queue_wait_us": self._wait_max_us,
+                "max_batch_size": self.config.max_batch_size,
+                "max_wait_us": self.config.max_wait_us,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return  # Already running
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        max_wait = self.config.max_wait_us / 1e6  # Wait limit in seconds
+        while True:
+            batch = [self._queue.get()]  # Block until a request opens a batch
+            deadline = batch[0].enqueued + max_wait  # Batch closes at this time at the latest
+            while len(batch) < self.config.max_batch_size:
+                remaining = deadline - time.perf_counter()  # Time left before the batch must run
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))  # Wait for more requests
+                    else:
+                        batch.append(self._queue.get_nowait())  # Only take requests that are already queued
+                except queue.Empty:
+                    break  # Deadline reached, run what we have
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]  # Drop callers that gave up
+        if not batch:
+            return
+        dispatched = time.perf_counter()
+        self._record_waits([(dispatched - request.enqueued) * 1e6 for request in batch])  # Executor queueing excluded
+        if self.executor is None:
+            self._run_batch(batch)  # Inline on the batching thread
+            return
+        try:
+            future, _ = self.executor.submit(self._run_batch, batch)
+        except Overloaded as e:
+            self._fail(batch, e)  # Every caller in the batch answers 503
+            return
+        future.add_done_callback(lambda done: done.exception() and self._fail(batch, done.exception()))  # Skipped past its deadline
+
+    def _fail(self, batch, error):
+        for request in batch:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    def _record_waits(self, waits):
+        with self._stats_lock:
+            self._wait_count += len(waits)
+            self._wait_total_us += sum(waits)
+            self._wait_max_us = max(self._wait_max_us, max(waits))
+        for wait_us in waits:
+            QUEUE_WAIT_SECONDS.observe(wait_us / 1e6)  # Same numbers, exported on /metrics
+
+    def _run_batch(self, batch):
+        try:
+            features = batch[0].features if len(batch) == 1 else concat_features(
+                [request.features for request in batch]
+            )  # One input for the whole batch
+            preds, version = self.pipeline.predict_with_version(features)  # One transform and predict call
+            offset = 0
+            for request in batch:
+                size = len(request.features)
+                request.future.set_result((preds[offset:offset + size], version))  # Fan results back out
+                offset += size
+        except Exception:
+            logging.exception(
+                "Batched prediction of %d requests failed, retrying one by one", len(batch),
+                extra={"request_ids": [request.request_id for request in batch]},
+            )
+            BATCH_FAILURES.inc()  # Exported alongside the retry
+            for request in batch:
+                try:
+                    request.future.set_result(self.pipeline.predict_with_version(request.features))
+                except Exception as e:
+                    request.future.set_exception(e)  # Only the bad request fails
+        with self._stats_lock:
+            self._batch_sizes[len(batch)] += 1
+            self._rows += sum(len(request.features) for request in batch)
+            self._requests += len(batch)
+        BATCH_SIZE.observe(len(batch))  # Same numbers, exported on /metrics
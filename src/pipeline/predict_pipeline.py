@@ -1,31 +1,421 @@
+import os  # Import os for file path operations
 import sys  # Import sys for system-specific parameters and functions
+import weakref  # Import weakref to cache category codes per fitted preprocessor
+import numpy as np  # Import numpy for numerical operations
 import pandas as pd  # Import pandas for data manipulation
 from src.exception import CustomException  # Import custom exception for error handling
-from src.utils import load_object  # Import function to load saved objects
+from src.pipeline.artifact_cache import ArtifactCache, ArtifactSpec  # Import the shared artifact cache
+from src.components.compiled_preprocessor import CompiledPreprocessor  # Import the NumPy-only preprocessor
+from src.components.compiled_model import CompiledModel  # Import the NumPy-only model
+from src.components.prediction_table import PredictionTable  # Import the precomputed prediction table
+from src.serialization import load_model  # Import the native / memory-mapped model loader
+from src.pipeline.inference_executor import Overloaded, DeadlineExceeded  # Import the load shedding errors
+from src.utils import load_object  # Import function to load pickled objects
+from src import metrics  # Import the lightweight metrics registry
+from src.metrics import span  # Import the timing span
+
+
+MODEL_PATH = os.path.join("artifacts", "model.pkl")  # Path to the saved model
+MODEL_MANIFEST_PATH = os.path.join("artifacts", "model", "manifest.json")  # Manifest of the fast-loading model copy
+PREPROCESSOR_PATH = os.path.join("artifacts", "proprocessor.pkl")  # Path to the saved preprocessor
+COMPILED_PREPROCESSOR_PATH = os.path.join("artifacts", "compiled_preprocessor.npz")  # Path to the compiled preprocessor
+COMPILED_MODEL_PATH = os.path.join("artifacts", "compiled_model", "manifest.json")  # Manifest of the compiled model
+PREDICTION_TABLE_PATH = os.path.join("artifacts", "prediction_table", "manifest.json")  # Manifest of the prediction table
+SERVING_SET_PATH = os.path.join("artifacts", "serving_set.json")  # Model and preprocessor digests written by the same training run
+
+NUMERICAL_COLUMNS = ["writing_score", "reading_score"]  # Score columns expected by the preprocessor
+CATEGORICAL_COLUMNS = [
+    "gender",
+    "race_ethnicity",
+    "parental_level_of_education",
+    "lunch",
+    "test_preparation_course",
+]  # Categorical columns expected by the preprocessor
+INPUT_COLUMNS = CATEGORICAL_COLUMNS + NUMERICAL_COLUMNS  # Every column a prediction needs
+SCORE_RANGE = (0, 100)  # Valid range for reading and writing scores
+BATCH_CHUNK_SIZE = 10000  # Rows pushed through the model per vectorized call
+MISSING_CODE = -1  # Interned code of a missing category
+
+PREDICT_STAGE_SECONDS = metrics.histogram(
+    "predict_stage_seconds", "Time spent in each stage of a prediction call.", ["stage"]
+)  # features, table_lookup, transform, predict
+PREDICTED_ROWS = metrics.counter(
+    "predicted_rows_total", "Rows predicted, by where the prediction came from.", ["source"]
+)  # table or model
+_CATEGORY_CODES = weakref.WeakKeyDictionary()  # Fitted ColumnTransformer -> its category codes
+
+
+
+def model_spec():
+    '''
+    Serves the model saved by serialization.save_model when present, otherwise the pickle.
+    The cache checks again on every refresh, so a worker started before the first
+    save_model switches to it once its manifest is published.
+    '''
+    return ArtifactSpec(
+        MODEL_MANIFEST_PATH, load_model, lazy=True,  # Reloads whenever a new manifest is published
+        fallback=ArtifactSpec(MODEL_PATH, load_object, lazy=True),  # Not even imported when the compiled model is used
+    )
+
+
+# One cache per worker process, shared by every request handled in it
+artifact_cache = ArtifactCache(
+    {
+        "model": model_spec(),
+        "preprocessor": ArtifactSpec(PREPROCESSOR_PATH, load_object, lazy=True),  # Not even imported when the compiled one is used
+        "compiled_preprocessor": ArtifactSpec(COMPILED_PREPROCESSOR_PATH, CompiledPreprocessor.load, required=False),
+        "compiled_model": ArtifactSpec(COMPILED_MODEL_PATH, CompiledModel.load, required=False),
+        "prediction_table": ArtifactSpec(PREDICTION_TABLE_PATH, PredictionTable.load, required=False),
+    },
+    set_record=SERVING_SET_PATH,  # The preprocessor is written minutes before the model, swap them together
+)
 
 
 class PredictPipeline:
-    def __init__(self):
-        pass  # No initialization needed
+    def __init__(self, cache=None):
+        self.cache = cache or artifact_cache  # Use the process-wide cache unless one is given
+        self.model_version = None  # Version of the artifacts used by the last prediction
 
     def predict(self, features):
+        preds, _ = self.predict_with_version(features)  # Predict and drop the version
+        return preds  # Return predictions
+
+    def predict_with_version(self, features):
         try:
-            model_path = os.path.join("artifacts", "model.pkl")  # Path to the saved model
-            preprocessor_path = os.path.join('artifacts', 'preprocessor.pkl')  # Path to the saved preprocessor
-            print("Before Loading")  # Print before loading objects
-            model = load_object(file_path=model_path)  # Load the trained model
-            preprocessor = load_object(file_path=preprocessor_path)  # Load the preprocessor
-            print("After Loading")  # Print after loading objects
-            data_scaled = preprocessor.transform(features)  # Transform input features
-            preds = model.predict(data_scaled)  # Make predictions
-            return preds  # Return predictions
-        
+            bundle = self.cache.get()  # Loaded once per worker, reloaded when the files change, timed as artifact_load_seconds
+            preds = predict_features(bundle, features)  # Table lookup, then transform and predict the rest
+            self.model_version = bundle.version  # Remember which artifacts served this call
+            return preds, bundle.version  # Return predictions and the model version
+
         except Exception as e:
             raise CustomException(e, sys)  # Raise custom exception if error occurs
 
+    def predict_batches(self, chunks, executor=None):
+        '''
+        Predicts an iterable of DataFrame chunks with one model version for the whole batch.
+
+        Returns a generator of (predictions, errors) per chunk. Rows that fail validation
+        get NaN as prediction and a message in errors; all other rows are predicted in one
+        vectorized call per chunk. With an InferenceExecutor each chunk runs on its workers;
+        a chunk it refuses or that misses its deadline gets the reason as error on every row.
+        '''
+        bundle = self.cache.get()  # Pin one artifact version for the whole batch
+        self.model_version = bundle.version  # Known before the first chunk is read
+        allowed = allowed_categories(get_transformer(bundle))  # Categories the encoder was fitted on
+
+        def generate():
+            for chunk in chunks:
+                check_batch_columns(chunk.columns)  # Every chunk must carry the input columns
+                features = chunk[INPUT_COLUMNS]  # Ignore extra columns such as math_score
+                errors = validate_batch(features, allowed)  # Per-row validation messages
+                valid = errors.isna().to_numpy()  # Rows that can be predicted
+                preds = np.full(len(features), np.nan)  # Invalid rows keep NaN
+                if valid.any():
+                    data = features[valid].astype({col: float for col in NUMERICAL_COLUMNS})  # Scores as numbers
+                    try:
+                        if executor is None:
+                            preds[valid] = predict_features(bundle, data)  # One call per chunk
+                        else:
+                            preds[valid] = executor.run(predict_features, bundle, data)  # Bounded pool, per-chunk deadline
+                    except (Overloaded, DeadlineExceeded) as e:
+                        errors[valid] = str(e)  # Rows of this chunk can be resent
+                yield preds, errors
+
+        return generate()
+
+
+
+def predict_features(bundle, features):
+    '''
+    Predicts a DataFrame or FeatureBatch of input rows with the artifacts of bundle. Rows covered by a
+    matching prediction table are read from it; the rest go through live inference.
+    '''
+    table = get_prediction_table(bundle)
+    if table is None:
+        return predict_live(bundle, features)
+    with span(PREDICT_STAGE_SECONDS, "table_lookup"):
+        preds, hit = table.lookup(features)  # Vectorized index computation, one gather
+    PREDICTED_ROWS.inc("table", amount=int(hit.sum()))
+    if not hit.all():
+        preds[~hit] = predict_live(bundle, features[~hit])  # Non-integer or out-of-range scores, unseen categories
+    return preds
+
+
+def predict_live(bundle, features):
+    transformer = get_transformer(bundle)  # Resolved outside the spans, first-use loads are timed as artifact loads
+    model = get_model(bundle)
+    if isinstance(features, FeatureBatch) and not isinstance(transformer, CompiledPreprocessor):
+        features = features.to_frame()  # The fitted ColumnTransformer selects columns by name
+    with span(PREDICT_STAGE_SECONDS, "transform"):
+        X = transformer.transform(features)
+    with span(PREDICT_STAGE_SECONDS, "predict"):
+        preds = model.predict(X)
+    PREDICTED_ROWS.inc("model", amount=len(preds))
+    return preds
+
+
+def get_prediction_table(bundle):
+    table = bundle["prediction_table"]
+    if (
+        table is not None
+        and bundle.digests["model"] in table.model_digests
+        and table.preprocessor_digest == bundle.digests["preprocessor"]
+    ):
+        return table  # Computed from exactly the served model and preprocessor
+    return None
+
+
+def get_transformer(bundle):
+    compiled = bundle["compiled_preprocessor"]
+    if compiled is not None and compiled.source_digest == bundle.digests["preprocessor"]:
+        return compiled  # NumPy-only path, exported from this exact preprocessor
+    return bundle["preprocessor"]  # Fall back to the fitted ColumnTransformer
+
+
+def get_model(bundle):
+    compiled = bundle["compiled_model"]
+    if compiled is not None and bundle.digests["model"] in compiled.source_digests:
+        return compiled  # NumPy-only path, exported from this exact model
+    return bundle["model"]  # Fall back to the fitted model, loaded on first use
+
+
+def check_batch_columns(columns):
+    missing = [col for col in INPUT_COLUMNS if col not in columns]  # Required columns not provided
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")  # Reject the batch as a whole
+
+
+def fitted_categories(preprocessor):
+    '''
+    Categories of each categorical column in the order of the fitted encoder, or None for
+    an unknown preprocessor layout.
+    '''
+    if isinstance(preprocessor, CompiledPreprocessor):
+        return {block["column"]: block["categories"] for block in preprocessor.categorical}
+    try:
+        encoder = preprocessor.named_transformers_["cat_pipelines"].named_steps["one_hot_encoder"]  # Fitted encoder
+    except (AttributeError, KeyError):
+        return None  # Unknown preprocessor layout, let transform decide
+    return {col: list(cats) for col, cats in zip(CATEGORICAL_COLUMNS, encoder.categories_)}
+
+
+def allowed_categories(preprocessor):
+    categories = fitted_categories(preprocessor)
+    return None if categories is None else {col: set(values) for col, values in categories.items()}
+
+
+def category_codes(preprocessor):
+    '''
+    Category -> code of each categorical column, the vocabulary FeatureBatch interns with.
+    The compiled preprocessor's own dicts are returned, so its batches need no remapping.
+    '''
+    if isinstance(preprocessor, CompiledPreprocessor):
+        return preprocessor.category_codes  # Same codes its lookup tables are indexed with
+    codes = _CATEGORY_CODES.get(preprocessor)
+    if codes is None:
+        categories = fitted_categories(preprocessor)
+        if categories is None:
+            return None  # Batches then intern whatever they see and skip the category check
+        codes = _CATEGORY_CODES[preprocessor] = {
+            col: {category: code for code, category in enumerate(values)} for col, values in categories.items()
+        }  # Built once per fitted preprocessor
+    return codes
+
+
+def validate_batch(features, allowed=None):
+    '''
+    Returns a Series with an error message for each invalid row and NaN for valid rows.
+    '''
+    errors = pd.Series(np.nan, index=features.index, dtype=object)  # Start with every row valid
+    for col in NUMERICAL_COLUMNS:
+        scores = pd.to_numeric(features[col], errors="coerce")  # Non-numeric values become NaN
+        bad = scores.isna() | (scores < SCORE_RANGE[0]) | (scores > SCORE_RANGE[1])  # Missing or out of range
+        errors[bad & errors.isna()] = f"{col} must be a number between {SCORE_RANGE[0]} and {SCORE_RANGE[1]}"
+    if allowed is not None:
+        for col in CATEGORICAL_COLUMNS:
+            bad = ~features[col].isin(allowed[col])  # Missing or unseen categories
+            errors[bad & errors.isna()] = f"{col} must be one of {sorted(allowed[col])}"
+    return errors
+
+
+def concat_features(parts):
+    '''
+    One input for several requests' rows: a FeatureBatch when every part is one,
+    otherwise a DataFrame.
+    '''
+    if all(isinstance(part, FeatureBatch) for part in parts):
+        return FeatureBatch.concat(parts)
+    return pd.concat(
+        [part.to_frame() if isinstance(part, FeatureBatch) else part for part in parts], ignore_index=True
+    )
+
+
+def _to_score(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan  # Missing or not a number, rejected by validate()
+
+
+class FeatureBatch:
+    '''
+    Prediction inputs as columns of preallocated NumPy arrays: float64 scores and int32
+    interned category codes, one contiguous row per column.
+
+    Categories are coded with a vocabulary from category_codes, so the compiled
+    preprocessor indexes its lookup tables with the codes directly. Values outside the
+    vocabulary get batch-local codes after its end, missing values MISSING_CODE, and
+    scores that are missing or not numbers NaN. validate() checks every row at once.
+    '''
+    __slots__ = ("vocabulary", "codes", "scores", "size", "_extra")
+
+    def __init__(self, capacity, vocabulary=None):
+        self.vocabulary = vocabulary  # Column -> {category: code}, None accepts any category
+        self.codes = np.empty((len(CATEGORICAL_COLUMNS), capacity), dtype=np.int32)  # Interned categories
+        self.scores = np.empty((len(NUMERICAL_COLUMNS), capacity), dtype=np.float64)  # Scores as numbers
+        self.size = 0  # Rows filled so far
+        self._extra = {col: {} for col in CATEGORICAL_COLUMNS}  # Categories outside the vocabulary
+
+    @classmethod
+    def from_records(cls, records, vocabulary=None):
+        batch = cls(len(records), vocabulary)  # Allocated once for every row
+        for record in records:
+            batch.append(record)
+        return batch
+
+    @classmethod
+    def concat(cls, batches):
+        first = batches[0]
+        if any(batch.vocabulary is not first.vocabulary or any(batch._extra.values()) for batch in batches):
+            return cls.from_records([record for batch in batches for record in batch.records()], first.vocabulary)
+        batch = cls(0, first.vocabulary)
+        batch.codes = np.concatenate([part.codes[:, :part.size] for part in batches], axis=1)  # Same codes, just copied
+        batch.scores = np.concatenate([part.scores[:, :part.size] for part in batches], axis=1)
+        batch.size = batch.codes.shape[1]
+        return batch
+
+    def append(self, record):
+        '''
+        Adds one row from a CustomData or a dict of input columns.
+        '''
+        if self.size == self.codes.shape[1]:
+            raise ValueError(f"FeatureBatch is full ({self.size} rows)")
+        get = record.get if isinstance(record, dict) else lambda col: getattr(record, col, None)
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            self.codes[j, self.size] = self._intern(col, get(col))
+        for j, col in enumerate(NUMERICAL_COLUMNS):
+            self.scores[j, self.size] = _to_score(get(col))
+        self.size += 1
+
+    def _intern(self, col, value):
+        if value is None or (isinstance(value, float) and value != value):
+            return MISSING_CODE  # Missing category
+        known = self.vocabulary[col] if self.vocabulary is not None else {}
+        try:
+            code = known.get(value)
+        except TypeError:
+            value = str(value)  # Unhashable input such as a JSON list, never a valid category
+            code = known.get(value)
+        if code is None:
+            extra = self._extra[col]
+            code = extra.get(value)
+            if code is None:
+                code = extra[value] = len(known) + len(extra)  # Next code after the vocabulary
+        return code
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)  # Column lookup like a DataFrame
+        return self.take(key)  # Row selection with a mask or indices
+
+    def categories(self, col):
+        known = self.vocabulary[col] if self.vocabulary is not None else {}
+        return list(known) + list(self._extra[col])  # Index is the code
+
+    def column(self, col):
+        if col in NUMERICAL_COLUMNS:
+            return self.scores[NUMERICAL_COLUMNS.index(col), :self.size]  # View, no copy
+        values = np.array(self.categories(col) + [None], dtype=object)  # MISSING_CODE (-1) reads the trailing None
+        return values[self.codes[CATEGORICAL_COLUMNS.index(col), :self.size]]
+
+    def recode(self, col, codes, fill=None):
+        '''
+        The column's categories as codes of another vocabulary, such as a prediction
+        table's. Missing values get the code of fill; categories the vocabulary does not
+        have get -1. One dict lookup per distinct category, not per row.
+        '''
+        own = self.codes[CATEGORICAL_COLUMNS.index(col), :self.size]
+        if (
+            self.vocabulary is not None and self.vocabulary[col] is codes
+            and not self._extra[col] and not (own == MISSING_CODE).any()
+        ):
+            return own  # Interned with these very codes
+        categories = self.categories(col)
+        lookup = np.array([codes.get(category, -1) for category in categories] + [codes.get(fill, -1)], dtype=np.int32)
+        return lookup[own]  # MISSING_CODE reads the fill code at the end
+
+    def encode(self, col, codes, fill=None):
+        '''
+        recode for a compiled preprocessor: categories the vocabulary does not have raise
+        ValueError like OneHotEncoder(handle_unknown="error").
+        '''
+        encoded = self.recode(col, codes, fill)
+        unknown = np.flatnonzero(encoded < 0)
+        if len(unknown):
+            categories = self.categories(col)
+            code = self.codes[CATEGORICAL_COLUMNS.index(col), unknown[0]]
+            value = categories[code] if code >= 0 else fill
+            raise ValueError(
+                f"Found unknown categories [{value!r}] in column {col!r} during transform"
+            )  # Same failure as OneHotEncoder(handle_unknown="error")
+        return encoded
+
+    def validate(self, score_range=SCORE_RANGE):
+        '''
+        validate_batch on the arrays: returns (valid, errors), a bool and an error message
+        (None for valid rows) per row. Categories are only checked with a vocabulary.
+        '''
+        valid = np.ones(self.size, dtype=bool)
+        errors = np.full(self.size, None, dtype=object)
+        low, high = score_range
+        for j, col in enumerate(NUMERICAL_COLUMNS):
+            scores = self.scores[j, :self.size]
+            bad = ~((scores >= low) & (scores <= high)) & valid  # NaN compares False, so missing scores are bad too
+            errors[bad] = f"{col} must be a number between {low} and {high}"
+            valid &= ~bad
+        if self.vocabulary is not None:
+            for j, col in enumerate(CATEGORICAL_COLUMNS):
+                codes = self.codes[j, :self.size]
+                bad = ((codes < 0) | (codes >= len(self.vocabulary[col]))) & valid  # Missing or outside the vocabulary
+                errors[bad] = f"{col} must be one of {sorted(self.vocabulary[col])}"
+                valid &= ~bad
+        return valid, errors
+
+    def take(self, index):
+        batch = FeatureBatch(0, self.vocabulary)
+        batch.codes = self.codes[:, :self.size][:, index]
+        batch.scores = self.scores[:, :self.size][:, index]
+        batch.size = batch.codes.shape[1]
+        batch._extra = self._extra  # Same codes, so the same extra categories
+        return batch
+
+    def records(self):
+        columns = {col: self.column(col).tolist() for col in INPUT_COLUMNS}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def to_frame(self):
+        return pd.DataFrame({col: self.column(col) for col in INPUT_COLUMNS})  # For the fitted ColumnTransformer
 
 
 class CustomData:
+    __slots__ = (
+        "gender", "race_ethnicity", "parental_level_of_education", "lunch",
+        "test_preparation_course", "reading_score", "writing_score",
+    )  # No per-instance __dict__
+
     def __init__(
         self,
         gender: str,
@@ -65,4 +455,7 @@ class CustomData:
             return pd.DataFrame(custom_data_input_dict)  # Convert dict to DataFrame
 
         except Exception as e:
-            raise CustomException(e, sys)  # Raise custom exception if error occurs
\ No newline at end of file
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+    def to_batch(self, vocabulary=None):
+        return FeatureBatch.from_records([self], vocabulary)  # One-row batch, no DataFrame
@@ -0,0 +1,387 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))  # Adds the project root directory to the Python path so that imports like 'from src...'
+import argparse  # Import argparse for the command line interface
+import hashlib  # Import hashlib to fingerprint stage inputs
+import json  # Import json for the pipeline state file
+import pickle  # Import pickle to fingerprint the unfitted preprocessor
+import threading  # Import threading to guard the state file
+import time  # Import time to measure stage durations
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait  # Import the pool that runs independent stages
+from dataclasses import dataclass, field, asdict  # Import dataclass for easy class creation
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.utils import load_object, file_digest, TRAINING_STAGE_SECONDS  # Import utilities to load and fingerprint files
+from src import metrics  # Import the lightweight metrics registry
+from src.metrics import span  # Import the timing span
+from src.components.data_ingestion import DataIngestion  # Import the ingestion stage
+from src.components.data_transformation import DataTransformation  # Import the transformation stage
+from src.components.model_trainer import ModelTrainer  # Import the training stage
+from src.components.model_registry import MODEL_REGISTRY  # Import the registered models, without importing their libraries
+from src.components.artifact_store import load_arrays, iter_table, resolve_table_format  # Import array and table helpers
+from src.serialization import MANIFEST_NAME  # Import the name of the saved model's manifest
+
+PIPELINE_STAGE_SECONDS = metrics.histogram(
+    "training_pipeline_stage_seconds", "Wall time of one training pipeline stage that ran.", ["stage"]
+)
+PIPELINE_STAGES = metrics.counter(
+    "training_pipeline_stages_total", "Training pipeline stages by outcome.", ["stage", "outcome"]
+)  # ran, skipped or disabled
+
+STATE_VERSION = 1  # Bumped when the state file layout changes, older files are ignored
+
+
+@dataclass
+class TrainPipelineConfig:
+    state_file_path: str = os.path.join("artifacts", "pipeline_state.json")  # Input and output hashes of the last run of each stage
+    max_workers: int = int(os.environ.get("TRAIN_PIPELINE_JOBS", 2))  # Independent stages run at the same time
+
+
+@dataclass
+class Stage:
+    name: str  # Stage name, used by --from-stage
+    run: object  # Function that reads the inputs and writes the outputs
+    inputs: list = field(default_factory=list)  # Files or directories the stage reads
+    outputs: list = field(default_factory=list)  # Files or directories the stage writes, missing ones are allowed
+    params: object = None  # JSON-serializable settings that change the outputs
+    requires: list = field(default_factory=list)  # Stages that must finish first
+    enabled: bool = True  # Disabled stages are never run
+
+
+class FileDigests:
+    '''
+    Content hashes of files and directories. A file whose size and modification time
+    are unchanged since it was last hashed reuses the old hash, so checking a large
+    unchanged artifact does not read it again.
+    '''
+
+    def __init__(self, known=None):
+        self._lock = threading.Lock()
+        self._known = dict(known or {})  # Path -> [mtime_ns, size, digest]
+
+    def digest(self, path):
+        if os.path.isdir(path):
+            combined = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()  # Walk in a stable order
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    combined.update(f"{os.path.relpath(file_path, path)}={self._file(file_path)}\n".encode())
+            return combined.hexdigest()
+        if os.path.isfile(path):
+            return self._file(path)
+        return None  # Missing
+
+    def _file(self, path):
+        st = os.stat(path)
+        with self._lock:
+            known = self._known.get(path)
+        if known is not None and known[:2] == [st.st_mtime_ns, st.st_size]:
+            return known[2]  # Unchanged since it was hashed
+        digest = file_digest(path)
+        with self._lock:
+            self._known[path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def known(self):
+        with self._lock:
+            return {path: value for path, value in self._known.items() if os.path.exists(path)}
+
+
+def _out_of_core_params(config):
+    return {key: value for key, value in asdict(config).items() if key != "cache_dir"} if config.enabled else None
+
+
+def fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+class TrainPipeline:
+    '''
+    Training as a DAG of stages with declared inputs and outputs:
+
+        ingestion -> transformation -> training -> compile_model
+                                   |           -> prediction_table
+                                   -> compile_preprocessor
+
+    A stage is skipped when the content hashes of its inputs, its settings and its
+    outputs are the same as after its last successful run, as recorded in the state
+    file. Changing only the model grid therefore reruns training and the exports, but
+    neither reads nor transforms the data again. Stages whose requirements are met run
+    at the same time on a small thread pool.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or TrainPipelineConfig()  # State file and parallelism
+        self.ingestion = DataIngestion()  # Stage implementations
+        self.transformation = DataTransformation()
+        self.trainer = ModelTrainer()
+        self.stages = {stage.name: stage for stage in self.build_stages()}  # In dependency order
+        self._state_lock = threading.Lock()  # Stages finish on several threads
+
+    def build_stages(self):
+        ingestion_config = self.ingestion.ingestion_config
+        transformation_config = self.transformation.data_transformation_config
+        trainer_config = self.trainer.model_trainer_config
+        _, train_path, test_path = self.ingestion.output_paths()  # Tables in the configured format
+        model_files = [trainer_config.trained_model_file_path, trainer_config.trained_model_dir]
+        serving_files = model_files + [trainer_config.serving_set_file_path]  # Written together by the training stage
+
+        return [
+            Stage(
+                name="ingestion",
+                run=self.ingestion.initiate_data_ingestion,
+                inputs=[ingestion_config.source_data_path],
+                outputs=self.ingestion.output_paths(),
+                params={
+                    "streaming": ingestion_config.streaming,
+                    "chunk_size": ingestion_config.chunk_size,
+                    "test_size": ingestion_config.test_size,
+                    "split_key_columns": ingestion_config.split_key_columns,
+                    "table_format": resolve_table_format(ingestion_config.table_format),
+                },
+            ),
+            Stage(
+                name="transformation",
+                run=lambda: self.transformation.initiate_array_transformation(train_path, test_path, export=False),
+                inputs=[train_path, test_path],
+                outputs=[transformation_config.preprocessor_obj_file_path, transformation_config.transformed_data_dir],
+                params={
+                    "preprocessor": hashlib.sha256(
+                        pickle.dumps(self.transformation.get_data_transformer_object())
+                    ).hexdigest(),  # Unfitted definition: columns, steps and their settings
+                    "target": transformation_config.target_column_name,
+                    "out_of_core": _out_of_core_params(transformation_config.out_of_core),
+                },
+                requires=["ingestion"],
+            ),
+            Stage(
+                name="compile_preprocessor",
+                run=lambda: self._compile_preprocessor(test_path),
+                inputs=[transformation_config.preprocessor_obj_file_path, test_path],
+                outputs=[transformation_config.compiled_preprocessor_file_path],
+                requires=["transformation"],
+            ),
+            Stage(
+                name="training",
+                run=self._train,
+                inputs=[transformation_config.transformed_data_dir],
+                outputs=serving_files + [trainer_config.cost_report_file_path, trainer_config.tradeoff_table_file_path],
+                params={
+                    "param_grids": self.trainer.get_param_grids(),
+                    "models": MODEL_REGISTRY,  # Classes and default parameters
+                    "search": {
+                        key: value for key, value in asdict(trainer_config.search_config).items()
+                        if key not in ("n_jobs", "cache_dir", "cache_max_bytes")
+                    },  # Settings that change which model wins, not how fast it is found
+                    "out_of_core": _out_of_core_params(trainer_config.out_of_core),
+                    "selection": asdict(trainer_config.selection),  # Tolerance and budgets change which model is kept
+                },
+                requires=["transformation"],
+            ),
+            Stage(
+                name="compile_model",
+                run=self._compile_model,
+                inputs=model_files + [transformation_config.transformed_data_dir],
+                outputs=[trainer_config.compiled_model_dir],
+                params={"tolerance": trainer_config.compiled_model_tolerance, "sample_rows": trainer_config.compiled_model_sample_rows},
+                requires=["training"],
+            ),
+            Stage(
+                name="prediction_table",
+                run=self._materialize_predictions,
+                inputs=model_files + [transformation_config.preprocessor_obj_file_path],
+                outputs=[trainer_config.prediction_table_dir],
+                requires=["training"],
+                enabled=trainer_config.materialize_predictions,  # MATERIALIZE_PREDICTIONS=1
+            ),
+        ]
+
+    def _compile_preprocessor(self, test_path):
+        config = self.transformation.data_transformation_config
+        preprocessor = load_object(config.preprocessor_obj_file_path)
+        sample_df = next(iter_table(test_path, config.out_of_core.chunk_rows)).drop(columns=[config.target_column_name])  # First test chunk
+        return self.transformation.export_compiled_preprocessor(preprocessor, sample_df, preprocessor.transform(sample_df))
+
+    def _train(self):
+        r2_square = self.trainer.initiate_model_trainer_from_arrays(
+            self.transformation.data_transformation_config.transformed_data_dir, export=False
+        )  # The exports are stages of their own
+        logging.info(f"Best model test R2: {r2_square}")
+        return r2_square
+
+    def _saved_model(self):
+        config = self.trainer.model_trainer_config
+        return load_object(config.trained_model_file_path), os.path.join(config.trained_model_dir, MANIFEST_NAME)
+
+    def _compile_model(self):
+        model, manifest_path = self._saved_model()
+        arrays, _ = load_arrays(self.transformation.data_transformation_config.transformed_data_dir)
+        with span(TRAINING_STAGE_SECONDS, "export"):
+            return self.trainer.export_compiled_model(model, arrays["X_test"], manifest_path)  # Checked on a sample of it
+
+    def _materialize_predictions(self):
+        model, manifest_path = self._saved_model()
+        with span(TRAINING_STAGE_SECONDS, "export"):
+            return self.trainer.materialize_predictions(model, manifest_path)
+
+    def downstream(self, name):
+        '''
+        The stage and every stage that depends on it, directly or not.
+        '''
+        selected = {name}
+        for stage in self.stages.values():  # Dependency order, so one pass is enough
+            if selected.intersection(stage.requires):
+                selected.add(stage.name)
+        return selected
+
+    def _load_state(self):
+        try:
+            with open(self.config.state_file_path) as file_obj:
+                state = json.load(file_obj)
+        except (FileNotFoundError, ValueError):
+            return {"version": STATE_VERSION, "files": {}, "stages": {}}  # First run or unreadable file
+        if state.get("version") != STATE_VERSION:
+            return {"version": STATE_VERSION, "files": {}, "stages": {}}
+        return state
+
+    def _save_state(self, state, digests):
+        with self._state_lock:
+            state["files"] = digests.known()
+            os.makedirs(os.path.dirname(self.config.state_file_path) or ".", exist_ok=True)
+            tmp_path = f"{self.config.state_file_path}.tmp.{os.getpid()}"
+            with open(tmp_path, "w") as file_obj:
+                json.dump(state, file_obj, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.config.state_file_path)  # Never leave a partial state file
+
+    def _input_key(self, stage, digests):
+        inputs = {path: digests.digest(path) for path in stage.inputs}
+        missing = [path for path, digest in inputs.items() if digest is None]
+        if missing:
+            raise FileNotFoundError(f"Stage {stage.name} is missing its inputs {missing}, run the stages before it")
+        return fingerprint({"stage": stage.name, "params": stage.params, "inputs": inputs})
+
+    def _is_current(self, stage, input_key, state, digests):
+        last = state["stages"].get(stage.name)
+        if last is None or last.get("input_key") != input_key:
+            return False  # Never run, or inputs or settings changed
+        return all(digests.digest(path) == last["outputs"].get(path) for path in stage.outputs)  # Outputs untouched
+
+    def _run_stage(self, stage, forced, state, digests):
+        if not stage.enabled:
+            return "disabled"
+        input_key = self._input_key(stage, digests)
+        if not forced and self._is_current(stage, input_key, state, digests):
+            logging.info(f"Stage {stage.name} is up to date, skipping it")
+            return "skipped"
+
+        logging.info(f"Running stage {stage.name}")
+        started = time.perf_counter()
+        with span(PIPELINE_STAGE_SECONDS, stage.name):
+            stage.run()
+        seconds = time.perf_counter() - started
+        with self._state_lock:
+            state["stages"][stage.name] = {
+                "input_key": input_key,
+                "outputs": {path: digests.digest(path) for path in stage.outputs},  # None for outputs not produced
+                "seconds": round(seconds, 3),
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+        self._save_state(state, digests)  # Finished stages stay recorded if a later one fails
+        logging.info(f"Stage {stage.name} finished in {seconds:.2f} s")
+        return "ran"
+
+    def plan(self, from_stage=None, force=False):
+        '''
+        Stage name -> what run() would do with the files as they are now: run, skip,
+        disabled, or not selected. Stages after one that runs are reported as run,
+        although they are skipped if its outputs turn out unchanged.
+        '''
+        state = self._load_state()
+        digests = FileDigests(state["files"])
+        selected = self.downstream(from_stage) if from_stage else set(self.stages)
+        plan = {}
+        for stage in self.stages.values():
+            if stage.name not in selected:
+                plan[stage.name] = "not selected"
+            elif not stage.enabled:
+                plan[stage.name] = "disabled"
+            elif force or from_stage or any(plan.get(name) == "run" for name in stage.requires):
+                plan[stage.name] = "run"
+            else:
+                try:
+                    current = self._is_current(stage, self._input_key(stage, digests), state, digests)
+                except FileNotFoundError:
+                    current = False  # Inputs come from an earlier stage
+                plan[stage.name] = "skip" if current else "run"
+        return plan
+
+    def run(self, from_stage=None, force=False):
+        '''
+        Runs the pipeline and returns stage name -> outcome (ran, skipped, disabled).
+        With from_stage, only that stage and the stages after it run, unconditionally,
+        on the outputs the earlier stages left on disk. force reruns every stage.
+        '''
+        if from_stage is not None and from_stage not in self.stages:
+            raise CustomException(f"Unknown stage {from_stage!r}, expected one of {list(self.stages)}", sys)
+        selected = self.downstream(from_stage) if from_stage else set(self.stages)
+        forced = selected if (force or from_stage) else set()
+        state = self._load_state()
+        digests = FileDigests(state["files"])
+
+        outcomes = {}
+        pending = [stage for stage in self.stages.values() if stage.name in selected]
+        running = {}  # Future -> stage
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.config.max_workers), thread_name_prefix="stage") as pool:
+                while pending or running:
+                    for stage in list(pending):
+                        if all(name in outcomes or name not in selected for name in stage.requires):
+                            pending.remove(stage)
+                            running[pool.submit(self._run_stage, stage, stage.name in forced, state, digests)] = stage
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        try:
+                            outcomes[stage.name] = future.result()
+                        except Exception:
+                            pending.clear()  # Start nothing new, let running stages finish
+                            for other in running:
+                                other.cancel()
+                            raise
+                        PIPELINE_STAGES.inc(stage.name, outcomes[stage.name])
+        except Exception as e:
+            raise CustomException(e, sys)  # Raise custom exception if error occurs
+        finally:
+            metrics.REGISTRY.write_textfile(self.trainer.model_trainer_config.training_metrics_file_path)  # Timings of this run
+
+        outcomes = {name: outcomes[name] for name in self.stages if name in outcomes}  # In dependency order
+        logging.info(f"Training pipeline finished: {outcomes}")
+        return outcomes
+
+
+def main(argv=None):
+    pipeline = TrainPipeline()
+    parser = argparse.ArgumentParser(description="Run the training pipeline, skipping stages whose inputs are unchanged.")
+    parser.add_argument("--from-stage", choices=list(pipeline.stages), help="rerun this stage and every stage after it")
+    parser.add_argument("--force", action="store_true", help="rerun every stage")
+    parser.add_argument("--jobs", type=int, help="stages run at the same time (default: TRAIN_PIPELINE_JOBS or 2)")
+    parser.add_argument("--dry-run", action="store_true", help="print what would run and exit")
+    args = parser.parse_args(argv)
+
+    if args.jobs:
+        pipeline.config.max_workers = args.jobs
+    if args.dry_run:
+        for name, action in pipeline.plan(args.from_stage, args.force).items():
+            print(f"{name:<22} {action}")
+        return None
+
+    outcomes = pipeline.run(args.from_stage, args.force)
+    for name, outcome in outcomes.items():
+        print(f"{name:<22} {outcome}")
+    return outcomes
+
+
+if __name__ == "__main__":
+    main()
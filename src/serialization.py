@@ -0,0 +1,97 @@
+import os  # Import os for file and directory operations
+import sys  # Import sys for system-specific parameters and functions
+import json  # Import json for the model manifest
+import shutil  # Import shutil to replace a model directory
+import importlib  # Import importlib to rebuild native models from their class name
+
+from src.exception import CustomException  # Import custom exception for error handling
+from src.logger import logging  # Import logging for logging messages
+from src.utils import file_digest  # Import function to fingerprint saved files
+
+FORMAT_VERSION = 1  # Bumped whenever the model directory layout changes
+MANIFEST_NAME = "manifest.json"  # Written last, describes and checksums the payload
+
+# Model library -> (format name, payload file); everything else is dumped with joblib
+NATIVE_FORMATS = {
+    "xgboost": ("xgboost", "model.ubj"),  # XGBoost's own binary (UBJSON) format
+    "catboost": ("catboost", "model.cbm"),  # CatBoost's own binary format
+}
+
+
+def save_model(model, directory):
+    '''
+    Saves a fitted model in the best format for its type: the library's native binary
+    format for XGBoost and CatBoost, otherwise an uncompressed joblib file whose arrays
+    can be memory-mapped on load. A manifest.json with the format version, the model
+    class and a checksum of the payload is written last and is the file readers watch.
+    '''
+    try:
+        library = type(model).__module__.split(".")[0]  # Package the model class comes from
+        model_format, payload_name = NATIVE_FORMATS.get(library, ("joblib", "model.joblib"))
+
+        tmp_dir = f"{directory}.tmp.{os.getpid()}"  # Payload is written next to the target first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        tmp_payload = os.path.join(tmp_dir, payload_name)
+        if model_format == "joblib":
+            import joblib  # Only needed for joblib payloads
+            joblib.dump(model, tmp_payload)  # Uncompressed, so arrays stay mappable
+        else:
+            model.save_model(tmp_payload)  # Native format, loads without unpickling Python objects
+
+        cls = type(model)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "format": model_format,
+            "class": f"{cls.__module__}.{cls.__qualname__}",
+            "library_version": getattr(sys.modules.get(library), "__version__", None),
+            "payload": payload_name,
+            "sha256": file_digest(tmp_payload),  # Checked before loading
+            "size": os.path.getsize(tmp_payload),
+        }
+
+        os.makedirs(directory, exist_ok=True)  # Create the directory if it doesn't exist
+        payload_path = os.path.join(directory, payload_name)
+        os.replace(tmp_payload, payload_path)  # Payload first, the manifest publishes it
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2)
+        os.replace(os.path.join(tmp_dir, MANIFEST_NAME), manifest_path)  # Atomically swap in the new manifest
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        for name in os.listdir(directory):
+            if name not in (payload_name, MANIFEST_NAME):
+                os.remove(os.path.join(directory, name))  # Payload of a previous model in another format
+        logging.info(f"Saved {manifest['class']} as {model_format} to {directory}")
+        return manifest_path
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+
+def load_model(manifest_path, mmap_mode="r", verify=True):
+    '''
+    Loads a model saved by save_model from the path of its manifest.json. joblib
+    payloads are memory-mapped read-only by default, so worker processes share the
+    pages of plain array attributes through the OS page cache. The payload checksum
+    is verified unless verify is False.
+    '''
+    try:
+        with open(manifest_path) as file_obj:
+            manifest = json.load(file_obj)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {manifest.get('format_version')}")
+
+        payload_path = os.path.join(os.path.dirname(manifest_path), manifest["payload"])
+        if verify and file_digest(payload_path) != manifest["sha256"]:
+            raise ValueError(f"Checksum mismatch for {payload_path}")  # Payload does not belong to this manifest
+
+        if manifest["format"] == "joblib":
+            import joblib  # Only needed for joblib payloads
+            return joblib.load(payload_path, mmap_mode=mmap_mode)
+        module_name, _, class_name = manifest["class"].rpartition(".")
+        model = getattr(importlib.import_module(module_name), class_name)()  # Empty model of the saved class
+        model.load_model(payload_path)  # Restores the trees and the scikit-learn parameters
+        return model
+
+    except Exception as e:
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
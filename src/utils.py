@@ -1,14 +1,25 @@
 import os  # Import os for file and directory operations
 import sys  # Import sys for system-specific parameters
+import hashlib  # Import hashlib to fingerprint file contents
 
-import numpy as np  # Import numpy for numerical operations
-import pandas as pd  # Import pandas for data manipulation
-import dill  # Import dill for advanced object serialization (not used here)
 import pickle  # Import pickle for saving and loading Python objects
-from sklearn.metrics import r2_score  # Import r2_score for model evaluation
-from sklearn.model_selection import GridSearchCV  # Import GridSearchCV for hyperparameter tuning
 
 from src.exception import CustomException  # Import custom exception for error handling
+from src import metrics  # Import the lightweight metrics registry
+from src.metrics import span  # Import the timing span
+
+TRAINING_STAGE_SECONDS = metrics.histogram(
+    "training_stage_seconds", "Time spent in each stage of a training run.", ["stage"]
+)  # ingestion, transform, search, selection, save, export
+MODEL_SEARCH_SECONDS = metrics.counter(
+    "model_search_seconds_total", "Fit and score time of the cross-validated search, summed over folds.", ["model", "phase"]
+)  # Worker time, so it exceeds wall time when the search runs in parallel
+MODEL_SEARCH_EVALUATIONS = metrics.counter(
+    "model_search_evaluations_total", "Parameter combinations scored by the model search.", ["model"]
+)
+MODEL_REFIT_SECONDS = metrics.histogram(
+    "model_refit_seconds", "Time to refit a model with its best parameters on the whole training set.", ["model"]
+)
 
 def save_object(file_path, obj):
     try:
@@ -16,25 +27,51 @@ def save_object(file_path, obj):
 
         os.makedirs(dir_path, exist_ok=True)  # Create the directory if it doesn't exist
 
-        with open(file_path, "wb") as file_obj:  # Open the file in write-binary mode
+        tmp_path = f"{file_path}.tmp.{os.getpid()}"  # Write next to the target first
+        with open(tmp_path, "wb") as file_obj:  # Open the file in write-binary mode
             pickle.dump(obj, file_obj)  # Save the object using pickle
+        os.replace(tmp_path, file_path)  # Atomically swap it in so readers never see a partial file
 
     except Exception as e:
         raise CustomException(e, sys)  # Raise custom exception if error occurs
     
-def evaluate_models(X_train, y_train, X_test, y_test, models, param):
+def evaluate_models(X_train, y_train, X_test, y_test, models, param, search_config=None, return_costs=False):
+    '''
+    Searches, refits and scores every model and returns {name: test R2}. With
+    return_costs, returns (report, costs) where costs holds each model's cost report
+    entry (see src.components.cost_report.model_costs).
+    '''
+    from sklearn.metrics import r2_score  # Training-only imports, kept out of the serving import path
+    from src.components.model_search import ModelSearch  # Import the cross-validated model search
+    from src.components.cost_report import ResourceUsage, model_costs, usage_dict, spent_seconds  # Import the cost report helpers
+
     try:
         report = {}  # Dictionary to store model scores
+        costs = {}  # Search and refit cost of each model
+
+        model_search = ModelSearch(search_config)  # CV search, parallel and cached when configured
+        with span(TRAINING_STAGE_SECONDS, "search"):
+            search_results = model_search.run(models, param, X_train, y_train)
+        for name, search_result in search_results.items():
+            spent = spent_seconds(search_result.cv_results)  # Shared path fits once, cache hits not at all
+            MODEL_SEARCH_SECONDS.inc(name, "fit", amount=spent["fit_seconds"])
+            MODEL_SEARCH_SECONDS.inc(name, "score", amount=spent["score_seconds"])
+            MODEL_SEARCH_EVALUATIONS.inc(name, amount=len(search_result.cv_results))
 
         for i in range(len(list(models))):  # Loop through each model
             model = list(models.values())[i]  # Get the model
-            para = param[list(models.keys())[i]]  # Get the parameters for the model
-
-            gs = GridSearchCV(model, para, cv=3)  # Create GridSearchCV object
-            gs.fit(X_train, y_train)  # Fit GridSearchCV to training data
-
-            model.set_params(**gs.best_params_)  # Set the best parameters to the model
-            model.fit(X_train, y_train)  # Train the model with best parameters
+            search_result = search_results[list(models.keys())[i]]  # Get the search result for the model
+
+            model.set_params(**search_result.best_params)  # Set the best parameters to the model
+            with ResourceUsage() as refit_usage:
+                fitted = model_search.load_fitted(model)  # Same model already fitted on the same data
+                if fitted is not None:
+                    model = models[list(models.keys())[i]] = fitted  # Use the cached fit
+                else:
+                    with span(MODEL_REFIT_SECONDS, list(models.keys())[i]):
+                        model.fit(X_train, y_train)  # Train the model with best parameters
+            if fitted is None:
+                model_search.store_fitted(model)  # Cache the fit for the next run
 
             y_train_pred = model.predict(X_train)  # Predict on training data
 
@@ -45,7 +82,14 @@ def evaluate_models(X_train, y_train, X_test, y_test, models, param):
             test_model_score = r2_score(y_test, y_test_pred)  # Calculate R2 score for test data
 
             report[list(models.keys())[i]] = test_model_score  # Store test score in report
-
+            costs[list(models.keys())[i]] = model_costs(
+                list(models.keys())[i], search_result.cv_results, search_result.best_params, search_result.best_score,
+                train_score=train_model_score, test_score=test_model_score,
+                refit=usage_dict(refit_usage, cached=fitted is not None),
+            )  # Every evaluated combination, the refit and both scores
+
+        if return_costs:
+            return report, costs
         return report  # Return the report dictionary
 
     except Exception as e:
@@ -57,4 +101,11 @@ def load_object(file_path):
             return pickle.load(file_obj)  # Load and return the object
 
     except Exception as e:
-        raise CustomException(e, sys)  # Raise custom exception if error occurs
\ No newline at end of file
+        raise CustomException(e, sys)  # Raise custom exception if error occurs
+
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()  # Hash object for the file content
+    with open(file_path, "rb") as file_obj:  # Open the file in read-binary mode
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)  # Hash the file in chunks to bound memory
+    return digest.hexdigest()  # Return the hex digest